@@ -5,7 +5,25 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from life_os_agent.database.setup import DB_PATH, init_database
+from life_os_agent.database.setup import DB_PATH, get_connection, init_database
+
+# Tabelas do schema, sem as internas do SQLite nem as tabelas-sombra do FTS5.
+_TABLES_SQL = r"""
+    SELECT name FROM sqlite_master AS t
+    WHERE type = 'table'
+      AND name NOT LIKE 'sqlite\_%' ESCAPE '\'
+      AND NOT EXISTS (
+          SELECT 1 FROM sqlite_master AS v
+          WHERE v.sql LIKE 'CREATE VIRTUAL TABLE%'
+            AND t.name LIKE v.name || '\_%' ESCAPE '\'
+      )
+    ORDER BY name
+"""
+
+
+def list_tables():
+    with get_connection() as conn:
+        return [row[0] for row in conn.execute(_TABLES_SQL)]
 
 
 def main():
@@ -16,11 +34,10 @@ def main():
 
     if result.get("status") == "ok":
         print("✅ Banco de dados criado com sucesso!")
+        print(f"   Versão do schema: {result['schema_version']}")
         print("\n📋 Tabelas criadas:")
-        print("   - users")
-        print("   - transactions")
-        print("   - budget_goals")
-        print("   - calendar_events")
+        for table in list_tables():
+            print(f"   - {table}")
     else:
         print("❌ Erro ao criar banco de dados")
         sys.exit(1)
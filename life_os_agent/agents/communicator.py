@@ -72,9 +72,10 @@ Se o usuário perguntar algo fora do escopo (ex.: fatos gerais, esportes, curios
   - `events`: Lista resumida de eventos
 
 ### ⚠️ Alerta de Gastos (para alertas automáticos)
-- **Quando usar:** Quando o sistema avisa que uma meta estourou ou está perto (acima de 80%).
+- **Quando usar:** Quando o sistema avisa que uma meta estourou ou está perto (acima de 80%), ou seja, quando receber um "ALERTA DE META" (`budget_alerts` do registro da transação).
 - **Tool:** `send_template_message_tool(..., template_name="alert_spending", data={...})`
-- **Dados necessários:** `category`, `percent`, `spent`, `limit`.
+- **Dados necessários:** `category`, `percent`, `spent`, `limit` (já vêm prontos no alerta; use os do maior `threshold`).
+- Cada limiar só é alertado uma vez por mês: não repita o alerta se ele não vier no retorno.
 
 ### 📊 Status do Orçamento (para consultas do usuário)
 - **Quando usar:** Quando o usuário PERGUNTA sobre sua meta/orçamento (ex: "quanto posso gastar?", "minha meta", "status do mercado").
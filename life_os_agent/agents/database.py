@@ -8,17 +8,25 @@ from life_os_agent.database.crud import (
     check_user_exists,
     delete_transaction,
     get_balance,
+    get_budget_alerts,
     get_budget_status,
     get_calendar_events,
+    get_current_calendar_events,
     get_event_by_google_id,
     get_expenses_by_category,
+    get_financial_snapshot,
     get_transactions,
+    get_transactions_page,
+    search_calendar_events,
+    search_transactions,
     set_budget_goal,
     update_transaction,
     update_user_last_interaction,
 )
+from life_os_agent.database.export import export_transactions
 from life_os_agent.database.setup import init_database
 from life_os_agent.tools.database.user_tools import get_or_create_user_tool
+from life_os_agent.tools.finance.statement_import import import_bank_statement
 
 DATABASE_INSTRUCTION = """
 Você é o DatabaseAgent do LifeOS.
@@ -30,10 +38,15 @@ Sua responsabilidade é executar operações no banco de dados SQLite.
 - `get_or_create_user_tool`: Verifica/cria usuário.
 
 ### Transações
-- `add_transaction`: Adiciona receita ou despesa.
+- `add_transaction`: Adiciona receita ou despesa. Para despesas de categoria com meta, retorna também `budget` (limit, spent, remaining, percent do mês) e `budget_alerts` (limiares da meta cruzados por ESTA transação).
 - `get_transactions`: Busca histórico de transações.
+- `get_transactions_page(user_id, page_size, cursor?)`: Histórico paginado. Para a próxima página, repita a chamada com o `next_cursor` retornado.
+- `search_transactions(user_id, query, transaction_type?, start_date?, end_date?)`: Busca por palavras da descrição, por relevância, e retorna também `matches` e `total`. Use para perguntas como "quanto gastei com uber?" (query="uber", transaction_type="expense").
 - `get_balance`: Busca o saldo atual.
 - `get_expenses_by_category`: Busca gastos agrupados por categoria.
+- `get_financial_snapshot(user_id, month?, recent_limit?)`: **Panorama do mês numa chamada só**: saldo geral, receitas/despesas do mês, gastos por categoria, status das metas e últimas transações. Use para "como estou esse mês?", resumos e "bom dia" em vez de chamar várias tools.
+- `export_transactions(user_id, file_format?, ...)`: Exporta o histórico (csv, jsonl, parquet, arrow) e retorna o caminho do arquivo.
+- `import_bank_statement(user_id, file_path, file_format?, sign_convention?)`: Importa um extrato CSV/OFX inteiro (classifica e ignora duplicadas). `file_path` é o nome do arquivo recebido no diretório de uploads.
 
 ### Metas de Orçamento
 - `set_budget_goal(user_id, category, monthly_limit)`: Define meta mensal para categoria.
@@ -43,11 +56,14 @@ Sua responsabilidade é executar operações no banco de dados SQLite.
   - spent: **SOMA ACUMULADA** de todas transações do mês
   - remaining: quanto ainda pode gastar
   - percentage: percentual já gasto
+- `get_budget_alerts(user_id, month?)`: Lista os alertas de meta já disparados no mês.
 
 ### Agenda
 - `add_calendar_log(user_id, google_event_id, action, event_summary)`: Registra ação de calendário.
 - `get_calendar_events(user_id, limit, action)`: Busca logs de eventos.
-- `get_event_by_google_id(user_id, google_event_id)`: Busca evento por ID do Google.
+- `get_event_by_google_id(user_id, google_event_id)`: Busca o estado atual (última ação) de um evento pelo ID do Google.
+- `get_current_calendar_events(user_id, action?, limit?)`: Estado atual de cada evento do usuário (sem action, omite os apagados). Use para "meus eventos criados" (action="created").
+- `search_calendar_events(user_id, query, action?, start_date?, end_date?)`: Busca eventos registrados pelo título (ex.: "reunião João"), sem consultar o Google.
 
 ## COMO AGIR
 1. Receba a instrução do Orchestrator/StrategistAgent.
@@ -58,6 +74,8 @@ Sua responsabilidade é executar operações no banco de dados SQLite.
 - Não invente dados.
 - AO VERIFICAR/CRIAR USUÁRIO: Retorne `is_new_user: True/False`.
 - AO CONSULTAR METAS: Use `get_budget_status` que já retorna a soma acumulada.
+- AO MONTAR RESUMOS/PANORAMA: Use `get_financial_snapshot` (uma chamada) em vez de `get_balance` + `get_budget_status` + `get_expenses_by_category` + `get_transactions`.
+- AO REGISTRAR DESPESA: Repasse `budget` e `budget_alerts` do retorno de `add_transaction` sem recalcular.
 """
 
 
@@ -78,15 +96,23 @@ def build_database_agent(model) -> LlmAgent:
             update_user_last_interaction,
             add_transaction,
             get_transactions,
+            get_transactions_page,
+            search_transactions,
             update_transaction,
             delete_transaction,
             get_balance,
             get_expenses_by_category,
+            get_financial_snapshot,
+            import_bank_statement,
+            export_transactions,
             set_budget_goal,
             get_budget_status,
+            get_budget_alerts,
             add_calendar_log,
             get_calendar_events,
+            get_current_calendar_events,
             get_event_by_google_id,
+            search_calendar_events,
             init_database,
         ],
     )
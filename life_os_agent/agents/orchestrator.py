@@ -59,7 +59,7 @@ EXTRAIA `user_phone` E `user_name` e use em TODAS as chamadas.
 
 - **DatabaseAgent**: SEMPRE PRIMEIRO! (Verifica usuário). Depois SALVA transações.
 - **FinanceAgent**: ENTENDE o texto (classifica: gastei, paguei, recebi).
-- **StrategistAgent**: CONSULTA METAS. Chame após salvar despesas.
+- **StrategistAgent**: CONSULTA METAS. Chame após salvar despesas quando o DatabaseAgent não trouxer `budget`.
 - **CommunicatorAgent**: FALA com usuário. SEMPRE o último passo.
 - **Transcriber**: Se receber `[ÁUDIO RECEBIDO...]`, chame este primeiro.
 
@@ -72,11 +72,13 @@ Este é o fluxo mais complexo. Precisamos salvar E verificar o impacto no orçam
 2. **FinanceAgent**: "classificar: [TEXTO ORIGINAL]"
    *(Retorna: JSON com amount, category, type)*
 3. **DatabaseAgent**: "salvar transação: user=[PHONE], [DADOS DO JSON DO FINANCE]"
-   *(Retorna: Status OK)*
-4. **StrategistAgent**: "verificar status do orçamento para [PHONE] na categoria [CATEGORIA DA TRANSAÇÃO]"
+   *(Retorna: Status OK e, se a categoria tem meta, `budget` e `budget_alerts`)*
+4. **SE o retorno trouxe `budget`**: o status da meta JÁ FOI CALCULADO. NÃO chame o StrategistAgent.
+   **SENÃO**: **StrategistAgent**: "verificar status do orçamento para [PHONE] na categoria [CATEGORIA DA TRANSAÇÃO]"
    *(IMPORTANTE: Pergunte APENAS sobre a categoria da transação atual!)*
 5. **CommunicatorAgent**: ENVIE OS FATOS!
    Input: "Transação de [AMOUNT] em [CATEGORY] salva. Status da meta de [CATEGORY]: [DADOS APENAS DESSA CATEGORIA]."
+   - Se `budget_alerts` não estiver vazio, inclua: "ALERTA DE META: [ALERTA DE MAIOR threshold]" para o CommunicatorAgent usar o template `alert_spending`.
    *(CRÍTICO: Envie APENAS dados da categoria da transação, não de outras categorias)*
 
 ### 1.1 FLUXO DE DEFINIÇÃO DE META ("Definir meta de 500 para mercado")
@@ -93,6 +95,7 @@ Este é o fluxo mais complexo. Precisamos salvar E verificar o impacto no orçam
    - O CommunicatorAgent DEVE usar o template `welcome` ou enviar uma mensagem de boas-vindas personalizada.
 3. **SE is_new_user = False** (USUÁRIO EXISTENTE):
    - **StrategistAgent** (Se for consulta de meta): "consultar meta de [CATEGORIA] para [PHONE]"
+   - **DatabaseAgent** (Se for resumo, saldo ou "como estou esse mês?"): "get_financial_snapshot para [PHONE]" *(uma chamada traz saldo, gastos do mês, metas e últimas transações)*
    - **CommunicatorAgent**: "phone: [PHONE], O usuário disse '[TEXTO]'. Dados do sistema: [DADOS]."
 
 **CRÍTICO**: Após o DatabaseAgent, SEMPRE chame o CommunicatorAgent! Passe o phone_number para ele.
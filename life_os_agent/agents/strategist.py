@@ -3,6 +3,11 @@ from __future__ import annotations
 from google.adk.agents import LlmAgent
 from google.adk.tools import agent_tool
 
+from life_os_agent.tools.finance.spending_analytics import (
+    get_spending_trends,
+    project_month_end_spending,
+)
+
 from .database import build_database_agent
 
 STRATEGIST_INSTRUCTION = """
@@ -42,6 +47,14 @@ Quando consultado sobre uma meta, retorne:
 - `get_balance(user_id)`: Saldo geral
 - `set_budget_goal(user_id, category, monthly_limit)`: Criar/atualizar meta
 
+## TENDÊNCIAS E PROJEÇÕES (tools próprias)
+
+- `get_spending_trends(user_id, category, months)`: Totais mensais, mês atual vs
+  mesmo período do mês anterior, médias/percentis semanais e diários
+- `project_month_end_spending(user_id, category)`: Projeção de fim de mês por
+  categoria, com `over_budget` quando a projeção passa da meta
+- Use-as para "Estou gastando mais que no mês passado?" e "Vou estourar a meta?"
+
 ## REGRAS
 
 - Metas são MENSAIS (sempre considere o mês atual)
@@ -66,6 +79,6 @@ def build_strategist_agent(model) -> LlmAgent:
         description="Agente responsável por verificar metas de orçamento e calcular quanto ainda pode gastar.",
         instruction=STRATEGIST_INSTRUCTION,
         before_agent_callback=_log_strategist_agent,
-        tools=[database_tool],
+        tools=[database_tool, get_spending_trends, project_month_end_spending],
         sub_agents=[database],
     )
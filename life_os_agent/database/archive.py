@@ -0,0 +1,389 @@
+"""
+Arquivamento do histórico antigo e compactação incremental do banco.
+
+Transações e logs de calendário mais antigos que LIFEOS_ARCHIVE_AFTER_DAYS
+são movidos, em blocos, para um arquivo ao lado do banco quente
+(`lifeos.archive.db`, ou `<shard>.archive.db` com shards). Cada bloco é
+copiado e depois apagado com a flag 'archiving' de `maintenance_flags`
+ligada: os triggers de delete não descontam os rollups, então saldos,
+metas e tendências continuam incluindo o histórico arquivado. As
+reconstruções de rollup (`rollups.py`) somam as duas bases, e as buscas de
+texto e a deduplicação de extratos (`crud.py`) também leem o arquivo morto.
+
+Depois do arquivamento, as páginas liberadas são devolvidas ao sistema com
+`PRAGMA incremental_vacuum` em passos pequenos. Bancos criados antes do
+`auto_vacuum = INCREMENTAL` precisam de um VACUUM completo, uma única vez
+(`--convert`), que bloqueia as escritas enquanto roda.
+
+Uso:
+    python -m life_os_agent.database.archive [--days 365] [--no-vacuum] [--convert]
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .setup import _connect, database_path, shard_paths
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("LIFEOS_ARCHIVE_AFTER_DAYS", "365"))
+VACUUM_STEP_PAGES = int(os.getenv("LIFEOS_VACUUM_STEP_PAGES", "256"))
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_PAUSE = 0.05
+
+ARCHIVE_SCHEMA = "archive"
+# Tabelas arquivadas e a coluna que define a idade de cada linha.
+ARCHIVED_TABLES = (("transactions", "ts"), ("calendar_events", "created_at"))
+
+
+def archive_path(path: Optional[str] = None) -> str:
+    """Arquivo morto correspondente ao banco `path` (padrão: o banco corrente)."""
+    base = Path(path or database_path())
+    return str(base.with_name(f"{base.stem}.archive{base.suffix}"))
+
+
+def archive_attached(cursor: sqlite3.Cursor) -> bool:
+    cursor.execute("PRAGMA database_list")
+    return any(row[1] == ARCHIVE_SCHEMA for row in cursor.fetchall())
+
+
+def attach_archive(conn: sqlite3.Connection, path: Optional[str] = None) -> bool:
+    """
+    Anexa o arquivo morto do banco como o schema `archive`, se ele existir.
+
+    Precisa ser chamado fora de uma transação. Retorna True quando o
+    arquivo está anexado.
+    """
+    if archive_attached(conn.cursor()):
+        return True
+    target = archive_path(path)
+    if not os.path.exists(target):
+        return False
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (target,))
+    return True
+
+
+def connect_archive_reader(
+    path: Optional[str] = None, table: str = "transactions"
+) -> Optional[sqlite3.Connection]:
+    """
+    Conexão em memória com o arquivo morto de `path` anexado, somente leitura.
+
+    Nomes sem schema resolvem para o arquivo morto e `temp` fica livre para
+    índices descartáveis (ex.: FTS das buscas). Retorna None quando o arquivo
+    ou a tabela não existem.
+    """
+    target = archive_path(path)
+    if not os.path.exists(target):
+        return None
+    conn = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}",
+        (f"{Path(target).resolve().as_uri()}?mode=ro",),
+    )
+    row = conn.execute(
+        f"SELECT 1 FROM {ARCHIVE_SCHEMA}.sqlite_master "
+        "WHERE type = 'table' AND name = ?",
+        (table,),
+    ).fetchone()
+    if row is None:
+        conn.close()
+        return None
+    return conn
+
+
+def history_source(
+    cursor: sqlite3.Cursor, columns: Iterable[str], table: str = "transactions"
+) -> str:
+    """
+    Origem SQL de `table` para reconstruções: só a tabela quente ou, com o
+    arquivo morto anexado (e já contendo a tabela), a união das duas bases.
+    """
+    if not archive_attached(cursor):
+        return table
+    cursor.execute(
+        f"SELECT 1 FROM {ARCHIVE_SCHEMA}.sqlite_master "
+        "WHERE type = 'table' AND name = ?",
+        (table,),
+    )
+    if cursor.fetchone() is None:
+        return table
+    selected = ", ".join(columns)
+    return (
+        f"(SELECT {selected} FROM main.{table} UNION ALL "
+        f"SELECT {selected} FROM {ARCHIVE_SCHEMA}.{table})"
+    )
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[tuple]:
+    return [
+        (row[1], row[2])
+        for row in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()
+    ]
+
+
+def _ensure_archive_table(conn: sqlite3.Connection, table: str) -> List[str]:
+    columns = [(name, kind) for name, kind in _columns(conn, "main", table)]
+    definitions = ", ".join(
+        "id INTEGER PRIMARY KEY" if name == "id" else f"{name} {kind}".strip()
+        for name, kind in columns
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table} "
+        f"({definitions}, archived_at INTEGER)"
+    )
+    # Colunas adicionadas ao banco quente depois da criação do arquivo.
+    existing = {name for name, _ in _columns(conn, ARCHIVE_SCHEMA, table)}
+    for name, kind in columns:
+        if name not in existing:
+            conn.execute(
+                f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {name} {kind}"
+            )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_{table}_user "
+        f"ON {table}(user_id)"
+    )
+    return [name for name, _ in columns]
+
+
+def _archive_table(
+    conn: sqlite3.Connection,
+    table: str,
+    condition: str,
+    cutoff: Any,
+    chunk_size: int,
+    pause: float,
+    progress: Optional[Callable[[Dict[str, Any]], None]],
+) -> int:
+    columns = ", ".join(_ensure_archive_table(conn, table))
+    copy = (
+        f"INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.{table} ({columns}, archived_at) "
+        f"SELECT {columns}, ? FROM main.{table} "
+        f"WHERE id >= ? AND id <= ? AND {condition}"
+    )
+    moved = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id FROM main.{table} WHERE id > ? AND {condition} "
+            f"ORDER BY id LIMIT ?",
+            (last_id, cutoff, chunk_size),
+        ).fetchall()
+        if not rows:
+            return moved
+        block = (int(time.time()), rows[0][0], rows[-1][0], cutoff)
+
+        # Em WAL, uma transação com arquivos anexados não é atômica entre
+        # eles; por isso o bloco é copiado e confirmado antes de ser apagado.
+        # Se o processo cair entre as duas, a próxima execução recopia.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(copy, block)
+            conn.execute("COMMIT")
+            conn.execute("BEGIN IMMEDIATE")
+            # Recopia: pega o que mudou no banco quente entre as transações.
+            conn.execute(copy, block)
+            conn.execute(
+                "INSERT INTO main.maintenance_flags (name) VALUES ('archiving')"
+            )
+            conn.execute(
+                f"DELETE FROM main.{table} WHERE id >= ? AND id <= ? AND {condition}",
+                block[1:],
+            )
+            conn.execute("DELETE FROM main.maintenance_flags WHERE name = 'archiving'")
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        moved += len(rows)
+        last_id = rows[-1][0]
+        if progress:
+            progress({"table": table, "rows": moved})
+        time.sleep(pause)
+
+
+def compact(
+    path: Optional[str] = None,
+    step_pages: int = VACUUM_STEP_PAGES,
+    pause: float = DEFAULT_PAUSE,
+    convert: bool = False,
+) -> Dict[str, Any]:
+    """
+    Devolve ao sistema as páginas livres do banco, em passos pequenos.
+
+    Args:
+        path: Arquivo a compactar (padrão: o banco corrente)
+        step_pages: Páginas liberadas por passo de `incremental_vacuum`
+        pause: Pausa em segundos entre os passos
+        convert: Permite o VACUUM completo que ativa `auto_vacuum = INCREMENTAL`
+            em bancos antigos
+
+    Returns:
+        Dicionário com freed_pages, page_count e bytes do arquivo.
+    """
+    path = path or database_path()
+    conn = _connect(path)
+    conn.isolation_level = None
+    try:
+        converted = False
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if not convert:
+                return {
+                    "status": "ok",
+                    "path": path,
+                    "incremental": False,
+                    "hint": "auto_vacuum desligado; rode uma vez com convert=True",
+                }
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            converted = True
+
+        initial_pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            # O pragma só libera as páginas à medida que o resultado é lido.
+            conn.execute(f"PRAGMA incremental_vacuum({step_pages})").fetchall()
+            time.sleep(pause)
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+
+        return {
+            "status": "ok",
+            "path": path,
+            "incremental": True,
+            "converted": converted,
+            "freed_pages": initial_pages - page_count,
+            "page_count": page_count,
+            "bytes": os.path.getsize(path),
+        }
+    except sqlite3.OperationalError as e:
+        return {"status": "error", "path": path, "error": str(e)}
+    finally:
+        conn.close()
+
+
+def archive_old_rows(
+    days: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE,
+    vacuum: bool = True,
+    convert: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    paths: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Move para o arquivo morto as linhas mais antigas que `days` dias.
+
+    Args:
+        days: Horizonte de retenção (padrão: LIFEOS_ARCHIVE_AFTER_DAYS)
+        chunk_size: Linhas movidas por transação
+        pause: Pausa em segundos entre os blocos
+        vacuum: Compacta o banco quente depois de arquivar
+        convert: Permite o VACUUM completo em bancos sem auto_vacuum incremental
+        progress: Callback chamado a cada bloco movido
+        paths: Bancos a arquivar (opcional, padrão: todos os shards)
+
+    Returns:
+        Dicionário com o corte usado e, por arquivo, as linhas movidas por
+        tabela e o resultado da compactação.
+    """
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    if days < 1:
+        return {"status": "error", "error": f"Horizonte inválido: {days} dias"}
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    # transactions.ts é epoch UTC; calendar_events.created_at, texto UTC do SQLite.
+    conditions = {
+        "transactions": ("ts > 0 AND ts < ?", int(cutoff.timestamp())),
+        "calendar_events": (
+            "created_at < ?",
+            cutoff.strftime("%Y-%m-%d %H:%M:%S"),
+        ),
+    }
+
+    started = time.perf_counter()
+    shards = []
+    for path in paths or shard_paths():
+        conn = _connect(path)
+        conn.isolation_level = None
+        try:
+            conn.execute(
+                f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path(path),)
+            )
+            moved = {
+                table: _archive_table(
+                    conn, table, *conditions[table], chunk_size, pause, progress
+                )
+                for table, _ in ARCHIVED_TABLES
+            }
+        finally:
+            conn.close()
+
+        shard: Dict[str, Any] = {
+            "path": path,
+            "archive_path": archive_path(path),
+            "archived": moved,
+        }
+        if vacuum:
+            shard["compaction"] = compact(path, pause=pause, convert=convert)
+        shards.append(shard)
+
+    return {
+        "status": "ok",
+        "cutoff": cutoff.isoformat(timespec="seconds"),
+        "shards": shards,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Arquiva o histórico antigo do LifeOS e compacta o banco."
+    )
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+    parser.add_argument(
+        "--no-vacuum", action="store_true", help="Não compacta depois de arquivar"
+    )
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help="Ativa auto_vacuum incremental em bancos antigos (VACUUM completo)",
+    )
+    args = parser.parse_args()
+
+    result = archive_old_rows(
+        days=args.days,
+        chunk_size=args.chunk_size,
+        pause=args.pause,
+        vacuum=not args.no_vacuum,
+        convert=args.convert,
+        progress=lambda p: print(f"   ... {p['table']}: {p['rows']} linhas"),
+    )
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+
+    print(f"📦 Arquivado tudo antes de {result['cutoff']}")
+    for shard in result["shards"]:
+        print(f"   {shard['path']}: {shard['archived']}")
+        compaction = shard.get("compaction")
+        if compaction is None:
+            continue
+        if compaction["status"] != "ok":
+            print(f"   ❌ Compactação: {compaction['error']}")
+        elif not compaction["incremental"]:
+            print(f"   ⚠️  {compaction['hint']} (--convert)")
+        else:
+            print(
+                f"   🧹 {compaction['freed_pages']} páginas liberadas, "
+                f"{compaction['bytes']} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Fachada assíncrona sobre `crud`.
+
+Cada função tem o mesmo nome, argumentos e retorno da versão síncrona,
+mas roda num executor dedicado e limitado (LIFEOS_DB_WORKERS threads).
+Cada thread do executor mantém as próprias conexões de escrita abertas e as
+leituras usam o pool somente leitura de `setup`, então consultas
+concorrentes não bloqueiam o event loop nem reabrem o banco.
+
+Uso:
+    from life_os_agent.database import async_crud
+
+    user, balance = await asyncio.gather(
+        async_crud.get_user(number), async_crud.get_balance(number)
+    )
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from . import crud
+from .setup import pin_connection
+
+T = TypeVar("T")
+
+DB_WORKERS = int(os.getenv("LIFEOS_DB_WORKERS", "4"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pinned: List[Dict[str, sqlite3.Connection]] = []
+
+
+def _init_worker() -> None:
+    connections = pin_connection()
+    with _executor_lock:
+        _pinned.append(connections)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DB_WORKERS,
+                thread_name_prefix="lifeos-db",
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+async def run_in_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa uma função bloqueante de banco no executor dedicado."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def shutdown(wait: bool = True) -> None:
+    """Encerra o executor e fecha as conexões fixadas em suas threads."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is None:
+        return
+    executor.shutdown(wait=wait)
+    with _executor_lock:
+        pinned = _pinned[:]
+        _pinned.clear()
+    for connections in pinned:
+        for conn in connections.values():
+            conn.close()
+
+
+def _make_async(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_in_db(func, *args, **kwargs)
+
+    return wrapper
+
+
+# Usuários
+create_user = _make_async(crud.create_user)
+get_user = _make_async(crud.get_user)
+check_user_exists = _make_async(crud.check_user_exists)
+update_user_last_interaction = _make_async(crud.update_user_last_interaction)
+update_user = _make_async(crud.update_user)
+get_or_create_user = _make_async(crud.get_or_create_user)
+
+# Transações
+add_transaction = _make_async(crud.add_transaction)
+add_transactions_batch = _make_async(crud.add_transactions_batch)
+get_transactions = _make_async(crud.get_transactions)
+get_transactions_page = _make_async(crud.get_transactions_page)
+search_transactions = _make_async(crud.search_transactions)
+get_balance = _make_async(crud.get_balance)
+get_expenses_by_category = _make_async(crud.get_expenses_by_category)
+get_daily_totals = _make_async(crud.get_daily_totals)
+update_transaction = _make_async(crud.update_transaction)
+delete_transaction = _make_async(crud.delete_transaction)
+
+# Orçamentos
+set_budget_goal = _make_async(crud.set_budget_goal)
+get_budget_goals = _make_async(crud.get_budget_goals)
+get_budget_status = _make_async(crud.get_budget_status)
+get_budget_alerts = _make_async(crud.get_budget_alerts)
+get_financial_snapshot = _make_async(crud.get_financial_snapshot)
+delete_budget_goal = _make_async(crud.delete_budget_goal)
+
+# Calendário
+add_calendar_log = _make_async(crud.add_calendar_log)
+get_calendar_events = _make_async(crud.get_calendar_events)
+get_event_by_google_id = _make_async(crud.get_event_by_google_id)
+get_current_calendar_events = _make_async(crud.get_current_calendar_events)
+search_calendar_events = _make_async(crud.search_calendar_events)
+delete_calendar_event_log = _make_async(crud.delete_calendar_event_log)
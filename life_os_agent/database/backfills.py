@@ -0,0 +1,208 @@
+"""
+Backfills online: convertem linhas existentes em blocos pequenos.
+
+Cada bloco roda na sua própria transação curta e há uma pausa entre os
+blocos, então o lock de escrita nunca fica preso por muito tempo e o
+agente continua gravando normalmente durante a conversão.
+
+Uso:
+    python -m life_os_agent.database.backfills [--chunk-size 1000] [--pause 0.05]
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .money import to_cents
+from .setup import get_connection, shard_paths, using_database
+from .timestamps import DEFAULT_TIMEZONE, normalize_timestamp
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PAUSE = 0.05
+
+
+def backfill_amount_cents(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Preenche `transactions.amount_cents` a partir do `amount` REAL legado."""
+    converted = 0
+    last_id = 0
+    started = time.perf_counter()
+
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id, amount FROM transactions
+                   WHERE id > ? AND amount_cents IS NULL
+                   ORDER BY id LIMIT ?""",
+                (last_id, chunk_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                "UPDATE transactions SET amount_cents = ? WHERE id = ? AND amount_cents IS NULL",
+                [(to_cents(row["amount"]), row["id"]) for row in rows],
+            )
+            converted += len(rows)
+            last_id = rows[-1]["id"]
+
+        if progress:
+            progress(
+                {"backfill": "amount_cents", "rows": converted, "last_id": last_id}
+            )
+        time.sleep(pause)
+
+    return {
+        "status": "ok",
+        "backfill": "amount_cents",
+        "rows": converted,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def backfill_transaction_ts(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Preenche `ts`/`tz` e normaliza `date` para o horário local do usuário.
+
+    Datas sem offset são interpretadas no fuso do usuário; datas que não
+    são ISO válidas ficam com ts = 0 e são contadas em `invalid`.
+    """
+    converted = 0
+    invalid = 0
+    last_id = 0
+    started = time.perf_counter()
+
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT t.id, t.date, COALESCE(u.timezone, ?) AS timezone
+                   FROM transactions t
+                   LEFT JOIN users u ON u.whatsapp_number = t.user_id
+                   WHERE t.id > ? AND t.ts IS NULL
+                   ORDER BY t.id LIMIT ?""",
+                (DEFAULT_TIMEZONE, last_id, chunk_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for row in rows:
+                value = str(row["date"] or "")
+                try:
+                    # Datas curtas virariam "agora" em normalize_timestamp.
+                    if len(value) < 10:
+                        raise ValueError(value)
+                    local, ts = normalize_timestamp(value, row["timezone"])
+                except ValueError:
+                    local, ts = row["date"], 0
+                    invalid += 1
+                updates.append((local, ts, row["timezone"], row["id"]))
+
+            cursor.executemany(
+                "UPDATE transactions SET date = ?, ts = ?, tz = ? WHERE id = ? AND ts IS NULL",
+                updates,
+            )
+            converted += len(rows)
+            last_id = rows[-1]["id"]
+
+        if progress:
+            progress({"backfill": "ts", "rows": converted, "last_id": last_id})
+        time.sleep(pause)
+
+    return {
+        "status": "ok",
+        "backfill": "ts",
+        "rows": converted,
+        "invalid": invalid,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def backfill_category_ids(
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Preenche `transactions.category_id` pelo nome da categoria."""
+    converted = 0
+    last_id = 0
+    started = time.perf_counter()
+
+    while True:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT id FROM transactions
+                   WHERE id > ? AND category_id IS NULL
+                   ORDER BY id LIMIT ?""",
+                (last_id, chunk_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            block = (rows[0]["id"], rows[-1]["id"])
+            # Nomes gravados depois do passo de schema ainda não têm id.
+            cursor.execute(
+                """INSERT OR IGNORE INTO categories (name)
+                   SELECT DISTINCT category FROM transactions
+                   WHERE id BETWEEN ? AND ? AND category_id IS NULL""",
+                block,
+            )
+            cursor.execute(
+                """UPDATE transactions
+                   SET category_id = (
+                       SELECT id FROM categories WHERE name = transactions.category
+                   )
+                   WHERE id BETWEEN ? AND ? AND category_id IS NULL""",
+                block,
+            )
+            converted += cursor.rowcount
+            last_id = block[1]
+
+        if progress:
+            progress({"backfill": "category_id", "rows": converted, "last_id": last_id})
+        time.sleep(pause)
+
+    return {
+        "status": "ok",
+        "backfill": "category_id",
+        "rows": converted,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa os backfills do LifeOS.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+    args = parser.parse_args()
+
+    def report(progress: Dict[str, Any]) -> None:
+        print(f"   ... {progress['rows']} linhas convertidas")
+
+    for path in shard_paths():
+        with using_database(path):
+            for backfill in (
+                backfill_amount_cents,
+                backfill_transaction_ts,
+                backfill_category_ids,
+            ):
+                print(
+                    backfill(
+                        chunk_size=args.chunk_size, pause=args.pause, progress=report
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
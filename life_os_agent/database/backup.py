@@ -0,0 +1,433 @@
+"""
+Backup online e snapshots do SQLite.
+
+Cada snapshot copia todos os shards, e o arquivo morto de cada um, pela
+API de backup do SQLite em passos de LIFEOS_BACKUP_STEP_PAGES páginas, com
+uma pausa entre os passos. Em WAL, a cópia lê um snapshot fixo do banco:
+o resultado corresponde a um único instante, não recomeça quando o agente
+grava no meio e não bloqueia os escritores (o WAL só não é checkpointado
+além desse instante até o fim da cópia). Bancos ainda em rollback journal
+seguram um lock compartilhado a cada passo; esse é o tempo reportado em
+`writer_pause_ms`. Shards diferentes são copiados um depois do outro, então
+cada arquivo tem o seu próprio instante.
+
+Os snapshots ficam em LIFEOS_BACKUP_DIR (padrão: `backups/` ao lado do
+banco), um diretório por snapshot com um `manifest.json`, e só os
+LIFEOS_BACKUP_KEEP mais recentes são mantidos. A restauração grava o
+snapshot por cima dos arquivos atuais, também pela API de backup, depois
+de guardar um snapshot do estado atual. Prefira restaurar com o agente
+parado: as escritas esperam durante a cópia e o que for gravado depois do
+snapshot de segurança se perde.
+
+Uso:
+    python -m life_os_agent.database.backup snapshot [--keep 7]
+    python -m life_os_agent.database.backup schedule --interval 86400
+    python -m life_os_agent.database.backup list
+    python -m life_os_agent.database.backup restore <snapshot>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .archive import archive_path
+from .migrations import migrate
+from .setup import (
+    DB_PATH,
+    SHARD_COUNT,
+    _connect,
+    close_read_connections,
+    shard_paths,
+)
+
+BACKUP_DIR = os.getenv("LIFEOS_BACKUP_DIR", str(Path(DB_PATH).parent / "backups"))
+BACKUP_KEEP = int(os.getenv("LIFEOS_BACKUP_KEEP", "7"))
+BACKUP_STEP_PAGES = int(os.getenv("LIFEOS_BACKUP_STEP_PAGES", "256"))
+DEFAULT_PAUSE = 0.05
+DEFAULT_INTERVAL = 86400
+
+MANIFEST = "manifest.json"
+# Diretório em construção: fica de fora da listagem e da rotação.
+PARTIAL_SUFFIX = ".partial"
+
+
+def _database_files() -> List[str]:
+    """Arquivos que compõem o banco: cada shard e, se existir, seu arquivo morto."""
+    files = []
+    for path in shard_paths():
+        files.append(path)
+        if os.path.exists(archive_path(path)):
+            files.append(archive_path(path))
+    return files
+
+
+def _copy_database(
+    source_path: str,
+    target_path: str,
+    step_pages: int,
+    pause: float,
+    progress: Optional[Callable[[Dict[str, Any]], None]],
+) -> Dict[str, Any]:
+    source = _connect(source_path)
+    source.isolation_level = None
+    target = sqlite3.connect(target_path)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if wal:
+            # A transação de leitura fixa o snapshot durante todos os passos.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        steps: List[float] = []
+        step_started = time.perf_counter()
+
+        def on_step(status: int, remaining: int, pages: int) -> None:
+            nonlocal step_started
+            steps.append(time.perf_counter() - step_started)
+            if progress:
+                progress(
+                    {"path": source_path, "remaining": remaining, "pages": pages}
+                )
+            if remaining:
+                time.sleep(pause)
+            step_started = time.perf_counter()
+
+        source.backup(target, pages=step_pages, progress=on_step)
+        if wal:
+            source.execute("COMMIT")
+
+        # O snapshot vira um arquivo único, sem -wal ao lado.
+        target.execute("PRAGMA journal_mode = DELETE")
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+        lock_ms = [round(step * 1000, 3) for step in steps]
+        return {
+            "name": Path(source_path).name,
+            "pages": target.execute("PRAGMA page_count").fetchone()[0],
+            "schema_version": target.execute("PRAGMA user_version").fetchone()[0],
+            "steps": len(steps),
+            "quick_check": check,
+            "wal_snapshot": wal,
+            "writer_pause_ms": 0.0 if wal else round(sum(lock_ms), 3),
+            "max_step_ms": max(lock_ms, default=0.0),
+        }
+    finally:
+        target.close()
+        source.close()
+
+
+def list_snapshots(backup_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Snapshots completos em `backup_dir`, do mais recente para o mais antigo."""
+    root = Path(backup_dir or BACKUP_DIR)
+    if not root.is_dir():
+        return []
+    snapshots = []
+    for manifest in root.glob(f"*/{MANIFEST}"):
+        if manifest.parent.name.endswith(PARTIAL_SUFFIX):
+            continue
+        info = json.loads(manifest.read_text(encoding="utf-8"))
+        snapshots.append({**info, "path": str(manifest.parent)})
+    return sorted(snapshots, key=lambda info: info["created_at"], reverse=True)
+
+
+def rotate_snapshots(
+    keep: int = BACKUP_KEEP, backup_dir: Optional[str] = None
+) -> List[str]:
+    """Apaga os snapshots além dos `keep` mais recentes; retorna os removidos."""
+    removed = []
+    for info in list_snapshots(backup_dir)[max(1, keep):]:
+        shutil.rmtree(info["path"])
+        removed.append(info["path"])
+    return removed
+
+
+def create_snapshot(
+    label: Optional[str] = None,
+    keep: Optional[int] = BACKUP_KEEP,
+    step_pages: int = BACKUP_STEP_PAGES,
+    pause: float = DEFAULT_PAUSE,
+    backup_dir: Optional[str] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Copia o banco inteiro para um novo snapshot, sem parar o agente.
+
+    Args:
+        label: Sufixo opcional do nome do snapshot (ex.: "pre-restore")
+        keep: Snapshots mantidos depois deste (None desliga a rotação)
+        step_pages: Páginas copiadas por passo da API de backup
+        pause: Pausa em segundos entre os passos
+        backup_dir: Diretório dos snapshots (padrão: LIFEOS_BACKUP_DIR)
+        progress: Callback chamado a cada passo copiado
+
+    Returns:
+        Dicionário com o diretório do snapshot, os arquivos copiados, o tempo
+        total em que os escritores ficaram parados e os snapshots removidos.
+    """
+    files = [path for path in _database_files() if os.path.exists(path)]
+    if not files:
+        return {"status": "error", "error": "Nenhum banco para copiar"}
+
+    created_at = datetime.now(timezone.utc)
+    name = created_at.strftime("%Y%m%dT%H%M%S.%fZ")
+    if label:
+        name = f"{name}-{label}"
+    root = Path(backup_dir or BACKUP_DIR)
+    partial = root / f"{name}{PARTIAL_SUFFIX}"
+    partial.mkdir(parents=True)
+
+    started = time.perf_counter()
+    copied = []
+    try:
+        for path in files:
+            copied.append(
+                _copy_database(
+                    path, str(partial / Path(path).name), step_pages, pause, progress
+                )
+            )
+    except (sqlite3.Error, OSError) as e:
+        shutil.rmtree(partial, ignore_errors=True)
+        return {"status": "error", "error": str(e)}
+
+    corrupted = [file["name"] for file in copied if file["quick_check"] != "ok"]
+    if corrupted:
+        shutil.rmtree(partial, ignore_errors=True)
+        return {"status": "error", "error": f"Cópia inconsistente: {corrupted}"}
+
+    manifest = {
+        "name": name,
+        "created_at": created_at.isoformat(),
+        "shards": SHARD_COUNT,
+        "files": copied,
+        "bytes": sum((partial / file["name"]).stat().st_size for file in copied),
+        "writer_pause_ms": round(sum(file["writer_pause_ms"] for file in copied), 3),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    (partial / MANIFEST).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    path = partial.rename(root / name)
+
+    removed = rotate_snapshots(keep, str(root)) if keep is not None else []
+    return {"status": "ok", **manifest, "path": str(path), "removed": removed}
+
+
+def restore_snapshot(
+    snapshot: str,
+    safety_snapshot: bool = True,
+    backup_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Restaura um snapshot por cima do banco atual.
+
+    Args:
+        snapshot: Nome ou caminho do diretório do snapshot
+        safety_snapshot: Guarda antes um snapshot do estado atual
+        backup_dir: Diretório dos snapshots (padrão: LIFEOS_BACKUP_DIR)
+
+    Returns:
+        Dicionário com os arquivos restaurados, o snapshot de segurança e o
+        tempo em que os escritores ficaram parados durante a cópia.
+    """
+    source = Path(snapshot)
+    if not source.is_dir():
+        source = Path(backup_dir or BACKUP_DIR) / snapshot
+    manifest_path = source / MANIFEST
+    if not manifest_path.exists():
+        return {"status": "error", "error": f"Snapshot não encontrado: {snapshot}"}
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest["shards"] != SHARD_COUNT:
+        return {
+            "status": "error",
+            "error": (
+                f"Snapshot com {manifest['shards']} shards; "
+                f"defina LIFEOS_DB_SHARDS={manifest['shards']} para restaurá-lo"
+            ),
+        }
+
+    safety = None
+    if safety_snapshot and any(os.path.exists(path) for path in _database_files()):
+        # Sem rotação: ela poderia apagar justamente o snapshot a restaurar.
+        safety = create_snapshot(
+            label="pre-restore", keep=None, backup_dir=backup_dir
+        )
+        if safety["status"] != "ok":
+            return safety
+
+    started = time.perf_counter()
+    names = {file["name"] for file in manifest["files"]}
+    restored = []
+    for path in shard_paths():
+        for target in (path, archive_path(path)):
+            name = Path(target).name
+            if name not in names:
+                # Um arquivo morto mais novo que o snapshot duplicaria o histórico.
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            restored.append(
+                _restore_file(str(source / name), target, wal=target == path)
+            )
+
+    # As conexões ociosas do pool não devem sobreviver à troca do conteúdo.
+    close_read_connections()
+    migration = migrate(paths=shard_paths(), pause=0)
+    if migration["status"] != "ok":
+        return migration
+
+    return {
+        "status": "ok",
+        "snapshot": manifest["name"],
+        "created_at": manifest["created_at"],
+        "restored": restored,
+        "safety_snapshot": safety["path"] if safety else None,
+        "writer_pause_ms": round(sum(file["writer_pause_ms"] for file in restored), 3),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _restore_file(source_path: str, target_path: str, wal: bool) -> Dict[str, Any]:
+    source = sqlite3.connect(
+        f"{Path(source_path).resolve().as_uri()}?mode=ro", uri=True
+    )
+    target = _connect(target_path)
+    try:
+        # Um passo só: o destino troca de conteúdo de uma vez, sob lock exclusivo.
+        started = time.perf_counter()
+        source.backup(target)
+        paused = time.perf_counter() - started
+        if wal:
+            target.execute("PRAGMA journal_mode = WAL")
+        return {
+            "path": target_path,
+            "pages": target.execute("PRAGMA page_count").fetchone()[0],
+            "writer_pause_ms": round(paused * 1000, 3),
+        }
+    finally:
+        target.close()
+        source.close()
+
+
+def run_schedule(
+    interval: float = DEFAULT_INTERVAL,
+    keep: int = BACKUP_KEEP,
+    step_pages: int = BACKUP_STEP_PAGES,
+    pause: float = DEFAULT_PAUSE,
+    backup_dir: Optional[str] = None,
+    on_snapshot: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> None:
+    """Cria um snapshot a cada `interval` segundos, com rotação, até ser parado."""
+    while True:
+        started = time.monotonic()
+        result = create_snapshot(
+            keep=keep, step_pages=step_pages, pause=pause, backup_dir=backup_dir
+        )
+        if on_snapshot:
+            on_snapshot(result)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def _print_snapshot(result: Dict[str, Any]) -> None:
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        return
+    print(
+        f"💾 Snapshot {result['name']}: {len(result['files'])} arquivos, "
+        f"{result['bytes']} bytes em {result['elapsed_seconds']}s"
+    )
+    print(f"   Escritores parados: {result['writer_pause_ms']} ms")
+    for path in result["removed"]:
+        print(f"   🗑️  Removido {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backup online, snapshots e restauração do banco do LifeOS."
+    )
+    parser.add_argument("--dir", default=BACKUP_DIR, help="Diretório dos snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (
+        ("snapshot", "Cria um snapshot agora"),
+        ("schedule", "Cria snapshots periodicamente"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--keep", type=int, default=BACKUP_KEEP)
+        command.add_argument("--step-pages", type=int, default=BACKUP_STEP_PAGES)
+        command.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+        if name == "schedule":
+            command.add_argument(
+                "--interval",
+                type=float,
+                default=DEFAULT_INTERVAL,
+                help="Segundos entre snapshots",
+            )
+
+    commands.add_parser("list", help="Lista os snapshots")
+
+    restore = commands.add_parser("restore", help="Restaura um snapshot")
+    restore.add_argument("snapshot", help="Nome ou caminho do snapshot")
+    restore.add_argument(
+        "--no-safety-snapshot",
+        action="store_true",
+        help="Não guarda o estado atual antes de restaurar",
+    )
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        result = create_snapshot(
+            keep=args.keep,
+            step_pages=args.step_pages,
+            pause=args.pause,
+            backup_dir=args.dir,
+        )
+        _print_snapshot(result)
+        if result["status"] != "ok":
+            raise SystemExit(1)
+
+    elif args.command == "schedule":
+        print(f"⏰ Snapshot a cada {args.interval}s, mantendo {args.keep}")
+        try:
+            run_schedule(
+                interval=args.interval,
+                keep=args.keep,
+                step_pages=args.step_pages,
+                pause=args.pause,
+                backup_dir=args.dir,
+                on_snapshot=_print_snapshot,
+            )
+        except KeyboardInterrupt:
+            pass
+
+    elif args.command == "list":
+        snapshots = list_snapshots(args.dir)
+        if not snapshots:
+            print("Nenhum snapshot encontrado.")
+        for info in snapshots:
+            print(
+                f"   {info['name']}: {len(info['files'])} arquivos, "
+                f"{info['bytes']} bytes"
+            )
+
+    else:
+        result = restore_snapshot(
+            args.snapshot,
+            safety_snapshot=not args.no_safety_snapshot,
+            backup_dir=args.dir,
+        )
+        if result["status"] != "ok":
+            print(f"❌ {result['error']}")
+            raise SystemExit(1)
+        print(f"✅ Restaurado {result['snapshot']} ({result['created_at']})")
+        print(f"   Escritores parados: {result['writer_pause_ms']} ms")
+        if result["safety_snapshot"]:
+            print(f"   Estado anterior salvo em {result['safety_snapshot']}")
+
+
+if __name__ == "__main__":
+    main()
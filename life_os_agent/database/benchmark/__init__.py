@@ -0,0 +1 @@
+# LifeOS Database Benchmark
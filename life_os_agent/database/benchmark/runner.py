@@ -0,0 +1,488 @@
+"""
+Benchmark das funções públicas de `crud`.
+
+Para cada tamanho de base, um processo novo gera os dados sintéticos num
+banco temporário (ver `synthetic.py`) e mede cada função em cada nível de
+concorrência (threads chamando a API síncrona, como o executor de
+`async_crud`). O relatório em JSON traz commit, versões e, por
+(tamanho, concorrência, função), as latências p50/p95/p99 e a vazão, e
+pode ser comparado com o de outro commit.
+
+Uso:
+    python -m life_os_agent.database.benchmark run [--sizes 1000,10000]
+        [--concurrency 1,4] [--calls 200]
+    python -m life_os_agent.database.benchmark compare BASE.json NOVO.json
+        [--metric p50_ms] [--threshold 10]
+    python -m life_os_agent.database.benchmark generate [--transactions N]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+BENCHMARK_DIR = os.getenv("LIFEOS_BENCHMARK_DIR", "db_benchmarks")
+REPORT_VERSION = 1
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_CONCURRENCY = (1, 4, 8)
+
+# Funções medidas, na ordem do relatório.
+OPERATIONS = (
+    "get_or_create_user",
+    "add_transaction",
+    "get_transactions",
+    "get_balance",
+    "get_budget_status",
+    "get_expenses_by_category",
+    "add_calendar_log",
+    "get_calendar_events",
+    "get_event_by_google_id",
+    "get_current_calendar_events",
+)
+
+
+def _operations(config: Dict[str, Any]) -> Dict[str, Callable[[random.Random], Any]]:
+    """Uma chamada de cada função, com argumentos sorteados do conjunto gerado."""
+    from .. import crud
+    from .synthetic import sample_category, sample_event, sample_user
+
+    users, skew = config["users"], config["skew"]
+    events = config["events_per_user"]
+
+    def user(rng: random.Random) -> str:
+        return sample_user(rng, users)[1]
+
+    def add_calendar_log(rng: random.Random) -> Any:
+        index, user_id = sample_user(rng, users)
+        event_id = sample_event(rng, index, events) or "bench-new"
+        return crud.add_calendar_log(user_id, event_id, "updated", "Evento")
+
+    def get_event_by_google_id(rng: random.Random) -> Any:
+        index, user_id = sample_user(rng, users)
+        return crud.get_event_by_google_id(
+            user_id, sample_event(rng, index, events) or "bench-new"
+        )
+
+    operations: Dict[str, Callable[[random.Random], Any]] = {
+        "get_or_create_user": lambda rng: crud.get_or_create_user(user(rng)),
+        "add_transaction": lambda rng: crud.add_transaction(
+            user(rng),
+            "benchmark",
+            round(rng.uniform(1, 200), 2),
+            sample_category(rng, skew),
+            "expense",
+        ),
+        "get_transactions": lambda rng: crud.get_transactions(user(rng), limit=50),
+        "get_balance": lambda rng: crud.get_balance(user(rng)),
+        "get_budget_status": lambda rng: crud.get_budget_status(user(rng)),
+        "get_expenses_by_category": lambda rng: crud.get_expenses_by_category(
+            user(rng)
+        ),
+        "add_calendar_log": add_calendar_log,
+        "get_calendar_events": lambda rng: crud.get_calendar_events(user(rng)),
+        "get_event_by_google_id": get_event_by_google_id,
+        "get_current_calendar_events": lambda rng: crud.get_current_calendar_events(
+            user(rng)
+        ),
+    }
+    return {name: operations[name] for name in config["operations"]}
+
+
+def _percentile(ordered: Sequence[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * percent / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    calls = len(ordered)
+    return {
+        "calls": calls,
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / calls * 1000, 4) if calls else 0.0,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if calls else 0.0,
+        "ops_per_sec": round(calls / wall, 1) if wall > 0 else 0.0,
+    }
+
+
+def _measure(
+    operation: Callable[[random.Random], Any],
+    calls: int,
+    concurrency: int,
+    seed: int,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    per_worker = max(1, calls // concurrency)
+
+    def worker(number: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed * 1000 + number)
+        local: List[float] = []
+        failed = 0
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            try:
+                result = operation(rng)
+            except sqlite3.Error:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - started)
+            if isinstance(result, dict) and result.get("status") == "error":
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return _summarize(latencies, errors, time.perf_counter() - started)
+
+
+def _run_size(size: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Roda num processo próprio, com DB_PATH já apontando para o banco novo."""
+    from .. import crud
+    from ..setup import close_read_connections, database_path, init_database
+    from .synthetic import generate_dataset
+
+    init_database()
+    dataset = generate_dataset(
+        transactions=size,
+        users=config["users"],
+        years=config["years"],
+        skew=config["skew"],
+        goals_per_user=config["goals_per_user"],
+        events_per_user=config["events_per_user"],
+        seed=config["seed"],
+    )
+    dataset["database_bytes"] = os.path.getsize(database_path())
+
+    operations = _operations(config)
+    results: List[Dict[str, Any]] = []
+    for concurrency in config["concurrency"]:
+        for name, operation in operations.items():
+            # Aquecimento: cache de usuários, pool de leitura e páginas do SQLite.
+            _measure(operation, min(20, config["calls"]), 1, config["seed"])
+            row = {"size": size, "concurrency": concurrency, "function": name}
+            row.update(
+                _measure(operation, config["calls"], concurrency, config["seed"])
+            )
+            results.append(row)
+
+    crud.flush_interactions()
+    close_read_connections()
+    return {"dataset": dataset, "results": results}
+
+
+@contextmanager
+def _environment(**values: str) -> Iterator[None]:
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    concurrency: Sequence[int] = DEFAULT_CONCURRENCY,
+    calls: int = 200,
+    users: int = 10,
+    years: float = 2.0,
+    skew: float = 1.1,
+    goals_per_user: int = 3,
+    events_per_user: int = 50,
+    seed: int = 42,
+    operations: Optional[Sequence[str]] = None,
+    output: Optional[str] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Mede as funções de `crud` em cada tamanho de base e nível de concorrência.
+
+    Args:
+        sizes: Números de transações das bases geradas
+        concurrency: Números de threads chamando as funções ao mesmo tempo
+        calls: Chamadas medidas por função, em cada nível de concorrência
+        users, years, skew, goals_per_user, events_per_user, seed: Parâmetros
+            do gerador sintético (ver `synthetic.generate_dataset`)
+        operations: Funções medidas (padrão: todas de OPERATIONS)
+        output: Caminho do relatório JSON (padrão:
+            LIFEOS_BENCHMARK_DIR/<commit>-<data>.json)
+        progress: Callback chamado ao fim de cada tamanho
+
+    Returns:
+        O relatório, com `path` do arquivo gravado.
+    """
+    unknown = sorted(set(operations or ()) - set(OPERATIONS))
+    if unknown:
+        return {"status": "error", "error": f"unknown operations: {unknown}"}
+
+    config = {
+        "sizes": list(sizes),
+        "concurrency": list(concurrency),
+        "calls": calls,
+        "users": users,
+        "years": years,
+        "skew": skew,
+        "goals_per_user": goals_per_user,
+        "events_per_user": events_per_user,
+        "seed": seed,
+        "operations": list(operations or OPERATIONS),
+    }
+    commit = _git_commit()
+    report: Dict[str, Any] = {
+        "status": "ok",
+        "version": REPORT_VERSION,
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "config": config,
+        "datasets": [],
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="lifeos-bench-") as directory:
+        for size in sizes:
+            path = str(Path(directory) / f"bench-{size}.db")
+            # Processo novo por tamanho: DB_PATH é lido na importação de `setup`
+            # e nenhum cache ou pool de conexões passa de uma base para outra.
+            with _environment(DB_PATH=path, LIFEOS_DB_SHARDS="1"):
+                with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                    measured = pool.submit(_run_size, size, config).result()
+            report["datasets"].append({"size": size, **measured["dataset"]})
+            report["results"].extend(measured["results"])
+            if progress:
+                progress({"size": size, **measured["dataset"]})
+
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = str(Path(BENCHMARK_DIR) / f"{commit or 'nocommit'}-{stamp}.json")
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    report["path"] = output
+    return report
+
+
+def compare_reports(
+    base: Dict[str, Any],
+    new: Dict[str, Any],
+    metric: str = "p50_ms",
+    threshold_pct: float = 10.0,
+) -> Dict[str, Any]:
+    """
+    Compara dois relatórios por (tamanho, concorrência, função).
+
+    Uma linha é regressão quando `metric` piora mais que `threshold_pct`
+    por cento (para ops_per_sec, piorar é diminuir).
+
+    Returns:
+        Dicionário com rows (base, new e delta_pct) e regressions.
+    """
+    higher_is_better = metric == "ops_per_sec"
+
+    def key(row: Dict[str, Any]) -> tuple:
+        return row["size"], row["concurrency"], row["function"]
+
+    base_rows = {key(row): row for row in base["results"]}
+    rows: List[Dict[str, Any]] = []
+    for row in new["results"]:
+        previous = base_rows.get(key(row))
+        if previous is None:
+            continue
+        before, after = previous[metric], row[metric]
+        delta_pct = round((after - before) / before * 100, 1) if before else None
+        worse = -delta_pct if higher_is_better and delta_pct is not None else delta_pct
+        rows.append(
+            {
+                "size": row["size"],
+                "concurrency": row["concurrency"],
+                "function": row["function"],
+                "base": before,
+                "new": after,
+                "delta_pct": delta_pct,
+                "regression": worse is not None and worse > threshold_pct,
+            }
+        )
+    return {
+        "status": "ok",
+        "metric": metric,
+        "base_commit": base.get("commit"),
+        "new_commit": new.get("commit"),
+        "rows": rows,
+        "regressions": [row for row in rows if row["regression"]],
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _print_results(report: Dict[str, Any]) -> None:
+    print(
+        f"{'tamanho':>9} {'threads':>7}  {'função':<28} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'ops/s':>9}"
+    )
+    for row in report["results"]:
+        print(
+            f"{row['size']:>9} {row['concurrency']:>7}  {row['function']:<28} "
+            f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['ops_per_sec']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do banco do LifeOS.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Gera as bases e mede as funções de crud")
+    run.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES))
+    run.add_argument("--concurrency", type=_int_list, default=list(DEFAULT_CONCURRENCY))
+    run.add_argument("--calls", type=int, default=200, help="Chamadas por função")
+    run.add_argument("--users", type=int, default=10)
+    run.add_argument("--years", type=float, default=2.0)
+    run.add_argument(
+        "--skew", type=float, default=1.1, help="Viés Zipf das categorias"
+    )
+    run.add_argument("--goals", type=int, default=3, help="Metas por usuário")
+    run.add_argument("--events", type=int, default=50, help="Eventos por usuário")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--only", help="Funções medidas, separadas por vírgula")
+    run.add_argument("--output", help="Caminho do relatório JSON")
+
+    compare = commands.add_parser("compare", help="Compara dois relatórios")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument(
+        "--metric",
+        default="p50_ms",
+        choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms", "ops_per_sec"],
+    )
+    compare.add_argument("--threshold", type=float, default=10.0, help="Em %%")
+
+    generate = commands.add_parser(
+        "generate", help="Popula o banco corrente (DB_PATH) com dados sintéticos"
+    )
+    generate.add_argument("--transactions", type=int, default=10000)
+    generate.add_argument("--users", type=int, default=10)
+    generate.add_argument("--years", type=float, default=2.0)
+    generate.add_argument("--skew", type=float, default=1.1)
+    generate.add_argument("--goals", type=int, default=3)
+    generate.add_argument("--events", type=int, default=50)
+    generate.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        from ..setup import init_database
+        from .synthetic import generate_dataset
+
+        init_database()
+        result = generate_dataset(
+            transactions=args.transactions,
+            users=args.users,
+            years=args.years,
+            skew=args.skew,
+            goals_per_user=args.goals,
+            events_per_user=args.events,
+            seed=args.seed,
+        )
+        print(
+            f"✅ {result['transactions']} transações, "
+            f"{result['budget_goals']} metas e {result['calendar_logs']} logs "
+            f"de calendário em {result['elapsed_seconds']}s"
+        )
+        return
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        result = compare_reports(base, new, args.metric, args.threshold)
+        print(
+            f"📊 {result['base_commit']} → {result['new_commit']} ({args.metric})"
+        )
+        for row in result["rows"]:
+            flag = "❌" if row["regression"] else "  "
+            delta = "n/a" if row["delta_pct"] is None else f"{row['delta_pct']:+.1f}%"
+            print(
+                f"{flag} {row['size']:>9} {row['concurrency']:>3}  "
+                f"{row['function']:<28} {row['base']:>10} → {row['new']:<10} {delta}"
+            )
+        if result["regressions"]:
+            print(
+                f"❌ {len(result['regressions'])} regressões "
+                f"acima de {args.threshold}%"
+            )
+            raise SystemExit(1)
+        print("✅ Nenhuma regressão")
+        return
+
+    report = run_benchmark(
+        sizes=args.sizes,
+        concurrency=args.concurrency,
+        calls=args.calls,
+        users=args.users,
+        years=args.years,
+        skew=args.skew,
+        goals_per_user=args.goals,
+        events_per_user=args.events,
+        seed=args.seed,
+        operations=args.only.split(",") if args.only else None,
+        output=args.output,
+        progress=lambda p: print(
+            f"   ... base de {p['size']}: {p['transactions']} transações "
+            f"geradas em {p['elapsed_seconds']}s"
+        ),
+    )
+    if report["status"] != "ok":
+        print(f"❌ {report['error']}")
+        raise SystemExit(1)
+    _print_results(report)
+    print(f"✅ Relatório salvo em {report['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Gerador de dados sintéticos para o benchmark do banco.
+
+Popula o banco corrente (DB_PATH) pelas próprias funções de `crud`, com
+usuários, anos de histórico, categorias com distribuição enviesada (Zipf),
+metas de orçamento e logs de calendário. Com a mesma semente, o mesmo
+conjunto de dados é gerado em qualquer commit.
+"""
+
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import crud
+
+# Categorias de despesa (as de `CATEGORIES_PTBR`) e o valor típico de cada
+# lançamento, em reais; a ordem define a popularidade quando há viés.
+EXPENSE_CATEGORIES: Tuple[Tuple[str, float], ...] = (
+    ("Mercado", 85.0),
+    ("Transporte", 24.0),
+    ("Lazer", 60.0),
+    ("Assinaturas", 35.0),
+    ("Saúde", 120.0),
+    ("Moradia", 900.0),
+    ("Educação", 250.0),
+    ("Viagem", 700.0),
+    ("Outros", 45.0),
+)
+INCOME_CATEGORY = "Renda"
+
+BATCH_SIZE = 5000
+
+
+def user_id_for(index: int) -> str:
+    """WhatsApp number sintético do usuário `index`."""
+    return f"5511900{index:06d}"
+
+
+def event_id_for(user_index: int, event_index: int) -> str:
+    """google_event_id sintético do evento `event_index` do usuário."""
+    return f"bench-{user_index}-{event_index}"
+
+
+def category_weights(skew: float) -> List[float]:
+    """Pesos Zipf das categorias de despesa (skew 0 = uniforme)."""
+    return [1 / (rank + 1) ** skew for rank in range(len(EXPENSE_CATEGORIES))]
+
+
+def _random_moment(rng: random.Random, start: datetime, span_seconds: int) -> str:
+    return (start + timedelta(seconds=rng.randrange(span_seconds))).isoformat()
+
+
+def _user_transactions(
+    rng: random.Random,
+    user_id: str,
+    count: int,
+    years: float,
+    weights: List[float],
+    now: datetime,
+) -> List[Dict[str, Any]]:
+    span_seconds = max(1, int(years * 365 * 86400))
+    start = now - timedelta(seconds=span_seconds)
+
+    # Um salário por mês do período; o resto são despesas.
+    months = max(1, min(count // 10, math.ceil(years * 12)))
+    items: List[Dict[str, Any]] = []
+    for month in range(months):
+        day = now - timedelta(days=30 * month)
+        items.append(
+            {
+                "user_id": user_id,
+                "description": "Salário",
+                "amount": round(rng.uniform(3000, 12000), 2),
+                "category": INCOME_CATEGORY,
+                "transaction_type": "income",
+                "date": day.replace(day=5, hour=9, minute=0, second=0).isoformat(),
+            }
+        )
+
+    categories = rng.choices(EXPENSE_CATEGORIES, weights=weights, k=count - months)
+    for number, (category, typical) in enumerate(categories):
+        items.append(
+            {
+                "user_id": user_id,
+                "description": f"{category} compra {number}",
+                # Log-normal em torno do valor típico: muitos pequenos, poucos grandes.
+                "amount": round(max(0.5, typical * rng.lognormvariate(0, 0.6)), 2),
+                "category": category,
+                "transaction_type": "expense",
+                "date": _random_moment(rng, start, span_seconds),
+            }
+        )
+    return items
+
+
+def generate_dataset(
+    transactions: int = 10000,
+    users: int = 10,
+    years: float = 2.0,
+    skew: float = 1.1,
+    goals_per_user: int = 3,
+    events_per_user: int = 50,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    Gera um conjunto de dados sintético no banco corrente.
+
+    Args:
+        transactions: Total de transações, divididas igualmente entre usuários
+        users: Número de usuários
+        years: Anos de histórico, terminando agora
+        skew: Expoente Zipf da popularidade das categorias (0 = uniforme)
+        goals_per_user: Metas mensais por usuário (nas categorias mais usadas)
+        events_per_user: Eventos de calendário por usuário
+        seed: Semente do gerador aleatório
+
+    Returns:
+        Dicionário com as contagens geradas e o tempo gasto.
+    """
+    rng = random.Random(seed)
+    weights = category_weights(skew)
+    now = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+
+    per_user = max(1, transactions // max(1, users))
+    inserted = goals = logs = 0
+    batch: List[Dict[str, Any]] = []
+    for index in range(users):
+        user_id = user_id_for(index)
+        crud.create_user(user_id, f"Usuário {index}")
+
+        batch.extend(_user_transactions(rng, user_id, per_user, years, weights, now))
+        if len(batch) >= BATCH_SIZE:
+            inserted += crud.add_transactions_batch(batch)["inserted"]
+            batch = []
+
+        # Meta ~10% acima do gasto mensal esperado na categoria.
+        expected = per_user / max(1.0, years * 12)
+        for rank in range(min(goals_per_user, len(EXPENSE_CATEGORIES))):
+            category, typical = EXPENSE_CATEGORIES[rank]
+            share = weights[rank] / sum(weights)
+            limit = round(max(50.0, expected * share * typical * 1.1), 2)
+            crud.set_budget_goal(user_id, category, limit)
+            goals += 1
+
+        for event in range(events_per_user):
+            event_id = event_id_for(index, event)
+            crud.add_calendar_log(user_id, event_id, "created", f"Evento {event}")
+            logs += 1
+            roll = rng.random()
+            if roll < 0.3:
+                crud.add_calendar_log(user_id, event_id, "updated", f"Evento {event}")
+                logs += 1
+            elif roll < 0.4:
+                crud.add_calendar_log(user_id, event_id, "deleted")
+                logs += 1
+
+    if batch:
+        inserted += crud.add_transactions_batch(batch)["inserted"]
+
+    return {
+        "status": "ok",
+        "users": users,
+        "transactions": inserted,
+        "budget_goals": goals,
+        "calendar_logs": logs,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def sample_user(rng: random.Random, users: int) -> Tuple[int, str]:
+    """Sorteia um usuário do conjunto gerado: (índice, user_id)."""
+    index = rng.randrange(users)
+    return index, user_id_for(index)
+
+
+def sample_category(rng: random.Random, skew: float) -> str:
+    return rng.choices(EXPENSE_CATEGORIES, weights=category_weights(skew))[0][0]
+
+
+def sample_event(
+    rng: random.Random, user_index: int, events_per_user: int
+) -> Optional[str]:
+    if events_per_user <= 0:
+        return None
+    return event_id_for(user_index, rng.randrange(events_per_user))
@@ -1,27 +1,164 @@
+import atexit
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from decimal import InvalidOperation
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .archive import connect_archive_reader
+from .migrations import FTS_TOKENIZE
+from .money import CENTS_SQL, DEFAULT_CURRENCY, from_cents, to_cents
+from .setup import database_path, get_read_connection, shard_paths, using_database
+from .timestamps import DEFAULT_TIMEZONE, ZoneInfo, normalize_timestamp, range_bounds
+from .writer import run_write
+
+
+USER_CACHE_SIZE = int(os.getenv("LIFEOS_USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("LIFEOS_USER_CACHE_TTL", "300"))
+
+
+class _UserCache:
+    """LRU com TTL das linhas de `users`, indexado por whatsapp_number."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def __contains__(self, key: str) -> bool:
+        # Consulta sem afetar as métricas nem a ordem do LRU.
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_user_cache = _UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
 
-from .setup import get_connection
+def get_user_cache_stats() -> Dict[str, Any]:
+    return _user_cache.stats()
+
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
+
+
+def _select_user(
+    cursor: sqlite3.Cursor, whatsapp_number: str
+) -> Optional[Dict[str, Any]]:
+    cursor.execute("SELECT * FROM users WHERE whatsapp_number = ?", (whatsapp_number,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def _load_user(
+    cursor: sqlite3.Cursor, whatsapp_number: str
+) -> Optional[Dict[str, Any]]:
+    user = _user_cache.get(whatsapp_number)
+    if user is None:
+        user = _select_user(cursor, whatsapp_number)
+        if user is not None:
+            _user_cache.set(whatsapp_number, user)
+    return user
+
+
+def _ensure_user(
+    cursor: sqlite3.Cursor, whatsapp_number: str, name: Optional[str] = None
+) -> Dict[str, Any]:
+    user = _user_cache.get(whatsapp_number)
+    if user is not None:
+        return user
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO users (whatsapp_number, name, last_interaction) "
+        "VALUES (?, ?, ?)",
+        (whatsapp_number, name, datetime.now().isoformat()),
+    )
+    # Não entra no cache aqui: mesmo já existente, a linha pode ter sido
+    # inserida por outra operação ainda não confirmada do mesmo lote do
+    # escritor único. Quem chama guarda no cache depois do commit.
+    return _select_user(cursor, whatsapp_number) or {"whatsapp_number": whatsapp_number}
 
 
 def create_user(whatsapp_number: str, name: Optional[str] = None) -> Dict[str, Any]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR IGNORE INTO users (whatsapp_number, name, last_interaction) VALUES (?, ?, ?)",
-            (whatsapp_number, name, datetime.now().isoformat()),
+    if whatsapp_number not in _user_cache:
+        user = run_write(
+            lambda conn: _ensure_user(conn.cursor(), whatsapp_number, name),
+            user_id=whatsapp_number,
         )
-        return {"status": "ok", "whatsapp_number": whatsapp_number, "is_new": True}
+        _user_cache.set(whatsapp_number, user)
+    return {"status": "ok", "whatsapp_number": whatsapp_number, "is_new": True}
 
 
 def get_user(whatsapp_number: str) -> Optional[Dict[str, Any]]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM users WHERE whatsapp_number = ?", (whatsapp_number,)
-        )
-        row = cursor.fetchone()
-        return dict(row) if row else None
+    user = _user_cache.get(whatsapp_number)
+    if user is None:
+        with get_read_connection(whatsapp_number) as conn:
+            user = _load_user(conn.cursor(), whatsapp_number)
+    return _with_pending_interaction(user)
 
 
 def check_user_exists(whatsapp_number: str) -> Dict[str, Any]:
@@ -44,18 +181,109 @@ def check_user_exists(whatsapp_number: str) -> Dict[str, Any]:
     return {"exists": False, "user_data": None, "is_first_interaction_today": True}
 
 
+INTERACTION_FLUSH_SECONDS = float(os.getenv("LIFEOS_INTERACTION_FLUSH_SECONDS", "5"))
+
+# Última interação de cada usuário ainda não gravada no banco.
+_pending_interactions: Dict[str, str] = {}
+_pending_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def _with_pending_interaction(
+    user: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    if user is None:
+        return None
+    with _pending_lock:
+        pending = _pending_interactions.get(user["whatsapp_number"])
+    if pending is not None:
+        user["last_interaction"] = pending
+    return user
+
+
+def _schedule_interaction_flush() -> None:
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(INTERACTION_FLUSH_SECONDS, flush_interactions)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def flush_interactions() -> Dict[str, Any]:
+    """Grava num único UPDATE em lote as interações acumuladas no buffer."""
+    global _flush_timer
+    with _pending_lock:
+        _flush_timer = None
+        pending = dict(_pending_interactions)
+    if not pending:
+        return {"status": "ok", "flushed": 0}
+
+    by_shard: Dict[str, List[Tuple[str, str]]] = {}
+    for number, value in pending.items():
+        by_shard.setdefault(database_path(number), []).append((value, number))
+    flushed: List[Tuple[str, str]] = []
+    failed = 0
+    for updates in by_shard.values():
+        try:
+            run_write(
+                lambda conn, updates=updates: conn.executemany(
+                    "UPDATE users SET last_interaction = ? WHERE whatsapp_number = ?",
+                    updates,
+                ),
+                user_id=updates[0][1],
+            )
+        except sqlite3.Error:
+            # Banco travado ou erro do escritor: as entradas ficam no buffer.
+            failed += len(updates)
+        else:
+            flushed.extend(updates)
+
+    with _pending_lock:
+        for value, number in flushed:
+            # Só descarta o que não foi sobrescrito durante a gravação.
+            if _pending_interactions.get(number) == value:
+                del _pending_interactions[number]
+            _user_cache.invalidate(number)
+        if failed:
+            _schedule_interaction_flush()
+    return {
+        "status": "error" if failed else "ok",
+        "flushed": len(flushed),
+        "failed": failed,
+    }
+
+
+atexit.register(flush_interactions)
+
+
 def update_user_last_interaction(whatsapp_number: str) -> Dict[str, Any]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE users SET last_interaction = ? WHERE whatsapp_number = ?",
-            (datetime.now().isoformat(), whatsapp_number),
-        )
-        return {"status": "ok", "updated": cursor.rowcount}
+    now = datetime.now().isoformat()
+    if INTERACTION_FLUSH_SECONDS <= 0:
+
+        def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE users SET last_interaction = ? WHERE whatsapp_number = ?",
+                (now, whatsapp_number),
+            )
+            return {"status": "ok", "updated": cursor.rowcount}
+
+        result = run_write(_write, user_id=whatsapp_number)
+        # Só depois do COMMIT: antes, uma leitura concorrente recolocaria a
+        # linha antiga no cache.
+        _user_cache.invalidate(whatsapp_number)
+        return result
+
+    if get_user(whatsapp_number) is None:
+        return {"status": "ok", "updated": 0}
+    with _pending_lock:
+        _pending_interactions[whatsapp_number] = now
+        _schedule_interaction_flush()
+    return {"status": "ok", "updated": 1}
 
 
 def update_user(whatsapp_number: str, name: str) -> Dict[str, Any]:
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
         cursor.execute(
             "UPDATE users SET name = ? WHERE whatsapp_number = ?",
@@ -63,6 +291,10 @@ def update_user(whatsapp_number: str, name: str) -> Dict[str, Any]:
         )
         return {"status": "ok", "updated": cursor.rowcount}
 
+    result = run_write(_write, user_id=whatsapp_number)
+    _user_cache.invalidate(whatsapp_number)
+    return result
+
 
 def get_or_create_user(
     whatsapp_number: str, name: Optional[str] = None
@@ -84,6 +316,127 @@ def get_or_create_user(
     return {**user_data, "is_new_user": True, "is_first_interaction_today": True}
 
 
+def list_all_users() -> List[Dict[str, Any]]:
+    """Lista os usuários de todos os shards, para jobs agendados e administração."""
+    users: List[Dict[str, Any]] = []
+    for path in shard_paths():
+        with using_database(path), get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM users")
+            users.extend(dict(row) for row in cursor.fetchall())
+    users.sort(key=lambda user: user["whatsapp_number"])
+    return [_with_pending_interaction(user) for user in users]
+
+
+def _user_timezone(cursor: sqlite3.Cursor, user_id: str) -> str:
+    user = _load_user(cursor, user_id)
+    return (user or {}).get("timezone") or DEFAULT_TIMEZONE
+
+
+def _category_id(cursor: sqlite3.Cursor, name: str) -> int:
+    """Id inteiro da categoria `name`, criado no primeiro uso (só em escritas)."""
+    cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    if row is not None:
+        return row[0]
+    # Outro escritor pode ter criado a mesma categoria desde o SELECT acima.
+    cursor.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+    cursor.execute("SELECT id FROM categories WHERE name = ?", (name,))
+    return cursor.fetchone()[0]
+
+
+# Filtro por nome de categoria resolvido uma vez para o id, o que permite a
+# busca direta em idx_transactions_user_category (user_id, category_id, ts).
+_CATEGORY_FILTER = "category_id = (SELECT id FROM categories WHERE name = ?)"
+
+# Percentuais da meta mensal que geram alerta (cada um no máximo uma vez por mês).
+BUDGET_ALERT_THRESHOLDS = tuple(
+    sorted(
+        int(value)
+        for value in os.getenv("LIFEOS_BUDGET_ALERT_THRESHOLDS", "80,100").split(",")
+        if value.strip()
+    )
+)
+
+
+def _evaluate_budget(
+    cursor: sqlite3.Cursor,
+    user_id: str,
+    category: str,
+    month: str,
+    alert: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Compara o total do mês (já atualizado pelos triggers) com a meta da
+    categoria e registra em budget_alerts os limiares cruzados pela
+    primeira vez no mês. Retorna None se a categoria não tem meta.
+    """
+    cursor.execute(
+        """SELECT g.monthly_limit, COALESCE(m.total_cents, 0)
+           FROM budget_goals g
+           LEFT JOIN categories c ON c.name = g.category
+           LEFT JOIN monthly_category_totals m ON
+               m.user_id = g.user_id
+               AND m.month = ?
+               AND m.category_id = c.id
+               AND m.type = 'expense'
+           WHERE g.user_id = ? AND g.category = ?""",
+        (month, user_id, category),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    monthly_limit, spent_cents = row[0], row[1]
+    limit_cents = to_cents(monthly_limit)
+    percent = round(spent_cents / limit_cents * 100, 1) if limit_cents > 0 else 0
+    budget: Dict[str, Any] = {
+        "category": category,
+        "month": month,
+        "limit": monthly_limit,
+        "spent": from_cents(spent_cents),
+        "remaining": from_cents(limit_cents - spent_cents),
+        "percent": percent,
+        "alerts": [],
+    }
+
+    crossed = [
+        threshold
+        for threshold in BUDGET_ALERT_THRESHOLDS
+        if limit_cents > 0 and spent_cents * 100 >= limit_cents * threshold
+    ]
+    if not alert or not crossed:
+        return budget
+
+    params: List[Any] = []
+    for threshold in crossed:
+        params.extend([user_id, category, month, threshold, spent_cents, limit_cents])
+    cursor.execute(
+        f"""INSERT INTO budget_alerts
+               (user_id, category, month, threshold, spent_cents, limit_cents)
+            VALUES {", ".join("(?, ?, ?, ?, ?, ?)" for _ in crossed)}
+            ON CONFLICT(user_id, category, month, threshold) DO NOTHING
+            RETURNING threshold""",
+        params,
+    )
+    # Campos no formato do template `alert_spending`.
+    budget["alerts"] = [
+        {
+            "category": category,
+            "percent": percent,
+            "spent": budget["spent"],
+            "limit": monthly_limit,
+            "threshold": threshold,
+        }
+        for threshold in sorted(row[0] for row in cursor.fetchall())
+    ]
+    return budget
+
+
+def _current_month(tz_name: str) -> str:
+    return datetime.now(ZoneInfo(tz_name)).strftime("%Y-%m")
+
+
 def add_transaction(
     user_id: str,
     description: str,
@@ -91,98 +444,737 @@ def add_transaction(
     category: str,
     transaction_type: str,
     date: Optional[str] = None,
+    currency: str = DEFAULT_CURRENCY,
 ) -> Dict[str, Any]:
     if transaction_type not in ("income", "expense"):
         return {"status": "error", "error": "type must be 'income' or 'expense'"}
 
-    if not date or len(date) < 10:
-        date = datetime.now().isoformat()
-    elif len(date) == 10:
-        date = f"{date}T{datetime.now().strftime('%H:%M:%S')}"
-
-    create_user(user_id)
+    try:
+        amount_cents = to_cents(amount)
+    except (InvalidOperation, ValueError):
+        return {"status": "error", "error": f"invalid amount: {amount}"}
 
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
+        user = _ensure_user(cursor, user_id)
+        tz_name = user.get("timezone") or DEFAULT_TIMEZONE
+        try:
+            local_date, ts = normalize_timestamp(date, tz_name)
+        except ValueError:
+            return {"status": "error", "error": f"invalid date: {date}"}
+
         cursor.execute(
-            """INSERT INTO transactions (user_id, description, amount, category, type, date)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (user_id, description, amount, category, transaction_type, date),
+            """INSERT INTO transactions
+                   (user_id, description, amount, amount_cents, currency, category,
+                    type, date, ts, tz, category_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                user_id,
+                description,
+                from_cents(amount_cents),
+                amount_cents,
+                currency,
+                category,
+                transaction_type,
+                local_date,
+                ts,
+                tz_name,
+                _category_id(cursor, category),
+            ),
         )
-        return {"status": "ok", "id": cursor.lastrowid}
+        result: Dict[str, Any] = {"status": "ok", "id": cursor.lastrowid}
+        if transaction_type != "expense":
+            return result
+
+        # Metas valem para o mês corrente: lançamentos retroativos não alertam.
+        month = local_date[:7]
+        budget = _evaluate_budget(
+            cursor, user_id, category, month, alert=month == _current_month(tz_name)
+        )
+        if budget is not None:
+            result["budget_alerts"] = budget.pop("alerts")
+            result["budget"] = budget
+        return result
 
+    return run_write(_write, user_id=user_id)
 
-def get_transactions(
+
+def add_transactions_batch(
+    transactions: Iterable[Mapping[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Insere várias transações em uma única transação do banco.
+
+    Cada item aceita as mesmas chaves de `add_transaction`: user_id,
+    description, amount, category, transaction_type (ou type), date e currency.
+    Itens inválidos não interrompem o lote; o erro volta em `results`
+    na mesma posição do item.
+
+    Returns:
+        Dicionário com inserted, errors, results (um por item, com id ou error)
+        e budget_alerts (limiares de meta cruzados no mês corrente).
+    """
+    results: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, tuple, Optional[str]]] = []
+
+    for index, item in enumerate(transactions):
+        try:
+            user_id = item["user_id"]
+            description = item["description"]
+            amount_cents = to_cents(item["amount"])
+            category = item["category"]
+        except (KeyError, TypeError, ValueError, InvalidOperation) as e:
+            results.append(
+                {"index": index, "status": "error", "error": f"invalid item: {e}"}
+            )
+            continue
+
+        transaction_type = item.get("transaction_type") or item.get("type")
+        if transaction_type not in ("income", "expense"):
+            results.append(
+                {
+                    "index": index,
+                    "status": "error",
+                    "error": "type must be 'income' or 'expense'",
+                }
+            )
+            continue
+        if not user_id or not description or not category:
+            results.append(
+                {
+                    "index": index,
+                    "status": "error",
+                    "error": "user_id, description and category are required",
+                }
+            )
+            continue
+
+        pending.append(
+            (
+                len(results),
+                (
+                    user_id,
+                    description,
+                    from_cents(amount_cents),
+                    amount_cents,
+                    item.get("currency") or DEFAULT_CURRENCY,
+                    category,
+                    transaction_type,
+                ),
+                item.get("date"),
+            )
+        )
+        results.append({"index": index, "status": "ok", "id": None})
+
+    def _write(
+        conn: sqlite3.Connection, shard_pending: List[Tuple[int, tuple, Optional[str]]]
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        cursor = conn.cursor()
+        timezones: Dict[str, str] = {}
+        rows: List[tuple] = []
+        row_positions: List[int] = []
+
+        category_ids: Dict[str, int] = {}
+
+        # Um único "agora" por fuso, para todo o lote.
+        now_by_tz: Dict[str, datetime] = {}
+        for position, values, raw_date in shard_pending:
+            user_id = values[0]
+            if user_id not in timezones:
+                user = _ensure_user(cursor, user_id)
+                timezones[user_id] = user.get("timezone") or DEFAULT_TIMEZONE
+            tz_name = timezones[user_id]
+            now = now_by_tz.setdefault(tz_name, datetime.now(ZoneInfo(tz_name)))
+            try:
+                local_date, ts = normalize_timestamp(raw_date, tz_name, now)
+            except (TypeError, ValueError):
+                results[position] = {
+                    "index": results[position]["index"],
+                    "status": "error",
+                    "error": f"invalid date: {raw_date}",
+                }
+                continue
+            category = values[5]
+            if category not in category_ids:
+                category_ids[category] = _category_id(cursor, category)
+            rows.append(values + (local_date, ts, tz_name, category_ids[category]))
+            row_positions.append(position)
+
+        # O id vem de cada INSERT: não depende de os ids serem consecutivos.
+        for values, position in zip(rows, row_positions):
+            cursor.execute(
+                """INSERT INTO transactions
+                       (user_id, description, amount, amount_cents, currency,
+                        category, type, date, ts, tz, category_id)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   RETURNING id""",
+                values,
+            )
+            results[position]["id"] = cursor.fetchone()[0]
+
+        # Uma avaliação por (usuário, categoria) com despesas no mês corrente.
+        current = {tz: now.strftime("%Y-%m") for tz, now in now_by_tz.items()}
+        touched = {
+            (row[0], row[5])
+            for row in rows
+            if row[6] == "expense" and row[7][:7] == current[row[9]]
+        }
+        alerts: List[Dict[str, Any]] = []
+        for user_id, category in sorted(touched):
+            month = current[timezones[user_id]]
+            budget = _evaluate_budget(cursor, user_id, category, month)
+            if budget is not None:
+                alerts.extend(
+                    {"user_id": user_id, **alert} for alert in budget["alerts"]
+                )
+        return len(rows), alerts
+
+    # Com shards, cada arquivo recebe a sua parte do lote numa transação própria.
+    by_shard: Dict[str, List[Tuple[int, tuple, Optional[str]]]] = {}
+    for entry in pending:
+        by_shard.setdefault(database_path(entry[1][0]), []).append(entry)
+
+    inserted = 0
+    budget_alerts: List[Dict[str, Any]] = []
+    for shard_pending in by_shard.values():
+        count, alerts = run_write(
+            lambda conn, group=shard_pending: _write(conn, group),
+            user_id=shard_pending[0][1][0],
+        )
+        inserted += count
+        budget_alerts.extend(alerts)
+
+    return {
+        "status": "ok",
+        "inserted": inserted,
+        "errors": len(results) - inserted,
+        "results": results,
+        "budget_alerts": budget_alerts,
+    }
+
+
+TRANSACTION_COLUMNS = (
+    "id",
+    "user_id",
+    "description",
+    "amount",
+    "amount_cents",
+    "currency",
+    "category",
+    "type",
+    "date",
+    "ts",
+)
+
+_TS_INDEX = TRANSACTION_COLUMNS.index("ts")
+
+# `amount` é derivado de amount_cents em `_transaction_row`, fora do SQL.
+_TRANSACTION_SELECT = f"""
+    SELECT id, user_id, description, {CENTS_SQL} AS amount_cents, currency,
+           category, type, date, ts
+    FROM transactions"""
+
+
+def _transaction_row(row: Sequence[Any]) -> tuple:
+    values = tuple(row)
+    return values[:3] + (from_cents(values[3]),) + values[3:]
+
+
+def _transaction_filters(
+    cursor: sqlite3.Cursor,
     user_id: str,
-    limit: int = 50,
     category: Optional[str] = None,
     transaction_type: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-) -> List[Dict[str, Any]]:
-    query = "SELECT * FROM transactions WHERE user_id = ?"
+    archived: bool = False,
+) -> Tuple[str, List[Any]]:
+    where = " WHERE user_id = ?"
     params: List[Any] = [user_id]
 
     if category:
-        query += " AND category = ?"
+        # O arquivo morto não tem a tabela categories: filtra pelo nome.
+        where += " AND category = ?" if archived else f" AND {_CATEGORY_FILTER}"
         params.append(category)
     if transaction_type:
-        query += " AND type = ?"
+        where += " AND type = ?"
         params.append(transaction_type)
-    if start_date:
-        query += " AND date >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND date <= ?"
-        params.append(end_date)
-
-    query += " ORDER BY date DESC LIMIT ?"
+    if start_date or end_date:
+        start_ts, end_ts = range_bounds(
+            start_date, end_date, _user_timezone(cursor, user_id)
+        )
+        if start_ts is not None:
+            where += " AND ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            where += " AND ts < ?"
+            params.append(end_ts)
+
+    return where, params
+
+
+def get_transactions(
+    user_id: str,
+    limit: int = 50,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    with get_read_connection(user_id) as conn:
+        return _select_transactions(
+            conn.cursor(),
+            user_id,
+            limit,
+            category,
+            transaction_type,
+            start_date,
+            end_date,
+        )
+
+
+def _select_transactions(
+    cursor: sqlite3.Cursor,
+    user_id: str,
+    limit: int,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    where, params = _transaction_filters(
+        cursor, user_id, category, transaction_type, start_date, end_date
+    )
+    query = f"{_TRANSACTION_SELECT}{where} ORDER BY ts DESC, id DESC LIMIT ?"
     params.append(limit)
 
-    with get_connection() as conn:
+    cursor.execute(query, params)
+    return [
+        dict(zip(TRANSACTION_COLUMNS, _transaction_row(row)))
+        for row in cursor.fetchall()
+    ]
+
+
+def _encode_cursor(row: Sequence[Any]) -> str:
+    raw = json.dumps([row[_TS_INDEX], row[0]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(token: str) -> Tuple[int, int]:
+    ts, row_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    return int(ts), int(row_id)
+
+
+def _fetch_transaction_page(
+    cursor: sqlite3.Cursor,
+    where: str,
+    params: List[Any],
+    after: Optional[Tuple[int, int]],
+    page_size: int,
+) -> List[tuple]:
+    query = f"{_TRANSACTION_SELECT}{where}"
+    page_params = list(params)
+    if after is not None:
+        query += " AND (ts, id) < (?, ?)"
+        page_params.extend(after)
+    query += " ORDER BY ts DESC, id DESC LIMIT ?"
+    page_params.append(page_size)
+
+    cursor.execute(query, page_params)
+    return [_transaction_row(row) for row in cursor.fetchall()]
+
+
+def _history_sources(
+    cursor: sqlite3.Cursor,
+    archive: Optional[sqlite3.Connection],
+    user_id: str,
+    *filters: Optional[str],
+) -> List[Tuple[sqlite3.Cursor, str, List[Any]]]:
+    """(cursor, where, params) do banco quente e, se houver, do arquivo morto."""
+    sources = [(cursor, *_transaction_filters(cursor, user_id, *filters))]
+    if archive is not None:
+        where, params = _transaction_filters(cursor, user_id, *filters, archived=True)
+        sources.append((archive.cursor(), where, params))
+    return sources
+
+
+def _fetch_history_page(
+    sources: List[Tuple[sqlite3.Cursor, str, List[Any]]],
+    after: Optional[Tuple[int, int]],
+    page_size: int,
+) -> List[tuple]:
+    # Cada base devolve a sua página pelo keyset; a junção mantém a ordem
+    # (ts, id) decrescente. Ids não se repetem: a tabela usa AUTOINCREMENT.
+    rows: List[tuple] = []
+    for cursor, where, params in sources:
+        rows.extend(_fetch_transaction_page(cursor, where, params, after, page_size))
+    if len(sources) > 1:
+        rows.sort(key=lambda row: (row[_TS_INDEX] or 0, row[0]), reverse=True)
+    return rows[:page_size]
+
+
+# Páginas maiores que isto são truncadas: uma página é uma resposta ao modelo.
+MAX_PAGE_SIZE = 200
+
+
+def get_transactions_page(
+    user_id: str,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Retorna uma página do histórico de transações (mais recentes primeiro),
+    incluindo as linhas do arquivo morto.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        page_size: Quantidade de transações por página (1 a MAX_PAGE_SIZE)
+        cursor: Token `next_cursor` da página anterior (omitir na primeira página)
+        category, transaction_type, start_date, end_date: Filtros de `get_transactions`
+
+    Returns:
+        Dicionário com `transactions` e `next_cursor` (None na última página).
+    """
+    if page_size < 1:
+        return {"status": "error", "error": f"invalid page_size: {page_size}"}
+    page_size = min(page_size, MAX_PAGE_SIZE)
+
+    after = None
+    if cursor:
+        try:
+            after = _decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return {"status": "error", "error": "invalid cursor"}
+
+    archive = connect_archive_reader(database_path(user_id))
+    try:
+        with get_read_connection(user_id) as conn:
+            try:
+                sources = _history_sources(
+                    conn.cursor(),
+                    archive,
+                    user_id,
+                    category,
+                    transaction_type,
+                    start_date,
+                    end_date,
+                )
+            except ValueError as e:
+                return {"status": "error", "error": f"invalid date filter: {e}"}
+            rows = _fetch_history_page(sources, after, page_size + 1)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "status": "ok",
+        "transactions": [dict(zip(TRANSACTION_COLUMNS, row)) for row in rows],
+        "next_cursor": _encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def iter_transactions(
+    user_id: str,
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    chunk_size: int = 500,
+) -> Iterator[tuple]:
+    """
+    Percorre as transações do usuário (mais recentes primeiro) sob demanda.
+
+    Gera tuplas na ordem de `TRANSACTION_COLUMNS`, buscando `chunk_size`
+    linhas por vez via keyset, então a memória não cresce com o histórico.
+    Inclui as linhas do arquivo morto.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    archive = connect_archive_reader(database_path(user_id))
+    try:
+        with get_read_connection(user_id) as conn:
+            sources = _history_sources(
+                conn.cursor(),
+                archive,
+                user_id,
+                category,
+                transaction_type,
+                start_date,
+                end_date,
+            )
+            while True:
+                rows = _fetch_history_page(sources, after, chunk_size)
+                yield from rows
+                if len(rows) < chunk_size:
+                    return
+                last = rows[-1]
+                after = (last[_TS_INDEX], last[0])
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def _fts_query(text: str) -> Optional[str]:
+    # Cada palavra vira um termo entre aspas com prefixo: o texto do usuário
+    # nunca é interpretado como sintaxe do FTS5.
+    terms = re.findall(r"\w+", text or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_transactions(
+    user_id: str,
+    query: str,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """
+    Busca transações pela descrição (ex.: "uber"), ordenadas por relevância.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        query: Palavras a procurar na descrição (acentos e caixa são ignorados)
+        transaction_type: 'income' ou 'expense' (opcional)
+        start_date: Data inicial YYYY-MM-DD (opcional)
+        end_date: Data final YYYY-MM-DD (opcional)
+        limit: Número máximo de transações retornadas
+
+    Returns:
+        Dicionário com transactions, matches (total encontrado) e total
+        (soma dos valores de todas as transações encontradas).
+    """
+    match = _fts_query(query)
+    if match is None:
+        return {"status": "error", "error": "query must contain at least one word"}
+
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
+        try:
+            where, params = _transaction_filters(
+                cursor, user_id, None, transaction_type, start_date, end_date
+            )
+        except ValueError as e:
+            return {"status": "error", "error": f"invalid date filter: {e}"}
+        matches, total_cents, rows = _search_transactions_in(
+            cursor, "transactions_fts", match, where, params, limit
+        )
+
+    # O arquivo morto não tem FTS próprio: indexa, só para esta busca, as
+    # linhas do usuário que passam nos filtros.
+    archive = connect_archive_reader(database_path(user_id))
+    if archive is not None:
+        try:
+            cursor = archive.cursor()
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE temp.hits_fts USING fts5("
+                f"description, tokenize='{FTS_TOKENIZE}')"
+            )
+            cursor.execute(
+                f"INSERT INTO temp.hits_fts (rowid, description) "
+                f"SELECT id, description FROM transactions{where}",
+                params,
+            )
+            archived = _search_transactions_in(
+                cursor, "hits_fts", match, where, params, limit
+            )
+        finally:
+            archive.close()
+        matches += archived[0]
+        total_cents += archived[1]
+        # Mesma ordem das consultas: relevância e, no empate, o mais recente
+        # (ts é a última coluna de _TRANSACTION_SELECT).
+        rows = sorted(rows + archived[2], key=lambda hit: (hit[0], -(hit[1][-1] or 0)))
+        rows = rows[:limit]
+
+    return {
+        "status": "ok",
+        "transactions": [
+            dict(zip(TRANSACTION_COLUMNS, _transaction_row(row))) for _, row in rows
+        ],
+        "matches": matches,
+        "total": from_cents(total_cents),
+    }
+
+
+def _search_transactions_in(
+    cursor: sqlite3.Cursor,
+    fts: str,
+    match: str,
+    where: str,
+    params: List[Any],
+    limit: int,
+) -> Tuple[int, int, List[Tuple[float, tuple]]]:
+    hits = f"""
+        WITH hits AS (
+            SELECT rowid AS hit_id, bm25({fts}) AS rank
+            FROM {fts} WHERE {fts} MATCH ?
+        )"""
+    join = " JOIN hits ON hits.hit_id = id"
+
+    cursor.execute(
+        f"{hits} SELECT COUNT(*), COALESCE(SUM({CENTS_SQL}), 0)"
+        f" FROM transactions{join}{where}",
+        [match] + params,
+    )
+    matches, total_cents = cursor.fetchone()
+
+    select = _TRANSACTION_SELECT.replace("SELECT ", "SELECT hits.rank, ", 1)
+    cursor.execute(
+        f"{hits}{select}{join}{where} ORDER BY hits.rank, ts DESC LIMIT ?",
+        [match] + params + [limit],
+    )
+    return (
+        matches,
+        total_cents,
+        [(row[0], tuple(row)[1:]) for row in cursor.fetchall()],
+    )
+
+
+def get_transaction_fingerprints(
+    user_id: str,
+    start_date: str,
+    end_date: str,
+    max_id: Optional[int] = None,
+) -> List[tuple]:
+    """
+    Retorna (id, dia, valor em centavos, descrição) das transações do usuário
+    no intervalo de dias, para deduplicar importações. A descrição vem crua:
+    quem compara normaliza os dois lados no Python (o lower() do SQLite só
+    trata ASCII).
+    """
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        start_ts, end_ts = range_bounds(
+            start_date, end_date, _user_timezone(cursor, user_id)
+        )
+        query = f"""
+            SELECT id, substr(date, 1, 10), {CENTS_SQL}, description
+            FROM transactions
+            WHERE user_id = ? AND ts >= ? AND ts < ?
+        """
+        params: List[Any] = [user_id, start_ts, end_ts]
+        if max_id is not None:
+            query += " AND id <= ?"
+            params.append(max_id)
+
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        fingerprints = [tuple(row) for row in cursor.fetchall()]
+
+    # Linhas arquivadas continuam valendo para a deduplicação.
+    archive = connect_archive_reader(database_path(user_id))
+    if archive is not None:
+        try:
+            archived = archive.execute(query, params).fetchall()
+        finally:
+            archive.close()
+        fingerprints.extend(tuple(row) for row in archived)
+    return fingerprints
+
+
+def get_max_transaction_id(user_id: Optional[str] = None) -> int:
+    """Maior id de transação no arquivo (shard) do usuário."""
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions")
+        return cursor.fetchone()[0]
 
 
 def get_balance(user_id: str) -> Dict[str, float]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT 
-                COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0) as income,
-                COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0) as expense
-            FROM transactions WHERE user_id = ?
-        """,
-            (user_id,),
-        )
-        row = cursor.fetchone()
-        income = row["income"]
-        expense = row["expense"]
-        return {"income": income, "expense": expense, "balance": income - expense}
+    with get_read_connection(user_id) as conn:
+        return _select_balance(conn.cursor(), user_id)
+
+
+def _select_balance(cursor: sqlite3.Cursor, user_id: str) -> Dict[str, float]:
+    cursor.execute(
+        "SELECT income_cents, expense_cents FROM user_balances WHERE user_id = ?",
+        (user_id,),
+    )
+    row = cursor.fetchone()
+    income = row["income_cents"] if row else 0
+    expense = row["expense_cents"] if row else 0
+    return {
+        "income": from_cents(income),
+        "expense": from_cents(expense),
+        "balance": from_cents(income - expense),
+    }
 
 
 def get_expenses_by_category(
     user_id: str, month: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    query = """
-        SELECT category, SUM(amount) as total
-        FROM transactions 
-        WHERE user_id = ? AND type = 'expense'
-    """
-    params: List[Any] = [user_id]
+    with get_read_connection(user_id) as conn:
+        return _select_expenses_by_category(conn.cursor(), user_id, month)
 
-    if month:
-        query += " AND strftime('%Y-%m', date) = ?"
-        params.append(month)
 
-    query += " GROUP BY category ORDER BY total DESC"
+def _select_expenses_by_category(
+    cursor: sqlite3.Cursor, user_id: str, month: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    if month:
+        query = """
+            SELECT c.name AS category, m.total_cents
+            FROM monthly_category_totals m
+            JOIN categories c ON c.id = m.category_id
+            WHERE m.user_id = ? AND m.type = 'expense' AND m.month = ?
+            ORDER BY m.total_cents DESC
+        """
+        params: List[Any] = [user_id, month]
+    else:
+        # Agrega pelos ids e só então traduz para os nomes.
+        query = """
+            SELECT c.name AS category, t.total_cents
+            FROM (
+                SELECT category_id, SUM(total_cents) AS total_cents
+                FROM monthly_category_totals
+                WHERE user_id = ? AND type = 'expense'
+                GROUP BY category_id
+            ) t
+            JOIN categories c ON c.id = t.category_id
+            ORDER BY t.total_cents DESC
+        """
+        params = [user_id]
+
+    cursor.execute(query, params)
+    return [
+        {"category": row["category"], "total": from_cents(row["total_cents"])}
+        for row in cursor.fetchall()
+    ]
+
+
+def get_daily_totals(
+    user_id: str,
+    start_day: str,
+    end_day: str,
+    transaction_type: str = "expense",
+    category: Optional[str] = None,
+) -> List[Tuple[str, str, int]]:
+    """
+    Retorna (dia, categoria, total em centavos) do rollup diário, com os dias
+    no intervalo fechado [start_day, end_day] (YYYY-MM-DD, horário local).
+    """
+    query = """
+        SELECT d.day, c.name, d.total_cents
+        FROM daily_category_totals d
+        JOIN categories c ON c.id = d.category_id
+        WHERE d.user_id = ? AND d.type = ? AND d.day BETWEEN ? AND ?
+    """
+    params: List[Any] = [user_id, transaction_type, start_day, end_day]
+    if category:
+        query += f" AND d.{_CATEGORY_FILTER}"
+        params.append(category)
 
-    with get_connection() as conn:
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return [tuple(row) for row in cursor.fetchall()]
 
 
 def update_transaction(
@@ -200,11 +1192,17 @@ def update_transaction(
         updates.append("description = ?")
         params.append(description)
     if amount is not None:
-        updates.append("amount = ?")
-        params.append(amount)
+        try:
+            amount_cents = to_cents(amount)
+        except (InvalidOperation, ValueError):
+            return {"status": "error", "error": f"invalid amount: {amount}"}
+        updates.append("amount = ?, amount_cents = ?")
+        params.extend([from_cents(amount_cents), amount_cents])
     if category is not None:
-        updates.append("category = ?")
-        params.append(category)
+        updates.append(
+            "category = ?, category_id = (SELECT id FROM categories WHERE name = ?)"
+        )
+        params.extend([category, category])
     if transaction_type is not None:
         updates.append("type = ?")
         params.append(transaction_type)
@@ -217,19 +1215,48 @@ def update_transaction(
 
     query = f"UPDATE transactions SET {', '.join(updates)} WHERE id = ? AND user_id = ?"
 
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
+        if category is not None:
+            # A categoria só é criada se a transação existir: um id inválido
+            # não pode deixar uma linha órfã em categories.
+            cursor.execute(
+                "SELECT 1 FROM transactions WHERE id = ? AND user_id = ?",
+                (transaction_id, user_id),
+            )
+            if cursor.fetchone() is not None:
+                _category_id(cursor, category)
         cursor.execute(query, params)
         if cursor.rowcount == 0:
             return {
                 "status": "error",
                 "error": "Transaction not found or access denied",
             }
-        return {"status": "ok", "updated": cursor.rowcount}
+        result: Dict[str, Any] = {"status": "ok", "updated": cursor.rowcount}
+        if amount is None and category is None and transaction_type is None:
+            return result
+
+        cursor.execute(
+            "SELECT category, type, substr(date, 1, 7), tz FROM transactions "
+            "WHERE id = ?",
+            (transaction_id,),
+        )
+        row = cursor.fetchone()
+        month = row[2]
+        if row[1] == "expense" and month == _current_month(
+            row[3] or DEFAULT_TIMEZONE
+        ):
+            budget = _evaluate_budget(cursor, user_id, row[0], month)
+            if budget is not None:
+                result["budget_alerts"] = budget.pop("alerts")
+                result["budget"] = budget
+        return result
+
+    return run_write(_write, user_id=user_id)
 
 
 def delete_transaction(transaction_id: int, user_id: str) -> Dict[str, Any]:
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
         cursor.execute(
             "DELETE FROM transactions WHERE id = ? AND user_id = ?",
@@ -237,11 +1264,13 @@ def delete_transaction(transaction_id: int, user_id: str) -> Dict[str, Any]:
         )
         return {"status": "ok", "deleted": cursor.rowcount}
 
+    return run_write(_write, user_id=user_id)
+
 
 def set_budget_goal(
     user_id: str, category: str, monthly_limit: float
 ) -> Dict[str, Any]:
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
         cursor.execute(
             """INSERT INTO budget_goals (user_id, category, monthly_limit)
@@ -251,9 +1280,11 @@ def set_budget_goal(
         )
         return {"status": "ok", "category": category, "monthly_limit": monthly_limit}
 
+    return run_write(_write, user_id=user_id)
+
 
 def get_budget_goals(user_id: str) -> List[Dict[str, Any]]:
-    with get_connection() as conn:
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM budget_goals WHERE user_id = ?", (user_id,))
         return [dict(row) for row in cursor.fetchall()]
@@ -262,46 +1293,138 @@ def get_budget_goals(user_id: str) -> List[Dict[str, Any]]:
 def get_budget_status(
     user_id: str, month: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    month = month or datetime.now().strftime("%Y-%m")
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        if not month:
+            month = _current_month(_user_timezone(cursor, user_id))
+        return _select_budget_status(cursor, user_id, month)
+
+
+def _select_budget_status(
+    cursor: sqlite3.Cursor, user_id: str, month: str
+) -> List[Dict[str, Any]]:
+    cursor.execute(
+        """
+        SELECT 
+            bg.category,
+            bg.monthly_limit,
+            COALESCE(m.total_cents, 0) as spent_cents
+        FROM budget_goals bg
+        LEFT JOIN categories c ON c.name = bg.category
+        LEFT JOIN monthly_category_totals m ON
+            m.user_id = bg.user_id
+            AND m.month = ?
+            AND m.category_id = c.id
+            AND m.type = 'expense'
+        WHERE bg.user_id = ?
+    """,
+        (month, user_id),
+    )
+
+    results = []
+    for row in cursor.fetchall():
+        limit_cents = to_cents(row["monthly_limit"])
+        spent_cents = row["spent_cents"]
+        results.append(
+            {
+                "category": row["category"],
+                "monthly_limit": row["monthly_limit"],
+                "spent": from_cents(spent_cents),
+                "remaining": from_cents(limit_cents - spent_cents),
+                "percentage": (spent_cents / limit_cents * 100)
+                if limit_cents > 0
+                else 0,
+            }
+        )
+    return results
+
 
-    with get_connection() as conn:
+def get_financial_snapshot(
+    user_id: str, month: Optional[str] = None, recent_limit: int = 5
+) -> Dict[str, Any]:
+    """
+    Retorna de uma vez o panorama financeiro do usuário no mês: saldo geral,
+    totais do mês, gastos por categoria, status das metas e as últimas
+    transações. Tudo vem da mesma leitura (mesma conexão e transação), então
+    os números são consistentes entre si.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        month: Mês YYYY-MM (opcional, padrão: mês corrente)
+        recent_limit: Quantas transações recentes incluir
+
+    Returns:
+        Dicionário com month, balance, month_totals (income, expense, net),
+        expenses_by_category, budget_status e recent_transactions.
+    """
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
+        if not month:
+            month = _current_month(_user_timezone(cursor, user_id))
+
         cursor.execute(
-            """
-            SELECT 
-                bg.category,
-                bg.monthly_limit,
-                COALESCE(SUM(t.amount), 0) as spent
-            FROM budget_goals bg
-            LEFT JOIN transactions t ON 
-                t.user_id = bg.user_id 
-                AND t.category = bg.category 
-                AND t.type = 'expense'
-                AND strftime('%Y-%m', t.date) = ?
-            WHERE bg.user_id = ?
-            GROUP BY bg.category, bg.monthly_limit
-        """,
-            (month, user_id),
+            """SELECT type, SUM(total_cents) FROM monthly_category_totals
+               WHERE user_id = ? AND month = ? GROUP BY type""",
+            (user_id, month),
         )
+        totals = {row[0]: row[1] for row in cursor.fetchall()}
+        income, expense = totals.get("income", 0), totals.get("expense", 0)
 
-        results = []
-        for row in cursor.fetchall():
-            results.append(
-                {
-                    "category": row["category"],
-                    "monthly_limit": row["monthly_limit"],
-                    "spent": row["spent"],
-                    "remaining": row["monthly_limit"] - row["spent"],
-                    "percentage": (row["spent"] / row["monthly_limit"] * 100)
-                    if row["monthly_limit"] > 0
-                    else 0,
-                }
-            )
-        return results
+        return {
+            "status": "ok",
+            "month": month,
+            "balance": _select_balance(cursor, user_id),
+            "month_totals": {
+                "income": from_cents(income),
+                "expense": from_cents(expense),
+                "net": from_cents(income - expense),
+            },
+            "expenses_by_category": _select_expenses_by_category(
+                cursor, user_id, month
+            ),
+            "budget_status": _select_budget_status(cursor, user_id, month),
+            "recent_transactions": _select_transactions(
+                cursor, user_id, recent_limit
+            ),
+        }
+
+
+def get_budget_alerts(
+    user_id: str, month: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Lista os alertas de meta já disparados (limiar cruzado) no mês.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        month: Mês YYYY-MM (opcional, padrão: mês corrente)
+    """
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        if not month:
+            month = _current_month(_user_timezone(cursor, user_id))
+        cursor.execute(
+            """SELECT category, month, threshold, spent_cents, limit_cents, created_at
+               FROM budget_alerts
+               WHERE user_id = ? AND month = ?
+               ORDER BY created_at, threshold""",
+            (user_id, month),
+        )
+        return [
+            {
+                "category": row["category"],
+                "month": row["month"],
+                "threshold": row["threshold"],
+                "spent": from_cents(row["spent_cents"]),
+                "limit": from_cents(row["limit_cents"]),
+                "created_at": row["created_at"],
+            }
+            for row in cursor.fetchall()
+        ]
 
 
 def delete_budget_goal(user_id: str, category: str) -> Dict[str, Any]:
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
         cursor.execute(
             "DELETE FROM budget_goals WHERE user_id = ? AND category = ?",
@@ -309,6 +1432,8 @@ def delete_budget_goal(user_id: str, category: str) -> Dict[str, Any]:
         )
         return {"status": "ok", "deleted": cursor.rowcount}
 
+    return run_write(_write, user_id=user_id)
+
 
 def add_calendar_log(
     user_id: str,
@@ -319,6 +1444,9 @@ def add_calendar_log(
     """
     Registra uma ação de calendário (created, updated, deleted).
 
+    O estado atual do evento (`calendar_event_state`) é atualizado na mesma
+    transação pelo trigger de insert do log.
+
     Args:
         user_id: WhatsApp number do usuário
         google_event_id: ID do evento no Google Calendar
@@ -328,11 +1456,10 @@ def add_calendar_log(
     if action not in ("created", "updated", "deleted"):
         return {"status": "error", "error": f"Ação inválida: {action}"}
 
-    # Garante que o usuário existe
-    create_user(user_id)
-
-    with get_connection() as conn:
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
+        # Garante que o usuário existe
+        _ensure_user(cursor, user_id)
         cursor.execute(
             """INSERT INTO calendar_events (user_id, google_event_id, action, event_summary)
                VALUES (?, ?, ?, ?)""",
@@ -340,6 +1467,14 @@ def add_calendar_log(
         )
         return {"status": "ok", "id": cursor.lastrowid}
 
+    return run_write(_write, user_id=user_id)
+
+
+# O estado guarda o registro mais recente do log com as mesmas colunas.
+_CALENDAR_STATE_COLUMNS = (
+    "log_id AS id, user_id, google_event_id, action, event_summary, created_at"
+)
+
 
 def get_calendar_events(
     user_id: str,
@@ -364,7 +1499,7 @@ def get_calendar_events(
     query += " ORDER BY created_at DESC LIMIT ?"
     params.append(limit)
 
-    with get_connection() as conn:
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
@@ -381,24 +1516,170 @@ def get_event_by_google_id(
         user_id: WhatsApp number do usuário
         google_event_id: ID do evento no Google Calendar
     """
-    with get_connection() as conn:
+    with get_read_connection(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT * FROM calendar_events 
-               WHERE user_id = ? AND google_event_id = ? 
-               ORDER BY created_at DESC LIMIT 1""",
+            f"""SELECT {_CALENDAR_STATE_COLUMNS} FROM calendar_event_state
+               WHERE user_id = ? AND google_event_id = ?""",
             (user_id, google_event_id),
         )
         row = cursor.fetchone()
         return dict(row) if row else None
 
 
+def get_current_calendar_events(
+    user_id: str,
+    action: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Retorna o estado atual (última ação registrada) de cada evento do usuário.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        action: Filtrar pela ação atual, ex.: 'created' (opcional,
+            padrão: todos os eventos que não foram apagados)
+        limit: Número máximo de resultados
+    """
+    query = (
+        f"SELECT {_CALENDAR_STATE_COLUMNS} FROM calendar_event_state "
+        "WHERE user_id = ?"
+    )
+    params: List[Any] = [user_id]
+
+    if action:
+        query += " AND action = ?"
+        params.append(action)
+    else:
+        query += " AND action != 'deleted'"
+
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def search_calendar_events(
+    user_id: str,
+    query: str,
+    action: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """
+    Busca no log de calendário pelo título do evento (ex.: "reunião João").
+
+    Args:
+        user_id: WhatsApp number do usuário
+        query: Palavras a procurar no título (acentos e caixa são ignorados)
+        action: Filtrar por tipo de ação (opcional)
+        start_date: Registros a partir desta data YYYY-MM-DD (opcional)
+        end_date: Registros até esta data YYYY-MM-DD (opcional)
+        limit: Número máximo de resultados
+
+    Returns:
+        Dicionário com events, ordenados por relevância.
+    """
+    match = _fts_query(query)
+    if match is None:
+        return {"status": "error", "error": "query must contain at least one word"}
+
+    where = " WHERE user_id = ?"
+    params: List[Any] = [user_id]
+
+    if action:
+        where += " AND action = ?"
+        params.append(action)
+
+    with get_read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        if start_date or end_date:
+            try:
+                start_ts, end_ts = range_bounds(
+                    start_date, end_date, _user_timezone(cursor, user_id)
+                )
+            except ValueError as e:
+                return {"status": "error", "error": f"invalid date filter: {e}"}
+            # created_at é gravado em UTC pelo CURRENT_TIMESTAMP do SQLite.
+            if start_ts is not None:
+                where += " AND CAST(strftime('%s', created_at) AS INTEGER) >= ?"
+                params.append(start_ts)
+            if end_ts is not None:
+                where += " AND CAST(strftime('%s', created_at) AS INTEGER) < ?"
+                params.append(end_ts)
+
+        events = _search_calendar_in(
+            cursor, "calendar_events_fts", match, where, params, limit
+        )
+
+    archive = connect_archive_reader(database_path(user_id), "calendar_events")
+    if archive is not None:
+        try:
+            cursor = archive.cursor()
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE temp.hits_fts USING fts5("
+                f"event_summary, tokenize='{FTS_TOKENIZE}')"
+            )
+            cursor.execute(
+                f"INSERT INTO temp.hits_fts (rowid, event_summary) "
+                f"SELECT id, event_summary FROM calendar_events{where}",
+                params,
+            )
+            archived = _search_calendar_in(
+                cursor, "hits_fts", match, where, params, limit
+            )
+        finally:
+            archive.close()
+        for _, event in archived:
+            event.pop("archived_at", None)
+        # Mesma ordem das consultas: relevância e, no empate, o mais recente.
+        events = sorted(
+            events + archived, key=lambda hit: hit[1]["created_at"] or "", reverse=True
+        )
+        events = sorted(events, key=lambda hit: hit[0])[:limit]
+
+    return {"status": "ok", "events": [event for _, event in events]}
+
+
+def _search_calendar_in(
+    cursor: sqlite3.Cursor,
+    fts: str,
+    match: str,
+    where: str,
+    params: List[Any],
+    limit: int,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    cursor.execute(
+        f"""
+        WITH hits AS (
+            SELECT rowid AS hit_id, bm25({fts}) AS rank
+            FROM {fts} WHERE {fts} MATCH ?
+        )
+        SELECT hits.rank AS hit_rank, calendar_events.* FROM calendar_events
+        JOIN hits ON hits.hit_id = calendar_events.id
+        {where} ORDER BY hits.rank, created_at DESC LIMIT ?""",
+        [match] + params + [limit],
+    )
+    hits = []
+    for row in cursor.fetchall():
+        event = dict(row)
+        hits.append((event.pop("hit_rank"), event))
+    return hits
+
+
 def delete_calendar_event_log(log_id: int, user_id: str) -> Dict[str, Any]:
     """Remove um log de evento de calendário."""
-    with get_connection() as conn:
+
+    def _write(conn: sqlite3.Connection) -> Dict[str, Any]:
         cursor = conn.cursor()
         cursor.execute(
             "DELETE FROM calendar_events WHERE id = ? AND user_id = ?",
             (log_id, user_id),
         )
         return {"status": "ok", "deleted": cursor.rowcount}
+
+    return run_write(_write, user_id=user_id)
@@ -0,0 +1,266 @@
+"""
+Exportação do histórico financeiro de um usuário.
+
+As linhas são lidas em blocos via `iter_transactions` e escritas conforme
+chegam, então o consumo de memória não depende do tamanho do histórico.
+O histórico inclui as linhas já movidas para o arquivo morto (`archive.py`).
+Parquet e Arrow exigem o pacote opcional `pyarrow`.
+
+Uso:
+    python -m life_os_agent.database.export 5511999999999 --format csv -o extrato.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .crud import TRANSACTION_COLUMNS, iter_transactions
+from .timestamps import range_bounds
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("jsonl", "csv", "parquet", "arrow")
+EXPORT_DIR = os.getenv("LIFEOS_EXPORT_DIR", "exports")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _chunks(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk: List[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_jsonl(path: Path, rows: Iterator[tuple]) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        for row in rows:
+            record = dict(zip(TRANSACTION_COLUMNS, row))
+            fh.write(json.dumps(record, ensure_ascii=False))
+            fh.write("\n")
+            count += 1
+    return count
+
+
+def _write_csv(path: Path, rows: Iterator[tuple]) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(TRANSACTION_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _arrow_schema():
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("user_id", pa.string()),
+            ("description", pa.string()),
+            ("amount", pa.float64()),
+            ("amount_cents", pa.int64()),
+            ("currency", pa.string()),
+            ("category", pa.string()),
+            ("type", pa.string()),
+            ("date", pa.string()),
+            ("ts", pa.int64()),
+        ]
+    )
+
+
+def _to_record_batch(schema, chunk: List[tuple]):
+    columns = list(zip(*chunk))
+    return pa.record_batch(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _write_columnar(
+    path: Path, rows: Iterator[tuple], file_format: str, chunk_size: int
+) -> int:
+    schema = _arrow_schema()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(str(path), schema)
+    else:
+        writer = pa.ipc.new_file(str(path), schema)
+
+    count = 0
+    try:
+        # Cada bloco vira um row group / record batch independente.
+        for chunk in _chunks(rows, chunk_size):
+            batch = _to_record_batch(schema, chunk)
+            if file_format == "parquet":
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
+
+
+def _default_output_path(user_id: str, file_format: str) -> Path:
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    # O user_id vem do agente: só entra no nome caracteres inofensivos.
+    safe_user = re.sub(r"[^0-9A-Za-z_-]", "_", str(user_id))
+    return Path(EXPORT_DIR) / f"{safe_user}-{stamp}.{file_format}"
+
+
+def export_transactions(
+    user_id: str,
+    file_format: str = "csv",
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Exporta o histórico de transações do usuário para um arquivo.
+
+    O arquivo é sempre criado em LIFEOS_EXPORT_DIR; o caminho não é
+    escolhido por quem chama, para que o agente não possa sobrescrever
+    outros arquivos.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        file_format: 'csv', 'jsonl', 'parquet' ou 'arrow'
+        category, transaction_type, start_date, end_date: Filtros opcionais
+
+    Returns:
+        Dicionário com path, rows, bytes e elapsed_seconds.
+    """
+    path = _default_output_path(user_id, str(file_format).lower())
+    if Path(EXPORT_DIR).resolve() not in path.resolve().parents:
+        return {"status": "error", "error": f"Caminho inválido para exportar: {path}"}
+    return export_to_path(
+        user_id,
+        path,
+        file_format=file_format,
+        category=category,
+        transaction_type=transaction_type,
+        start_date=start_date,
+        end_date=end_date,
+        chunk_size=chunk_size,
+    )
+
+
+def export_to_path(
+    user_id: str,
+    path: Path,
+    file_format: str = "csv",
+    category: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Exporta para um caminho qualquer (só para a linha de comando, não é tool)."""
+    file_format = file_format.lower()
+    if file_format not in EXPORT_FORMATS:
+        return {
+            "status": "error",
+            "error": f"Formato não suportado: {file_format}. Use {EXPORT_FORMATS}",
+        }
+    if file_format in ("parquet", "arrow") and pa is None:
+        return {
+            "status": "error",
+            "error": f"Exportar {file_format} requer o pacote pyarrow",
+        }
+
+    # Filtros inválidos falham aqui, antes de criar o arquivo.
+    try:
+        range_bounds(start_date, end_date)
+    except ValueError as e:
+        return {"status": "error", "error": f"invalid date filter: {e}"}
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    rows = iter_transactions(
+        user_id,
+        category=category,
+        transaction_type=transaction_type,
+        start_date=start_date,
+        end_date=end_date,
+        chunk_size=chunk_size,
+    )
+    try:
+        if file_format == "jsonl":
+            count = _write_jsonl(path, rows)
+        elif file_format == "csv":
+            count = _write_csv(path, rows)
+        else:
+            count = _write_columnar(path, rows, file_format, chunk_size)
+    except ValueError as e:
+        # Não deixa um arquivo parcial passando por exportação completa.
+        path.unlink(missing_ok=True)
+        return {"status": "error", "error": str(e)}
+
+    return {
+        "status": "ok",
+        "path": str(path),
+        "format": file_format,
+        "rows": count,
+        "bytes": path.stat().st_size,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporta o histórico financeiro de um usuário."
+    )
+    parser.add_argument("user", help="WhatsApp number do usuário")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("-o", "--output", help="Arquivo de saída")
+    parser.add_argument("--category")
+    parser.add_argument("--type", choices=("income", "expense"))
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    filters = dict(
+        category=args.category,
+        transaction_type=args.type,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        chunk_size=args.chunk_size,
+    )
+    if args.output:
+        result = export_to_path(
+            args.user, Path(args.output), file_format=args.format, **filters
+        )
+    else:
+        result = export_transactions(args.user, file_format=args.format, **filters)
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+    print(
+        f"📤 {result['rows']} transações exportadas para {result['path']} "
+        f"({result['bytes']} bytes, {result['elapsed_seconds']}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,837 @@
+"""
+Migrações versionadas do schema, controladas por `PRAGMA user_version`.
+
+Cada migração tem um passo de schema, executado numa transação curta, e
+opcionalmente um backfill em blocos (ver `backfills.py`) que roda depois,
+com o banco em uso. A versão só avança quando os dois terminam; como os
+passos são idempotentes, uma migração interrompida é retomada do começo.
+
+Uso:
+    python -m life_os_agent.database.migrations [--dry-run] [--target N]
+"""
+
+import argparse
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .archive import attach_archive, history_source
+from .backfills import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_PAUSE,
+    backfill_amount_cents,
+    backfill_category_ids,
+    backfill_transaction_ts,
+)
+from .rollups import (
+    rebuild_balances_in,
+    rebuild_calendar_state_in,
+    rebuild_daily_totals_in,
+    rebuild_monthly_totals_in,
+    rollup_needs_rebuild,
+)
+from .setup import database_path, get_connection, shard_paths, using_database
+from .timestamps import DEFAULT_TIMEZONE
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    schema: Callable[[sqlite3.Cursor], None]
+    backfill: Optional[Callable[..., Dict[str, Any]]] = None
+    # Conta as linhas que o backfill ainda precisa converter (para o dry-run).
+    pending: Optional[Callable[[sqlite3.Cursor], int]] = None
+
+
+# Datas legadas inválidas caem no mês (ou dia) '' em vez de violar o NOT NULL.
+_MONTH_OF = "IFNULL(strftime('%Y-%m', {row}.date), '')"
+_DAY_OF = "IFNULL(date({row}.date), '')"
+
+# Linhas ainda não convertidas pelo backfill caem no valor REAL legado.
+_CENTS_OF = "COALESCE({row}.amount_cents, CAST(ROUND({row}.amount * 100) AS INTEGER))"
+
+# Ignora updates que não mudam nenhum valor agregado (ex.: o backfill de centavos).
+_AGGREGATE_CHANGED = """
+    old.user_id IS NOT new.user_id
+    OR old.category IS NOT new.category
+    OR old.type IS NOT new.type
+    OR old.date IS NOT new.date
+    OR {old_cents} IS NOT {new_cents}
+""".format(old_cents=_CENTS_OF.format(row="old"), new_cents=_CENTS_OF.format(row="new"))
+
+
+# Id da categoria (migração 10). Linhas que o backfill ainda não converteu
+# são resolvidas pelo nome.
+_CATEGORY_ID_OF = (
+    "COALESCE({row}.category_id, "
+    "(SELECT id FROM categories WHERE name = {row}.category))"
+)
+
+
+def _category_rollup_triggers(
+    table: str,
+    period_column: str,
+    period_of: str,
+    name: str,
+    delete_when: Optional[str] = None,
+    category_column: str = "category",
+    category_of: str = "{row}.category",
+) -> Tuple[str, ...]:
+    """Triggers que mantêm `table` (por usuário, período, categoria e tipo)
+    em sincronia com qualquer escrita em transactions."""
+    add = """
+        INSERT INTO {table}
+            (user_id, {column}, {category_column}, type, total_cents, count)
+        VALUES (new.user_id, {period}, {category}, new.type, {cents}, 1)
+        ON CONFLICT(user_id, {column}, {category_column}, type)
+        DO UPDATE SET total_cents = total_cents + excluded.total_cents,
+                      count = count + 1;
+    """.format(
+        table=table,
+        column=period_column,
+        category_column=category_column,
+        period=period_of.format(row="new"),
+        category=category_of.format(row="new"),
+        cents=_CENTS_OF.format(row="new"),
+    )
+    sub = """
+        UPDATE {table}
+        SET total_cents = total_cents - {cents}, count = count - 1
+        WHERE user_id = old.user_id AND {column} = {period}
+          AND {category_column} = {category} AND type = old.type;
+        DELETE FROM {table}
+        WHERE user_id = old.user_id AND {column} = {period}
+          AND {category_column} = {category} AND type = old.type AND count <= 0;
+    """.format(
+        table=table,
+        column=period_column,
+        category_column=category_column,
+        period=period_of.format(row="old"),
+        category=category_of.format(row="old"),
+        cents=_CENTS_OF.format(row="old"),
+    )
+    delete_guard = f"WHEN {delete_when}" if delete_when else ""
+    return (
+        f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_{name}_insert
+            AFTER INSERT ON transactions
+            BEGIN {add} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_{name}_delete
+            AFTER DELETE ON transactions
+            {delete_guard}
+            BEGIN {sub} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_{name}_update
+            AFTER UPDATE ON transactions
+            WHEN {_AGGREGATE_CHANGED}
+            BEGIN {sub} {add} END""",
+    )
+
+
+# Dentro da transação do arquivamento (ver `archive.py`) a flag 'archiving'
+# fica ligada e apagar transações não desconta os rollups: o histórico
+# arquivado continua somado.
+_NOT_ARCHIVING = (
+    "NOT EXISTS (SELECT 1 FROM maintenance_flags WHERE name = 'archiving')"
+)
+
+_MONTHLY_TOTALS_TRIGGERS = _category_rollup_triggers(
+    "monthly_category_totals", "month", _MONTH_OF, "monthly"
+)
+_DAILY_TOTALS_TRIGGERS = _category_rollup_triggers(
+    "daily_category_totals", "day", _DAY_OF, "daily"
+)
+
+
+_BALANCE_ADD = """
+    INSERT INTO user_balances (user_id, income_cents, expense_cents, count)
+    VALUES (
+        new.user_id,
+        CASE WHEN new.type = 'income' THEN {cents} ELSE 0 END,
+        CASE WHEN new.type = 'expense' THEN {cents} ELSE 0 END,
+        1
+    )
+    ON CONFLICT(user_id) DO UPDATE SET
+        income_cents = income_cents + excluded.income_cents,
+        expense_cents = expense_cents + excluded.expense_cents,
+        count = count + 1;
+""".format(cents=_CENTS_OF.format(row="new"))
+
+_BALANCE_SUB = """
+    UPDATE user_balances SET
+        income_cents = income_cents - CASE WHEN old.type = 'income' THEN {cents} ELSE 0 END,
+        expense_cents = expense_cents - CASE WHEN old.type = 'expense' THEN {cents} ELSE 0 END,
+        count = count - 1
+    WHERE user_id = old.user_id;
+""".format(cents=_CENTS_OF.format(row="old"))
+
+# Saldo corrente por usuário, atualizado na mesma transação da escrita.
+_BALANCE_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_insert
+        AFTER INSERT ON transactions
+        BEGIN {_BALANCE_ADD} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_delete
+        AFTER DELETE ON transactions
+        BEGIN {_BALANCE_SUB} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_update
+        AFTER UPDATE ON transactions
+        WHEN {_AGGREGATE_CHANGED}
+        BEGIN {_BALANCE_SUB} {_BALANCE_ADD} END""",
+)
+
+# Triggers de delete que respeitam a flag 'archiving' (migração 7).
+_ARCHIVE_SAFE_DELETE_TRIGGERS = {
+    "trg_transactions_monthly_delete": _category_rollup_triggers(
+        "monthly_category_totals", "month", _MONTH_OF, "monthly", _NOT_ARCHIVING
+    )[1],
+    "trg_transactions_daily_delete": _category_rollup_triggers(
+        "daily_category_totals", "day", _DAY_OF, "daily", _NOT_ARCHIVING
+    )[1],
+    "trg_transactions_balance_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance_delete
+        AFTER DELETE ON transactions
+        WHEN {_NOT_ARCHIVING}
+        BEGIN {_BALANCE_SUB} END""",
+}
+
+# Rollups por categoria chaveados pelo id inteiro (migração 10).
+_CATEGORY_ID_ROLLUPS = (
+    (
+        "monthly_category_totals",
+        "month",
+        "monthly",
+        _category_rollup_triggers(
+            "monthly_category_totals",
+            "month",
+            _MONTH_OF,
+            "monthly",
+            _NOT_ARCHIVING,
+            "category_id",
+            _CATEGORY_ID_OF,
+        ),
+    ),
+    (
+        "daily_category_totals",
+        "day",
+        "daily",
+        _category_rollup_triggers(
+            "daily_category_totals",
+            "day",
+            _DAY_OF,
+            "daily",
+            _NOT_ARCHIVING,
+            "category_id",
+            _CATEGORY_ID_OF,
+        ),
+    ),
+)
+
+# Estado atual de cada evento: o registro mais recente do log. Registros
+# mais antigos que o estado (ex.: o arquivo morto copiado por um reshard)
+# não o sobrescrevem.
+_CALENDAR_STATE_UPSERT = """
+    INSERT INTO calendar_event_state
+        (user_id, google_event_id, action, event_summary, log_id, created_at)
+    VALUES (
+        new.user_id, new.google_event_id, new.action, new.event_summary,
+        new.id, new.created_at
+    )
+    ON CONFLICT(user_id, google_event_id) DO UPDATE SET
+        action = excluded.action,
+        event_summary = excluded.event_summary,
+        log_id = excluded.log_id,
+        created_at = excluded.created_at
+    WHERE (excluded.created_at, excluded.log_id)
+        > (calendar_event_state.created_at, calendar_event_state.log_id);
+"""
+
+# Apagar (ou alterar) o registro que define o estado volta ao mais recente
+# ainda no log.
+_CALENDAR_STATE_REVERT = """
+    DELETE FROM calendar_event_state
+    WHERE user_id = old.user_id AND google_event_id = old.google_event_id
+      AND log_id = old.id;
+    INSERT INTO calendar_event_state
+        (user_id, google_event_id, action, event_summary, log_id, created_at)
+    SELECT user_id, google_event_id, action, event_summary, id, created_at
+    FROM calendar_events
+    WHERE user_id = old.user_id AND google_event_id = old.google_event_id
+    ORDER BY created_at DESC, id DESC LIMIT 1
+    ON CONFLICT(user_id, google_event_id) DO NOTHING;
+"""
+
+_CALENDAR_STATE_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS trg_calendar_events_state_insert
+        AFTER INSERT ON calendar_events
+        BEGIN {_CALENDAR_STATE_UPSERT} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_calendar_events_state_delete
+        AFTER DELETE ON calendar_events
+        WHEN {_NOT_ARCHIVING}
+        BEGIN {_CALENDAR_STATE_REVERT} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_calendar_events_state_update
+        AFTER UPDATE ON calendar_events
+        BEGIN {_CALENDAR_STATE_REVERT} {_CALENDAR_STATE_UPSERT} END""",
+)
+
+# Índices de texto (FTS5, conteúdo externo): guardam só os tokens e apontam
+# para a linha original pelo rowid. Os triggers os mantêm em sincronia.
+_FTS_INDEXES = (
+    ("transactions_fts", "transactions", "description"),
+    ("calendar_events_fts", "calendar_events", "event_summary"),
+)
+
+
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+
+
+def _fts_statements(fts: str, table: str, column: str) -> List[str]:
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {column}, content='{table}', content_rowid='id',
+            tokenize='{FTS_TOKENIZE}'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {column}) VALUES (new.id, new.{column});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column})
+                VALUES ('delete', old.id, old.{column});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+            AFTER UPDATE OF {column} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column})
+                VALUES ('delete', old.id, old.{column});
+                INSERT INTO {fts} (rowid, {column}) VALUES (new.id, new.{column});
+            END""",
+    ]
+
+
+def _column_names(cursor: sqlite3.Cursor, table: str) -> set:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _add_column(cursor: sqlite3.Cursor, table: str, definition: str) -> None:
+    if definition.split()[0] not in _column_names(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+
+def _count_where(
+    cursor: sqlite3.Cursor, table: str, column: str, condition: str
+) -> int:
+    # Antes do passo de schema a coluna ainda não existe: tudo está pendente.
+    if column in _column_names(cursor, table):
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}")
+    else:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _initial_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            whatsapp_number TEXT PRIMARY KEY,
+            name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_column(cursor, "users", "last_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT CHECK(type IN ('income', 'expense')) NOT NULL,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id);"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category);"
+    )
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS budget_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            monthly_limit REAL NOT NULL,
+            UNIQUE(user_id, category),
+            FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_budget_goals_user ON budget_goals(user_id);"
+    )
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            google_event_id TEXT NOT NULL,
+            action TEXT CHECK(action IN ('created', 'updated', 'deleted')) NOT NULL,
+            event_summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_calendar_events_user ON calendar_events(user_id);"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_calendar_events_google_id "
+        "ON calendar_events(google_event_id);"
+    )
+
+
+def _amount_cents_schema(cursor: sqlite3.Cursor) -> None:
+    _add_column(cursor, "transactions", "amount_cents INTEGER")
+    _add_column(cursor, "transactions", "currency TEXT NOT NULL DEFAULT 'BRL'")
+
+
+def _rollups_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_category_totals (
+            user_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, category, type)
+        ) WITHOUT ROWID
+    """)
+    for statement in _MONTHLY_TOTALS_TRIGGERS:
+        cursor.execute(statement)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_balances (
+            user_id TEXT PRIMARY KEY,
+            income_cents INTEGER NOT NULL DEFAULT 0,
+            expense_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for statement in _BALANCE_TRIGGERS:
+        cursor.execute(statement)
+
+    if rollup_needs_rebuild(cursor, "monthly_category_totals"):
+        rebuild_monthly_totals_in(cursor)
+    if rollup_needs_rebuild(cursor, "user_balances"):
+        rebuild_balances_in(cursor)
+
+
+def _timestamps_schema(cursor: sqlite3.Cursor) -> None:
+    _add_column(
+        cursor, "users", f"timezone TEXT NOT NULL DEFAULT '{DEFAULT_TIMEZONE}'"
+    )
+    _add_column(cursor, "transactions", "ts INTEGER")
+    _add_column(cursor, "transactions", "tz TEXT")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_ts "
+        "ON transactions(user_id, ts, id);"
+    )
+    # Substituídos por idx_transactions_user_ts: filtros e paginação usam `ts`.
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_date;")
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_user_date;")
+
+
+def _full_text_search_schema(cursor: sqlite3.Cursor) -> None:
+    for fts, table, column in _FTS_INDEXES:
+        for statement in _fts_statements(fts, table, column):
+            cursor.execute(statement)
+        # Indexa o histórico existente; idempotente se a migração for repetida.
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def _daily_rollups_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_category_totals (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, category, type)
+        ) WITHOUT ROWID
+    """)
+    for statement in _DAILY_TOTALS_TRIGGERS:
+        cursor.execute(statement)
+
+    if rollup_needs_rebuild(cursor, "daily_category_totals"):
+        rebuild_daily_totals_in(cursor)
+
+
+def _archival_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_flags (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 1
+        ) WITHOUT ROWID
+    """)
+    for trigger, statement in _ARCHIVE_SAFE_DELETE_TRIGGERS.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(statement)
+
+
+def _budget_alerts_schema(cursor: sqlite3.Cursor) -> None:
+    # Um registro por limiar cruzado em cada mês: o UNIQUE faz a deduplicação.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS budget_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            month TEXT NOT NULL,
+            threshold INTEGER NOT NULL,
+            spent_cents INTEGER NOT NULL,
+            limit_cents INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, category, month, threshold),
+            FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+        )
+    """)
+
+
+def _calendar_event_state_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_event_state (
+            user_id TEXT NOT NULL,
+            google_event_id TEXT NOT NULL,
+            action TEXT NOT NULL,
+            event_summary TEXT,
+            log_id INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (user_id, google_event_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_calendar_event_state_user_action "
+        "ON calendar_event_state(user_id, action, created_at);"
+    )
+    for statement in _CALENDAR_STATE_TRIGGERS:
+        cursor.execute(statement)
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_calendar_events_user_google "
+        "ON calendar_events(user_id, google_event_id, created_at);"
+    )
+    # Substituídos pelo índice composto: toda consulta filtra por user_id.
+    cursor.execute("DROP INDEX IF EXISTS idx_calendar_events_google_id;")
+    cursor.execute("DROP INDEX IF EXISTS idx_calendar_events_user;")
+
+    if rollup_needs_rebuild(cursor, "calendar_event_state", "calendar_events"):
+        rebuild_calendar_state_in(cursor)
+
+
+def _category_ids_schema(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    _add_column(
+        cursor, "transactions", "category_id INTEGER REFERENCES categories(id)"
+    )
+
+    # Todos os nomes já usados, inclusive no arquivo morto, ganham um id; o
+    # backfill só precisa copiá-lo para cada transação.
+    for source in (
+        history_source(cursor, ("category",)),
+        "budget_goals",
+        "budget_alerts",
+    ):
+        cursor.execute(
+            f"INSERT OR IGNORE INTO categories (name) "
+            f"SELECT DISTINCT category FROM {source}"
+        )
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_category "
+        "ON transactions(user_id, category_id, ts);"
+    )
+    # Substituído pelo índice por id: os filtros de categoria usam category_id.
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_category;")
+
+    for table, period_column, name, triggers in _CATEGORY_ID_ROLLUPS:
+        if "category_id" not in _column_names(cursor, table):
+            # Derivados: recriados com a nova chave e reconstruídos abaixo.
+            for event in ("insert", "delete", "update"):
+                cursor.execute(
+                    f"DROP TRIGGER IF EXISTS trg_transactions_{name}_{event}"
+                )
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id TEXT NOT NULL,
+                {period_column} TEXT NOT NULL,
+                category_id INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                total_cents INTEGER NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, {period_column}, category_id, type)
+            ) WITHOUT ROWID
+        """)
+        for statement in triggers:
+            cursor.execute(statement)
+
+    if rollup_needs_rebuild(cursor, "monthly_category_totals"):
+        rebuild_monthly_totals_in(cursor)
+    if rollup_needs_rebuild(cursor, "daily_category_totals"):
+        rebuild_daily_totals_in(cursor)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", _initial_schema),
+    Migration(
+        2,
+        "transaction_amount_cents",
+        _amount_cents_schema,
+        backfill=backfill_amount_cents,
+        pending=lambda cursor: _count_where(
+            cursor, "transactions", "amount_cents", "amount_cents IS NULL"
+        ),
+    ),
+    Migration(3, "rollup_tables", _rollups_schema),
+    Migration(
+        4,
+        "utc_timestamps",
+        _timestamps_schema,
+        backfill=backfill_transaction_ts,
+        pending=lambda cursor: _count_where(cursor, "transactions", "ts", "ts IS NULL"),
+    ),
+    Migration(5, "full_text_search", _full_text_search_schema),
+    Migration(6, "daily_rollups", _daily_rollups_schema),
+    Migration(7, "archival", _archival_schema),
+    Migration(8, "budget_alerts", _budget_alerts_schema),
+    Migration(9, "calendar_event_state", _calendar_event_state_schema),
+    Migration(
+        10,
+        "category_ids",
+        _category_ids_schema,
+        backfill=backfill_category_ids,
+        pending=lambda cursor: _count_where(
+            cursor, "transactions", "category_id", "category_id IS NULL"
+        ),
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version() -> int:
+    with get_connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _table_exists(cursor: sqlite3.Cursor, table: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    )
+    return cursor.fetchone() is not None
+
+
+def _plan(migrations: List[Migration]) -> List[Dict[str, Any]]:
+    plan = []
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        has_transactions = _table_exists(cursor, "transactions")
+        for migration in migrations:
+            step: Dict[str, Any] = {
+                "version": migration.version,
+                "name": migration.name,
+                "backfill": migration.backfill.__name__ if migration.backfill else None,
+            }
+            if migration.pending:
+                step["pending_rows"] = (
+                    migration.pending(cursor) if has_transactions else 0
+                )
+            plan.append(step)
+    return plan
+
+
+def _migrate_database(
+    target: int,
+    dry_run: bool,
+    chunk_size: int,
+    pause: float,
+    progress: Optional[ProgressCallback],
+) -> Dict[str, Any]:
+    current = get_schema_version()
+    if current > LATEST_VERSION:
+        return {
+            "status": "error",
+            "error": f"Banco na versão {current}, mais nova que o código "
+            f"({LATEST_VERSION})",
+        }
+    if target < current:
+        return {
+            "status": "error",
+            "error": f"Downgrade não suportado (versão atual {current})",
+        }
+
+    migrations = [m for m in MIGRATIONS if current < m.version <= target]
+    if dry_run:
+        return {
+            "status": "ok",
+            "dry_run": True,
+            "from_version": current,
+            "to_version": target,
+            "pending": _plan(migrations),
+        }
+
+    with get_connection() as conn:
+        if current == 0:
+            # Só tem efeito num arquivo ainda vazio (banco novo); bancos antigos
+            # são convertidos com `archive --convert`.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Persistente no arquivo: leitores (pool somente leitura) não bloqueiam
+        # as escritas e cada um lê um snapshot consistente.
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    applied = []
+    for migration in migrations:
+        started = time.perf_counter()
+        if progress:
+            progress({"migration": migration.name, "version": migration.version})
+        with get_connection() as conn:
+            # Reconstruções de rollup feitas pelas migrações incluem o arquivo morto.
+            attach_archive(conn, database_path())
+            conn.execute("BEGIN IMMEDIATE")
+            migration.schema(conn.cursor())
+
+        step: Dict[str, Any] = {"version": migration.version, "name": migration.name}
+        if migration.backfill:
+            step["backfill"] = migration.backfill(
+                chunk_size=chunk_size, pause=pause, progress=progress
+            )
+
+        with get_connection() as conn:
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+        step["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        applied.append(step)
+
+    return {
+        "status": "ok",
+        "from_version": current,
+        "to_version": max(current, target),
+        "applied": applied,
+    }
+
+
+def migrate(
+    target: Optional[int] = None,
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    pause: float = DEFAULT_PAUSE,
+    progress: Optional[ProgressCallback] = None,
+    paths: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Aplica, em ordem, as migrações acima da versão atual de cada banco.
+
+    Args:
+        target: Versão final (opcional, padrão: a mais recente)
+        dry_run: Apenas lista o que seria aplicado, sem alterar o banco
+        chunk_size: Linhas por bloco nos backfills
+        pause: Pausa em segundos entre os blocos dos backfills
+        progress: Callback chamado a cada passo e a cada bloco de backfill
+        paths: Arquivos a migrar (opcional, padrão: todos os shards)
+
+    Returns:
+        Dicionário com from_version, to_version e applied (ou pending no dry-run).
+        Com mais de um arquivo, os passos trazem o `path` e o resultado de cada
+        arquivo fica em `shards`.
+    """
+    target = LATEST_VERSION if target is None else target
+    paths = paths or shard_paths()
+    if len(paths) == 1:
+        with using_database(paths[0]):
+            return _migrate_database(target, dry_run, chunk_size, pause, progress)
+
+    shards = []
+    for path in paths:
+        if progress:
+            progress({"shard": path})
+        with using_database(path):
+            result = _migrate_database(target, dry_run, chunk_size, pause, progress)
+        if result["status"] != "ok":
+            return {**result, "path": path}
+        shards.append({**result, "path": path})
+
+    key = "pending" if dry_run else "applied"
+    combined: Dict[str, Any] = {
+        "status": "ok",
+        "from_version": min(shard["from_version"] for shard in shards),
+        "to_version": max(shard["to_version"] for shard in shards),
+        key: [
+            {**step, "path": shard["path"]} for shard in shards for step in shard[key]
+        ],
+        "shards": shards,
+    }
+    if dry_run:
+        combined["dry_run"] = True
+    return combined
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica as migrações do LifeOS.")
+    parser.add_argument("--target", type=int, help="Versão final (padrão: última)")
+    parser.add_argument("--dry-run", action="store_true", help="Só mostra o plano")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE)
+    args = parser.parse_args()
+
+    def report(event: Dict[str, Any]) -> None:
+        if "shard" in event:
+            print(f"🗂️  {event['shard']}")
+        elif "migration" in event:
+            print(f"🔧 v{event['version']} {event['migration']}")
+        else:
+            print(f"   ... {event['rows']} linhas convertidas ({event['backfill']})")
+
+    result = migrate(
+        target=args.target,
+        dry_run=args.dry_run,
+        chunk_size=args.chunk_size,
+        pause=args.pause,
+        progress=report,
+    )
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+
+    if result.get("dry_run"):
+        print(f"📋 Versão atual: {result['from_version']}")
+        if not result["pending"]:
+            print("   Nenhuma migração pendente.")
+        for step in result["pending"]:
+            line = f"   - v{step['version']} {step['name']}"
+            if step.get("path"):
+                line += f" [{step['path']}]"
+            if step.get("backfill"):
+                line += f" (backfill: {step['pending_rows']} linhas)"
+            print(line)
+        return
+
+    print(
+        f"✅ Schema na versão {result['to_version']} "
+        f"({len(result['applied'])} migrações aplicadas)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Conversão de valores monetários entre a API (float) e o banco (centavos)."""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Optional
+
+DEFAULT_CURRENCY = "BRL"
+
+_CENT = Decimal("0.01")
+
+# Linhas ainda não convertidas pelo backfill caem no valor REAL legado.
+CENTS_SQL = "COALESCE(amount_cents, CAST(ROUND(amount * 100) AS INTEGER))"
+
+
+def to_cents(amount: Any) -> int:
+    """Converte um valor (float, str ou Decimal) em centavos inteiros."""
+    value = Decimal(str(amount)).quantize(_CENT, rounding=ROUND_HALF_UP)
+    return int(value * 100)
+
+
+def from_cents(cents: Optional[int]) -> float:
+    return float(Decimal(cents or 0) / 100)
@@ -0,0 +1,450 @@
+"""
+Instrumentação opcional das consultas ao SQLite.
+
+Com LIFEOS_DB_PROFILE=1, as conexões abertas por `setup` usam cursores que
+medem cada comando: chamadas, tempo total (execução + leitura das linhas),
+linhas e um histograma de latência por comando normalizado. Os blocos de
+`get_connection` e `get_read_connection` também são medidos, atribuídos à
+função de `crud` que os abriu. Comandos acima de LIFEOS_DB_SLOW_MS vão para o slow-query log junto
+com o `EXPLAIN QUERY PLAN`. Os parâmetros nunca são gravados.
+
+As estatísticas ficam em memória e são somadas a
+LIFEOS_DB_PROFILE_DIR/query_stats.json quando o processo termina.
+
+Uso:
+    python -m life_os_agent.database.profiling [--top 10] [--by caller] [--slow 5]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROFILE = os.getenv("LIFEOS_DB_PROFILE", "").lower() in ("1", "true")
+SLOW_QUERY_MS = float(os.getenv("LIFEOS_DB_SLOW_MS", "50"))
+PROFILE_DIR = os.getenv("LIFEOS_DB_PROFILE_DIR", "db_profile")
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima".
+HISTOGRAM_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+# Frames destes módulos são pulados ao procurar quem fez a consulta.
+_INTERNAL_MODULES = {
+    __name__,
+    "contextlib",
+    "life_os_agent.database.setup",
+    "life_os_agent.database.writer",
+}
+
+_lock = threading.Lock()
+_statements: Dict[str, Dict[str, Any]] = {}
+_callers: Dict[str, Dict[str, Any]] = {}
+_local = threading.local()
+
+
+def _normalize(sql: str) -> str:
+    # Listas IN (?, ?, ...) de tamanhos diferentes contam como o mesmo comando.
+    return _PLACEHOLDER_LIST.sub("?, ...", " ".join(sql.split()))
+
+
+def _caller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _INTERNAL_MODULES:
+            name = frame.f_code.co_qualname.split(".<locals>")[0]
+            return f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _empty_entry() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "rows": 0,
+        "histogram": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+    }
+
+
+def _bucket(elapsed_ms: float) -> int:
+    for index, limit in enumerate(HISTOGRAM_BUCKETS_MS):
+        if elapsed_ms <= limit:
+            return index
+    return len(HISTOGRAM_BUCKETS_MS)
+
+
+def _add(table: Dict[str, Dict[str, Any]], key: str, elapsed_ms: float, rows: int):
+    entry = table.get(key)
+    if entry is None:
+        entry = table[key] = _empty_entry()
+    entry["calls"] += 1
+    entry["total_ms"] += elapsed_ms
+    entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+    entry["rows"] += rows
+    entry["histogram"][_bucket(elapsed_ms)] += 1
+
+
+def _record(sql: str, elapsed_ms: float, rows: int, caller: str) -> None:
+    key = _normalize(sql)
+    with _lock:
+        _add(_statements, key, elapsed_ms, rows)
+        callers = _statements[key].setdefault("callers", {})
+        callers[caller] = callers.get(caller, 0) + 1
+
+
+def _log_slow(
+    conn: sqlite3.Connection,
+    sql: str,
+    parameters: Any,
+    elapsed_ms: float,
+    rows: int,
+    caller: str,
+) -> None:
+    plan: Optional[List[str]] = None
+    try:
+        # Cursor puro: o EXPLAIN não entra nas estatísticas.
+        cursor = sqlite3.Cursor(conn)
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        plan = [row[-1] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        pass
+    entry = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_ms": round(elapsed_ms, 3),
+        "rows": rows,
+        "caller": caller,
+        "sql": _normalize(sql),
+        "plan": plan,
+    }
+    path = Path(PROFILE_DIR) / "slow_queries.jsonl"
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry, ensure_ascii=False))
+            fh.write("\n")
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que mede cada comando até suas linhas serem lidas."""
+
+    _sql: Optional[str] = None
+
+    def _begin(self, sql: str, parameters: Any, started: float) -> None:
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = time.perf_counter() - started
+        self._rows = 0
+        self._caller = _caller()
+
+    def _finish(self) -> None:
+        sql, self._sql = self._sql, None
+        if sql is None:
+            return
+        rows = self._rows or max(self.rowcount, 0)
+        elapsed_ms = self._elapsed * 1000
+        _record(sql, elapsed_ms, rows, self._caller)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            _log_slow(
+                self.connection, sql, self._parameters, elapsed_ms, rows, self._caller
+            )
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            first = seq_of_parameters[0] if seq_of_parameters else ()
+            self._begin(sql, first, started)
+
+    def executescript(self, sql_script):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _record(sql_script, elapsed_ms, 0, _caller())
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            if row is None:
+                self._finish()
+            else:
+                self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            self._rows += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self._sql is not None:
+                self._elapsed += time.perf_counter() - started
+                self._finish()
+            raise
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except sqlite3.Error:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de `execute`) são medidos."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record("COMMIT", (time.perf_counter() - started) * 1000, 0, _caller())
+
+
+def connection_factory():
+    """Classe de conexão para `sqlite3.connect` (medida se o profiling está ativo)."""
+    return ProfiledConnection if PROFILE else sqlite3.Connection
+
+
+@contextmanager
+def _timed_block():
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _local.depth = depth
+        # Blocos aninhados já estão contidos no tempo do bloco externo.
+        if depth == 0:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with _lock:
+                _add(_callers, _caller(), elapsed_ms, 0)
+
+
+def profile_block():
+    """Mede um bloco de conexão e o atribui à função chamadora."""
+    return _timed_block() if PROFILE else nullcontext()
+
+
+def get_query_stats() -> Dict[str, Any]:
+    """Cópia das estatísticas acumuladas neste processo."""
+    with _lock:
+        return json.loads(json.dumps({"statements": _statements, "callers": _callers}))
+
+
+def reset_query_stats() -> None:
+    with _lock:
+        _statements.clear()
+        _callers.clear()
+
+
+def _merge(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+    for kind in ("statements", "callers"):
+        table = target.setdefault(kind, {})
+        for key, entry in source.get(kind, {}).items():
+            current = table.setdefault(key, _empty_entry())
+            current["calls"] += entry["calls"]
+            current["total_ms"] += entry["total_ms"]
+            current["max_ms"] = max(current["max_ms"], entry["max_ms"])
+            current["rows"] += entry["rows"]
+            current["histogram"] = [
+                a + b for a, b in zip(current["histogram"], entry["histogram"])
+            ]
+            if "callers" in entry:
+                callers = current.setdefault("callers", {})
+                for name, calls in entry["callers"].items():
+                    callers[name] = callers.get(name, 0) + calls
+
+
+def _load_saved() -> Dict[str, Any]:
+    path = Path(PROFILE_DIR) / "query_stats.json"
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_query_stats() -> Optional[str]:
+    """Soma as estatísticas do processo ao arquivo em LIFEOS_DB_PROFILE_DIR."""
+    stats = get_query_stats()
+    if not stats["statements"] and not stats["callers"]:
+        return None
+    saved = _load_saved()
+    _merge(saved, stats)
+    path = Path(PROFILE_DIR) / "query_stats.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(saved, fh, ensure_ascii=False, indent=1)
+    reset_query_stats()
+    return str(path)
+
+
+def _percentile_ms(histogram: List[int], fraction: float) -> Optional[float]:
+    # Limite superior da faixa que contém o percentil (None = acima da última).
+    target = sum(histogram) * fraction
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return (
+                HISTOGRAM_BUCKETS_MS[index]
+                if index < len(HISTOGRAM_BUCKETS_MS)
+                else None
+            )
+    return None
+
+
+def query_report(top: int = 10, by: str = "statement") -> Dict[str, Any]:
+    """
+    Lista os comandos (ou funções chamadoras) com maior tempo total.
+
+    Inclui o que foi salvo em disco e o que ainda está em memória.
+
+    Args:
+        top: Quantos itens listar
+        by: 'statement' (comando SQL) ou 'caller' (bloco de conexão)
+
+    Returns:
+        Dicionário com items ordenados por total_ms, cada um com calls,
+        avg_ms, max_ms, p50_ms/p95_ms (limites do histograma) e rows.
+    """
+    if by not in ("statement", "caller"):
+        return {"status": "error", "error": f"Agrupamento inválido: {by}"}
+    stats = _load_saved()
+    _merge(stats, get_query_stats())
+    table = stats.get("statements" if by == "statement" else "callers", {})
+
+    ranked = sorted(table.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    items = []
+    for key, entry in ranked[:top]:
+        item = {
+            "key": key,
+            "calls": entry["calls"],
+            "total_ms": round(entry["total_ms"], 3),
+            "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+            "max_ms": round(entry["max_ms"], 3),
+            "p50_ms": _percentile_ms(entry["histogram"], 0.5),
+            "p95_ms": _percentile_ms(entry["histogram"], 0.95),
+            "rows": entry["rows"],
+        }
+        if "callers" in entry:
+            item["callers"] = entry["callers"]
+        items.append(item)
+    return {
+        "status": "ok",
+        "by": by,
+        "total_ms": round(sum(entry["total_ms"] for entry in table.values()), 3),
+        "items": items,
+    }
+
+
+def slow_queries(limit: int = 5) -> List[Dict[str, Any]]:
+    """Últimas entradas do slow-query log."""
+    path = Path(PROFILE_DIR) / "slow_queries.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as fh:
+        lines = fh.readlines()
+    return [json.loads(line) for line in lines[-limit:]] if limit > 0 else []
+
+
+if PROFILE:
+    atexit.register(save_query_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mostra as consultas mais custosas registradas pelo profiling."
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", choices=("statement", "caller"), default="statement")
+    parser.add_argument(
+        "--slow", type=int, default=0, help="Mostra as N últimas consultas lentas"
+    )
+    args = parser.parse_args()
+
+    report = query_report(top=args.top, by=args.by)
+    if not report["items"]:
+        print(f"ℹ️  Nenhuma estatística em {PROFILE_DIR} (use LIFEOS_DB_PROFILE=1)")
+    else:
+        print(f"⏱️  Top {len(report['items'])} por tempo total ({report['total_ms']}ms)")
+        for item in report["items"]:
+            p95 = f"≤{item['p95_ms']}ms" if item["p95_ms"] is not None else "lento"
+            print(
+                f"   {item['total_ms']:>10.1f}ms  {item['calls']:>6}x  "
+                f"média {item['avg_ms']}ms  p95 {p95}  {item['rows']} linhas"
+            )
+            print(f"      {item['key'][:160]}")
+
+    for entry in slow_queries(args.slow):
+        print(f"🐢 {entry['elapsed_ms']}ms em {entry['caller']}: {entry['sql'][:160]}")
+        for step in entry["plan"] or []:
+            print(f"      {step}")
+
+
+if __name__ == "__main__":
+    main()
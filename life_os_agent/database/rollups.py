@@ -0,0 +1,339 @@
+"""
+Manutenção das tabelas agregadas (rollups) derivadas de `transactions` e
+do estado atual dos eventos derivado de `calendar_events`.
+
+Essas tabelas são mantidas incrementalmente por triggers (ver `migrations.py`);
+este módulo oferece a reconstrução completa a partir do histórico, usada
+na primeira migração e para corrigir divergências. O histórico inclui as
+linhas movidas para o arquivo morto (ver `archive.py`).
+
+Uso:
+    python -m life_os_agent.database.rollups [--user USER_ID] [--check]
+"""
+
+import argparse
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from .archive import attach_archive, history_source
+from .money import CENTS_SQL
+from .setup import database_path, get_connection, shard_paths, using_database
+
+# Colunas lidas pelas reconstruções (do banco quente e do arquivo morto).
+_HISTORY_COLUMNS = ("user_id", "category", "type", "date", "amount", "amount_cents")
+_CALENDAR_COLUMNS = (
+    "id",
+    "user_id",
+    "google_event_id",
+    "action",
+    "event_summary",
+    "created_at",
+)
+
+# Rollups por categoria: (tabela, coluna do período, expressão do período).
+_CATEGORY_TOTALS = (
+    ("monthly_category_totals", "month", "strftime('%Y-%m', date)"),
+    ("daily_category_totals", "day", "date(date)"),
+)
+
+
+def rollup_needs_rebuild(
+    cursor: sqlite3.Cursor, table: str, source: str = "transactions"
+) -> bool:
+    """True quando o rollup está vazio mas a tabela de origem já tem linhas."""
+    cursor.execute(f"SELECT EXISTS(SELECT 1 FROM {table})")
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(f"SELECT EXISTS(SELECT 1 FROM {source})")
+    return bool(cursor.fetchone()[0])
+
+
+def _rebuild_category_totals_in(
+    cursor: sqlite3.Cursor,
+    table: str,
+    period_column: str,
+    period_sql: str,
+    user_id: Optional[str] = None,
+) -> int:
+    where = " WHERE user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    # Desde a migração 10 a chave é o id da categoria; as migrações
+    # anteriores ainda reconstroem a versão por nome.
+    cursor.execute(f"PRAGMA table_info({table})")
+    if "category_id" in {row[1] for row in cursor.fetchall()}:
+        category_column = "category_id"
+        category_sql = "main.categories.id"
+        join = " JOIN main.categories ON main.categories.name = category"
+    else:
+        category_column = category_sql = "category"
+        join = ""
+
+    source = history_source(cursor, _HISTORY_COLUMNS)
+    if join:
+        cursor.execute(
+            f"INSERT OR IGNORE INTO main.categories (name) "
+            f"SELECT DISTINCT category FROM {source}{where}",
+            params,
+        )
+
+    cursor.execute(f"DELETE FROM {table}{where}", params)
+    cursor.execute(
+        f"""
+        INSERT INTO {table}
+            (user_id, {period_column}, {category_column}, type, total_cents, count)
+        SELECT user_id, IFNULL({period_sql}, ''), {category_sql}, type,
+               SUM({CENTS_SQL}), COUNT(*)
+        FROM {source}{join}{where}
+        GROUP BY 1, 2, 3, 4
+        """,
+        params,
+    )
+    return cursor.rowcount
+
+
+def rebuild_monthly_totals_in(
+    cursor: sqlite3.Cursor, user_id: Optional[str] = None
+) -> int:
+    return _rebuild_category_totals_in(cursor, *_CATEGORY_TOTALS[0], user_id)
+
+
+def rebuild_monthly_totals(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reconstrói `monthly_category_totals` a partir de `transactions`.
+
+    Args:
+        user_id: Reconstrói apenas este usuário (opcional, padrão: todos)
+    """
+    with get_connection(user_id) as conn:
+        attach_archive(conn, database_path(user_id))
+        rows = rebuild_monthly_totals_in(conn.cursor(), user_id)
+        return {"status": "ok", "table": "monthly_category_totals", "rows": rows}
+
+
+def rebuild_daily_totals_in(
+    cursor: sqlite3.Cursor, user_id: Optional[str] = None
+) -> int:
+    return _rebuild_category_totals_in(cursor, *_CATEGORY_TOTALS[1], user_id)
+
+
+def rebuild_daily_totals(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reconstrói `daily_category_totals` a partir de `transactions`.
+
+    Args:
+        user_id: Reconstrói apenas este usuário (opcional, padrão: todos)
+    """
+    with get_connection(user_id) as conn:
+        attach_archive(conn, database_path(user_id))
+        rows = rebuild_daily_totals_in(conn.cursor(), user_id)
+        return {"status": "ok", "table": "daily_category_totals", "rows": rows}
+
+
+def rebuild_balances_in(cursor: sqlite3.Cursor, user_id: Optional[str] = None) -> int:
+    where = " WHERE user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    cursor.execute(f"DELETE FROM user_balances{where}", params)
+    cursor.execute(
+        f"""
+        INSERT INTO user_balances (user_id, income_cents, expense_cents, count)
+        SELECT
+            user_id,
+            COALESCE(SUM(CASE WHEN type = 'income' THEN {CENTS_SQL} ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN type = 'expense' THEN {CENTS_SQL} ELSE 0 END), 0),
+            COUNT(*)
+        FROM {history_source(cursor, _HISTORY_COLUMNS)}{where}
+        GROUP BY user_id
+        """,
+        params,
+    )
+    return cursor.rowcount
+
+
+def rebuild_balances(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reconstrói `user_balances` a partir de `transactions`.
+
+    Args:
+        user_id: Reconstrói apenas este usuário (opcional, padrão: todos)
+    """
+    with get_connection(user_id) as conn:
+        attach_archive(conn, database_path(user_id))
+        rows = rebuild_balances_in(conn.cursor(), user_id)
+        return {"status": "ok", "table": "user_balances", "rows": rows}
+
+
+def rebuild_calendar_state_in(
+    cursor: sqlite3.Cursor, user_id: Optional[str] = None
+) -> int:
+    where = " WHERE user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    cursor.execute(f"DELETE FROM calendar_event_state{where}", params)
+    cursor.execute(
+        f"""
+        INSERT INTO calendar_event_state
+            (user_id, google_event_id, action, event_summary, log_id, created_at)
+        SELECT user_id, google_event_id, action, event_summary, id, created_at
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY user_id, google_event_id
+                ORDER BY created_at DESC, id DESC
+            ) AS position
+            FROM {history_source(cursor, _CALENDAR_COLUMNS, "calendar_events")}{where}
+        )
+        WHERE position = 1
+        """,
+        params,
+    )
+    return cursor.rowcount
+
+
+def rebuild_calendar_state(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reconstrói `calendar_event_state` a partir do log `calendar_events`.
+
+    Args:
+        user_id: Reconstrói apenas este usuário (opcional, padrão: todos)
+    """
+    with get_connection(user_id) as conn:
+        attach_archive(conn, database_path(user_id))
+        rows = rebuild_calendar_state_in(conn.cursor(), user_id)
+        return {"status": "ok", "table": "calendar_event_state", "rows": rows}
+
+
+def _category_total_mismatches(
+    cursor: sqlite3.Cursor,
+    table: str,
+    period_column: str,
+    period_sql: str,
+    user_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    where = " WHERE user_id = ?" if user_id else ""
+    params = (user_id, user_id) if user_id else ()
+
+    # Diferença simétrica: linhas que faltam (ou divergem) de um dos lados.
+    cursor.execute(
+        f"""
+        WITH actual AS (
+            SELECT user_id, IFNULL({period_sql}, '') AS period,
+                   main.categories.id AS category_id, type,
+                   SUM({CENTS_SQL}) AS total_cents, COUNT(*) AS count
+            FROM {history_source(cursor, _HISTORY_COLUMNS)}
+            JOIN main.categories ON main.categories.name = category{where}
+            GROUP BY 1, 2, 3, 4
+        ),
+        stored AS (
+            SELECT user_id, {period_column} AS period, category_id, type,
+                   total_cents, count
+            FROM {table}{where}
+        )
+        SELECT 'actual' AS side, *
+        FROM (SELECT * FROM actual EXCEPT SELECT * FROM stored)
+        UNION ALL
+        SELECT 'stored' AS side, *
+        FROM (SELECT * FROM stored EXCEPT SELECT * FROM actual)
+        """,
+        params,
+    )
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def check_balances(user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compara `user_balances` e os totais por categoria (mensais e diários)
+    com a soma real do histórico.
+
+    Retorna as divergências; `consistent` é True quando não há nenhuma.
+    Em `category_mismatches`, `side` indica se a linha é a esperada
+    ('actual') ou a gravada no rollup ('stored').
+    """
+    where = " WHERE user_id = ?" if user_id else ""
+    params = (user_id, user_id) if user_id else ()
+
+    with get_connection(user_id) as conn:
+        attach_archive(conn, database_path(user_id))
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            WITH actual AS (
+                SELECT
+                    user_id,
+                    COALESCE(SUM(CASE WHEN type = 'income' THEN {CENTS_SQL} ELSE 0 END), 0)
+                        AS income_cents,
+                    COALESCE(SUM(CASE WHEN type = 'expense' THEN {CENTS_SQL} ELSE 0 END), 0)
+                        AS expense_cents,
+                    COUNT(*) AS count
+                FROM {history_source(cursor, _HISTORY_COLUMNS)}{where}
+                GROUP BY user_id
+            ),
+            stored AS (
+                SELECT user_id, income_cents, expense_cents, count
+                FROM user_balances{where}
+            )
+            SELECT
+                a.user_id, a.income_cents, a.expense_cents, a.count,
+                s.income_cents AS stored_income_cents,
+                s.expense_cents AS stored_expense_cents,
+                s.count AS stored_count
+            FROM actual a LEFT JOIN stored s ON s.user_id = a.user_id
+            UNION ALL
+            SELECT s.user_id, 0, 0, 0, s.income_cents, s.expense_cents, s.count
+            FROM stored s
+            WHERE s.count != 0
+              AND s.user_id NOT IN (SELECT user_id FROM actual)
+            """,
+            params,
+        )
+
+        mismatches: List[Dict[str, Any]] = []
+        for row in cursor.fetchall():
+            if (
+                (row["stored_count"] or 0) != row["count"]
+                or (row["stored_income_cents"] or 0) != row["income_cents"]
+                or (row["stored_expense_cents"] or 0) != row["expense_cents"]
+            ):
+                mismatches.append(dict(row))
+
+        category_mismatches = {
+            table: _category_total_mismatches(
+                cursor, table, period_column, period_sql, user_id
+            )
+            for table, period_column, period_sql in _CATEGORY_TOTALS
+        }
+
+        return {
+            "status": "ok",
+            "consistent": not mismatches
+            and not any(category_mismatches.values()),
+            "mismatches": mismatches,
+            "category_mismatches": category_mismatches,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói os rollups do LifeOS.")
+    parser.add_argument("--user", help="Reconstrói apenas um usuário")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Apenas verifica a consistência dos rollups, sem reconstruir",
+    )
+    args = parser.parse_args()
+
+    # Sem --user, percorre todos os shards; com --user, vai direto ao dele.
+    paths = [database_path(args.user)] if args.user else shard_paths()
+    for path in paths:
+        with using_database(path):
+            if args.check:
+                print(check_balances(args.user))
+                continue
+            print(rebuild_monthly_totals(args.user))
+            print(rebuild_daily_totals(args.user))
+            print(rebuild_balances(args.user))
+            print(rebuild_calendar_state(args.user))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,123 @@
+import hashlib
 import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import profiling
 
 _THIS_DIR = Path(__file__).parent
 _DEFAULT_DB_PATH = str(_THIS_DIR / "lifeos.db")
 DB_PATH = os.getenv("DB_PATH", _DEFAULT_DB_PATH)
 
+# Com mais de um shard, cada usuário vive num arquivo escolhido pelo hash do
+# whatsapp_number, e cada arquivo tem seu próprio lock de escrita.
+SHARD_COUNT = max(1, int(os.getenv("LIFEOS_DB_SHARDS", "1")))
+
+# Conexões somente leitura mantidas por arquivo para as consultas de crud
+# (0 desliga o pool e as leituras voltam a usar get_connection).
+READ_POOL_SIZE = int(os.getenv("LIFEOS_DB_READ_POOL", "4"))
+
+
+_local = threading.local()
+
+
+def shard_index(user_id: str, shards: Optional[int] = None) -> int:
+    shards = shards or SHARD_COUNT
+    digest = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def shard_path(index: int, shards: Optional[int] = None) -> str:
+    shards = shards or SHARD_COUNT
+    if shards == 1:
+        return DB_PATH
+    base = Path(DB_PATH)
+    return str(base.with_name(f"{base.stem}.shard-{index}-of-{shards}{base.suffix}"))
+
+
+def shard_paths(shards: Optional[int] = None) -> List[str]:
+    shards = shards or SHARD_COUNT
+    return [shard_path(index, shards) for index in range(shards)]
+
+
+def database_path(user_id: Optional[str] = None) -> str:
+    """Arquivo onde vivem os dados do usuário (ou o banco corrente, sem usuário)."""
+    if user_id is not None and SHARD_COUNT > 1:
+        return shard_path(shard_index(user_id))
+    return getattr(_local, "path", None) or shard_path(0)
+
 
 @contextmanager
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+def using_database(path: str):
+    """Direciona as conexões sem usuário da thread atual para `path`."""
+    previous = getattr(_local, "path", None)
+    _local.path = path
+    try:
+        yield path
+    finally:
+        _local.path = previous
+
+
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path or database_path(),
+        check_same_thread=False,
+        factory=profiling.connection_factory(),
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    return conn
+
+
+def pin_connection() -> Dict[str, sqlite3.Connection]:
+    """
+    Fixa conexões na thread atual; get_connection passa a reutilizá-las.
+
+    Retorna o dicionário (arquivo -> conexão) da thread, preenchido à medida
+    que cada arquivo é usado.
+    """
+    pinned = getattr(_local, "pinned", None)
+    if pinned is None:
+        pinned = _local.pinned = {}
+        _local.depth = {}
+    return pinned
+
+
+def unpin_connection() -> None:
+    pinned = getattr(_local, "pinned", None)
+    if pinned is not None:
+        _local.pinned = None
+        for conn in pinned.values():
+            conn.close()
+
+
+@contextmanager
+def _pinned_transaction(path: str):
+    conn = _local.pinned.get(path)
+    if conn is None:
+        conn = _local.pinned[path] = _connect(path)
+    # Blocos aninhados na mesma thread participam da transação externa.
+    depth = _local.depth.get(path, 0)
+    _local.depth[path] = depth + 1
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except Exception as e:
+        if depth == 0:
+            conn.rollback()
+        raise e
+    finally:
+        _local.depth[path] = depth
+
+
+@contextmanager
+def _transaction(path: str):
+    conn = _connect(path)
     try:
         yield conn
         conn.commit()
@@ -23,81 +128,111 @@ def get_connection():
         conn.close()
 
 
-def init_database():
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                whatsapp_number TEXT PRIMARY KEY,
-                name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+@contextmanager
+def get_connection(user_id: Optional[str] = None):
+    path = database_path(user_id)
+    with profiling.profile_block():
+        if getattr(_local, "pinned", None) is not None:
+            with _pinned_transaction(path) as conn:
+                yield conn
+        else:
+            with _transaction(path) as conn:
+                yield conn
+
+
+def _connect_read_only(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        f"{Path(path).resolve().as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        isolation_level=None,
+        factory=profiling.connection_factory(),
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    return conn
+
+
+_read_pools: Dict[str, "queue.LifoQueue[sqlite3.Connection]"] = {}
+_read_pools_lock = threading.Lock()
+
+
+def _read_pool(path: str) -> "queue.LifoQueue[sqlite3.Connection]":
+    with _read_pools_lock:
+        pool = _read_pools.get(path)
+        if pool is None:
+            pool = _read_pools[path] = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+        return pool
 
+
+def _in_pinned_transaction(path: str) -> bool:
+    pinned = getattr(_local, "pinned", None)
+    return pinned is not None and _local.depth.get(path, 0) > 0
+
+
+@contextmanager
+def get_read_connection(user_id: Optional[str] = None):
+    """
+    Conexão somente leitura (mode=ro, query_only) emprestada do pool.
+
+    O bloco inteiro roda numa transação de leitura: com WAL, enxerga um
+    snapshot consistente e não bloqueia nem é bloqueado pelas escritas.
+    Dentro de uma transação fixada na thread, usa a própria conexão de
+    escrita para enxergar o que ainda não foi confirmado.
+    """
+    path = database_path(user_id)
+    if (
+        READ_POOL_SIZE <= 0
+        or _in_pinned_transaction(path)
+        or not os.path.exists(path)
+    ):
+        with get_connection(user_id) as conn:
+            yield conn
+        return
+
+    with profiling.profile_block():
+        pool = _read_pool(path)
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = _connect_read_only(path)
+        conn.execute("BEGIN")
         try:
-            cursor.execute(
-                "ALTER TABLE users ADD COLUMN last_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
-            )
-        except sqlite3.OperationalError:
-            pass
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                category TEXT NOT NULL,
-                type TEXT CHECK(type IN ('income', 'expense')) NOT NULL,
-                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
-            )
-        """)
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id);"
-        )
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);"
-        )
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category);"
-        )
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS budget_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                category TEXT NOT NULL,
-                monthly_limit REAL NOT NULL,
-                UNIQUE(user_id, category),
-                FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
-            )
-        """)
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_budget_goals_user ON budget_goals(user_id);"
-        )
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS calendar_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                google_event_id TEXT NOT NULL,
-                action TEXT CHECK(action IN ('created', 'updated', 'deleted')) NOT NULL,
-                event_summary TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
-            )
-        """)
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_calendar_events_user ON calendar_events(user_id);"
-        )
-        cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_calendar_events_google_id ON calendar_events(google_event_id);"
-        )
-
-    return {"status": "ok", "path": DB_PATH}
+            yield conn
+        finally:
+            try:
+                conn.execute("COMMIT")
+                pool.put_nowait(conn)
+            except (sqlite3.Error, queue.Full):
+                conn.close()
+
+
+def close_read_connections() -> None:
+    """Fecha as conexões ociosas do pool de leitura (ex.: após trocar o arquivo)."""
+    with _read_pools_lock:
+        pools = list(_read_pools.values())
+        _read_pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def init_database():
+    """Cria o banco ou o atualiza até a versão de schema mais recente."""
+    from .migrations import migrate
+
+    result = migrate(pause=0)
+    if result["status"] != "ok":
+        return result
+    return {
+        "status": "ok",
+        "path": DB_PATH,
+        "shards": SHARD_COUNT,
+        "schema_version": result["to_version"],
+    }
 
 
 if __name__ == "__main__":
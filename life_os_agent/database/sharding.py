@@ -0,0 +1,221 @@
+"""
+Redistribuição dos usuários entre arquivos (shards) do SQLite.
+
+Copia users, transactions, budget_goals, calendar_events e budget_alerts
+do layout atual para um novo número de shards, roteando cada linha pelo
+hash do usuário.
+Os rollups dos destinos são refeitos pelos próprios triggers. Os arquivos
+de origem não são alterados; depois da cópia basta trocar LIFEOS_DB_SHARDS.
+Os ids das tabelas são reatribuídos na ordem original, já que ids de shards
+diferentes colidem ao juntar arquivos. Linhas do arquivo morto (ver
+`archive.py`) voltam para as tabelas quentes dos destinos, para que os
+triggers as somem nos rollups; basta arquivar de novo depois. Rode com o
+agente parado.
+
+Uso:
+    python -m life_os_agent.database.sharding --to 8 [--from 1]
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .archive import ARCHIVED_TABLES, archive_path
+from .migrations import migrate
+from .setup import SHARD_COUNT, _connect, shard_index, shard_paths
+
+# Tabelas com dados de usuário, copiadas depois de `users` (por causa das FKs).
+USER_TABLES = ("transactions", "budget_goals", "calendar_events", "budget_alerts")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _columns(conn, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _has_users(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    conn = _connect(path)
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+        ).fetchone()
+        if row is None:
+            return False
+        return conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None
+    finally:
+        conn.close()
+
+
+def reshard(
+    target_shards: int,
+    source_shards: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Copia todos os usuários do layout de origem para `target_shards` arquivos.
+
+    Args:
+        target_shards: Número de shards de destino
+        source_shards: Número de shards de origem (padrão: LIFEOS_DB_SHARDS)
+        chunk_size: Linhas lidas e gravadas por bloco
+        progress: Callback chamado a cada bloco copiado
+
+    Returns:
+        Dicionário com as linhas copiadas por tabela e os arquivos de destino.
+    """
+    source_shards = source_shards or SHARD_COUNT
+    if target_shards < 1 or target_shards == source_shards:
+        return {
+            "status": "error",
+            "error": f"Destino inválido: {target_shards} (origem {source_shards})",
+        }
+
+    source_paths = shard_paths(source_shards)
+    target_paths = shard_paths(target_shards)
+    busy = [path for path in target_paths if _has_users(path)]
+    if busy:
+        return {"status": "error", "error": f"Destinos já têm dados: {busy}"}
+
+    started = time.perf_counter()
+    for paths in (source_paths, target_paths):
+        result = migrate(paths=paths, pause=0)
+        if result["status"] != "ok":
+            return result
+
+    copied: Counter = Counter()
+    targets = [_connect(path) for path in target_paths]
+    try:
+        for source_path in source_paths:
+            source = _connect(source_path)
+            try:
+                for table in ("users",) + USER_TABLES:
+                    copied[table] += _copy_table(
+                        source, targets, table, target_shards, chunk_size, progress
+                    )
+            finally:
+                source.close()
+
+            if not os.path.exists(archive_path(source_path)):
+                continue
+            archive = _connect(archive_path(source_path))
+            try:
+                for table, _ in ARCHIVED_TABLES:
+                    copied[f"{table} (arquivo)"] += _copy_table(
+                        archive, targets, table, target_shards, chunk_size, progress
+                    )
+            finally:
+                archive.close()
+    finally:
+        for conn in targets:
+            conn.close()
+
+    return {
+        "status": "ok",
+        "source_shards": source_shards,
+        "target_shards": target_shards,
+        "copied": dict(copied),
+        "paths": target_paths,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _copy_table(
+    source,
+    targets: List[Any],
+    table: str,
+    target_shards: int,
+    chunk_size: int,
+    progress: Optional[Callable[[Dict[str, Any]], None]],
+) -> int:
+    if table == "users":
+        key, user_column = "whatsapp_number", "whatsapp_number"
+    else:
+        key, user_column = "id", "user_id"
+
+    target_columns = set(_columns(targets[0], table))
+    columns = [
+        column
+        for column in _columns(source, table)
+        if column in target_columns and column not in ("id", "category_id")
+    ]
+    user_position = columns.index(user_column)
+    placeholders = ["?" for _ in columns]
+    # Ids de categoria são locais a cada arquivo: o destino resolve pelo nome.
+    category_position = None
+    if "category_id" in target_columns:
+        category_position = columns.index("category")
+        placeholders.append("(SELECT id FROM categories WHERE name = ?)")
+    insert = (
+        f"INSERT INTO {table} ({', '.join(columns)}"
+        f"{', category_id' if category_position is not None else ''}) "
+        f"VALUES ({', '.join(placeholders)})"
+    )
+    select = (
+        f"SELECT {key}, {', '.join(columns)} FROM {table} "
+        f"WHERE {key} > ? ORDER BY {key} LIMIT ?"
+    )
+
+    copied = 0
+    last_key: Any = 0 if key == "id" else ""
+    while True:
+        rows = source.execute(select, (last_key, chunk_size)).fetchall()
+        if not rows:
+            return copied
+
+        batches: Dict[int, List[tuple]] = {}
+        for row in rows:
+            values = tuple(row)[1:]
+            if category_position is not None:
+                values += (values[category_position],)
+            index = shard_index(values[user_position], target_shards)
+            batches.setdefault(index, []).append(values)
+        for index, values in batches.items():
+            if category_position is not None:
+                targets[index].executemany(
+                    "INSERT OR IGNORE INTO categories (name) VALUES (?)",
+                    {(batch[category_position],) for batch in values},
+                )
+            targets[index].executemany(insert, values)
+            targets[index].commit()
+
+        copied += len(rows)
+        last_key = rows[-1][0]
+        if progress:
+            progress({"table": table, "rows": copied})
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Redistribui os usuários do LifeOS entre shards."
+    )
+    parser.add_argument("--to", type=int, required=True, help="Shards de destino")
+    parser.add_argument(
+        "--from", dest="source", type=int, help="Shards de origem (padrão: atual)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    result = reshard(
+        args.to,
+        source_shards=args.source,
+        chunk_size=args.chunk_size,
+        progress=lambda p: print(f"   ... {p['table']}: {p['rows']} linhas"),
+    )
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+
+    print(
+        f"✅ {result['source_shards']} → {result['target_shards']} shards "
+        f"em {result['elapsed_seconds']}s: {result['copied']}"
+    )
+    print(f"   Defina LIFEOS_DB_SHARDS={result['target_shards']} para usá-los.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Normalização das datas de transações.
+
+Toda data é gravada de duas formas: `ts` (epoch UTC em segundos, indexado,
+usado em filtros e paginação) e `date` (ISO local sem offset no fuso do
+usuário, usado para exibição e para agrupar por dia/mês).
+"""
+
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+DEFAULT_TIMEZONE = os.getenv("LIFEOS_TIMEZONE", "America/Sao_Paulo")
+
+
+def normalize_timestamp(
+    value: Optional[str],
+    tz_name: str = DEFAULT_TIMEZONE,
+    now: Optional[datetime] = None,
+) -> Tuple[str, int]:
+    """
+    Converte uma data livre em (ISO local, epoch UTC).
+
+    - Vazia: agora.
+    - Só a data (YYYY-MM-DD): aquele dia, no horário atual.
+    - Com horário e sem offset: interpretada no fuso do usuário.
+    - Com offset (ou Z): convertida para o fuso do usuário.
+
+    Levanta ValueError se a data não for ISO 8601 válida.
+    """
+    tz = ZoneInfo(tz_name)
+    now = (now or datetime.now(tz)).astimezone(tz)
+
+    if not value or len(value) < 10:
+        local = now
+    elif len(value) == 10:
+        local = datetime.combine(date.fromisoformat(value), now.timetz())
+    else:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        local = parsed.astimezone(tz) if parsed.tzinfo else parsed.replace(tzinfo=tz)
+
+    local = local.replace(microsecond=0)
+    return local.replace(tzinfo=None).isoformat(), int(local.timestamp())
+
+
+def _day_start(day: str, tz: ZoneInfo) -> int:
+    return int(datetime.combine(date.fromisoformat(day), time(), tzinfo=tz).timestamp())
+
+
+def range_bounds(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    tz_name: str = DEFAULT_TIMEZONE,
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Converte um intervalo de datas em limites epoch [início, fim).
+
+    Um `end_date` só com a data inclui o dia inteiro.
+    """
+    tz = ZoneInfo(tz_name)
+    start_ts = end_ts = None
+
+    if start_date:
+        if len(start_date) == 10:
+            start_ts = _day_start(start_date, tz)
+        else:
+            start_ts = normalize_timestamp(start_date, tz_name)[1]
+    if end_date:
+        if len(end_date) == 10:
+            next_day = date.fromisoformat(end_date) + timedelta(days=1)
+            end_ts = _day_start(next_day.isoformat(), tz)
+        else:
+            end_ts = normalize_timestamp(end_date, tz_name)[1] + 1
+
+    return start_ts, end_ts
+
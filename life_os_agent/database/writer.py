@@ -0,0 +1,168 @@
+"""
+Escritor único opcional para o SQLite.
+
+Com LIFEOS_DB_SINGLE_WRITER=1, todas as escritas de `crud` passam por uma
+fila atendida por uma única thread, dona da conexão de escrita. A thread
+agrupa as operações pendentes (até LIFEOS_DB_WRITE_BATCH) numa só
+transação, com um SAVEPOINT por operação: a falha de uma não desfaz as
+outras. Como só existe um escritor, não há disputa pelo lock do banco.
+Com shards (LIFEOS_DB_SHARDS), cada arquivo tem o seu próprio escritor.
+
+Sem a variável, `run_write` abre uma conexão própria, como antes.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from . import setup
+
+T = TypeVar("T")
+
+SINGLE_WRITER = os.getenv("LIFEOS_DB_SINGLE_WRITER", "").lower() in ("1", "true")
+WRITE_BATCH = int(os.getenv("LIFEOS_DB_WRITE_BATCH", "64"))
+
+_STOP = object()
+
+
+class _SingleWriter:
+    def __init__(self, path: str, max_batch: int):
+        self.path = path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ident: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[sqlite3.Connection], T]) -> "Future[T]":
+        future: "Future[T]" = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"lifeos-db-writer:{self.path}", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((fn, future))
+        return future
+
+    def in_writer_thread(self) -> bool:
+        return threading.get_ident() == self._ident
+
+    def call(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        # Chamadas feitas de dentro de uma operação entram na transação corrente.
+        return fn(self._conn)
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        self._ident = threading.get_ident()
+        self._conn = setup._connect(self.path)
+        self._conn.isolation_level = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.put(_STOP)
+                        break
+                    batch.append(item)
+                self._execute(batch)
+        finally:
+            self._conn.close()
+            self._conn = None
+            self._ident = None
+
+    def _execute(self, batch: List[Tuple[Callable, Future]]) -> None:
+        conn = self._conn
+        outcomes: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT op")
+                try:
+                    result = fn(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE op")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # Inclui as operações que nem chegaram a rodar (ex.: BEGIN falhou
+            # com "database is locked"); senão run_write esperaria para sempre.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+# Um escritor por arquivo: com shards, cada um tem sua própria fila.
+_writers: Dict[str, _SingleWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def _writer_for(path: str) -> _SingleWriter:
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = _SingleWriter(path, WRITE_BATCH)
+        return writer
+
+
+def run_write(
+    fn: Callable[[sqlite3.Connection], T], user_id: Optional[str] = None
+) -> T:
+    """
+    Executa `fn(conn)` numa transação de escrita e retorna seu resultado.
+
+    Com `user_id`, a escrita vai para o arquivo (shard) desse usuário.
+    Exceções levantadas por `fn` desfazem apenas a sua operação e são
+    repassadas ao chamador.
+    """
+    if not SINGLE_WRITER:
+        with setup.get_connection(user_id) as conn:
+            return fn(conn)
+    writer = _writer_for(setup.database_path(user_id))
+    if writer.in_writer_thread():
+        return writer.call(fn)
+    return writer.submit(fn).result()
+
+
+def stop_writer() -> None:
+    """Processa o que resta nas filas e encerra as threads de escrita."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
+
+
+atexit.register(stop_writer)
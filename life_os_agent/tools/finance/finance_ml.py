@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 import joblib
 import numpy as np
@@ -18,15 +18,17 @@ def _load_model(model_path: str):
     return _MODEL
 
 
+def _default_model_path() -> str:
+    return os.getenv("LIFEOS_MODEL_PATH", "models/expense_clf_tfidf_nb_ptbr.joblib")
+
+
 def predict_category_ptbr(
     text: str, model_path: Optional[str] = None
 ) -> Dict[str, Any]:
     if not text:
         return {"status": "error", "error": "empty_text"}
     if model_path is None:
-        model_path = os.getenv(
-            "LIFEOS_MODEL_PATH", "models/expense_clf_tfidf_nb_ptbr.joblib"
-        )
+        model_path = _default_model_path()
     model = _load_model(model_path)
     print(f"DEBUG ML Input: '{text}'")
     proba = model.predict_proba([text])[0]
@@ -38,3 +40,19 @@ def predict_category_ptbr(
         "category": str(model.classes_[idx]),
         "confidence": float(proba[idx]),
     }
+
+
+def predict_categories_ptbr(
+    texts: Sequence[str], model_path: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Classifica vários textos com uma única chamada vetorizada ao modelo."""
+    if not texts:
+        return []
+    model = _load_model(model_path or _default_model_path())
+    proba = model.predict_proba(list(texts))
+    idx = np.argmax(proba, axis=1)
+    confidence = proba[np.arange(len(idx)), idx]
+    return [
+        {"category": str(model.classes_[i]), "confidence": float(c)}
+        for i, c in zip(idx, confidence)
+    ]
@@ -0,0 +1,231 @@
+"""
+Tendências de gastos calculadas sobre o rollup diário (`daily_category_totals`).
+
+Os totais diários do usuário viram uma matriz NumPy (categorias x dias) e
+todas as métricas saem de operações vetorizadas sobre ela; só um resumo
+compacto volta para o agente, nunca a lista de transações.
+"""
+
+from __future__ import annotations
+
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from life_os_agent.database.crud import get_budget_goals, get_daily_totals, get_user
+from life_os_agent.database.timestamps import DEFAULT_TIMEZONE, ZoneInfo
+
+# Janela usada para estimar o ritmo diário de gastos nas projeções.
+PROJECTION_WINDOW_DAYS = 28
+
+
+def _today(user_id: str) -> date:
+    user = get_user(user_id) or {}
+    tz = ZoneInfo(user.get("timezone") or DEFAULT_TIMEZONE)
+    return datetime.now(tz).date()
+
+
+def _reais(cents: Any) -> float:
+    return round(float(cents) / 100, 2)
+
+
+def _pct_change(current: Any, previous: Any) -> Optional[float]:
+    if not previous:
+        return None
+    return round(float(current - previous) / float(previous) * 100, 1)
+
+
+def load_daily_matrix(
+    user_id: str,
+    start: date,
+    end: date,
+    transaction_type: str = "expense",
+    category: Optional[str] = None,
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Carrega os totais diários do usuário entre `start` e `end` (inclusive).
+
+    Returns:
+        (categorias, dias como datetime64[D], matriz int64 de centavos com uma
+        linha por categoria e uma coluna por dia, zerada nos dias sem gasto)
+    """
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    rows = [
+        row
+        for row in get_daily_totals(
+            user_id, start.isoformat(), end.isoformat(), transaction_type, category
+        )
+        if row[0]
+    ]
+    categories = sorted({row[1] for row in rows})
+    matrix = np.zeros((len(categories), len(days)), dtype=np.int64)
+    if rows:
+        lookup = {name: index for index, name in enumerate(categories)}
+        day_index = (
+            np.array([row[0] for row in rows], dtype="datetime64[D]") - days[0]
+        ).astype(np.int64)
+        category_index = np.array([lookup[row[1]] for row in rows], dtype=np.int64)
+        cents = np.array([row[2] for row in rows], dtype=np.int64)
+        np.add.at(matrix, (category_index, day_index), cents)
+    return categories, days, matrix
+
+
+def get_spending_trends(
+    user_id: str, category: Optional[str] = None, months: int = 3
+) -> Dict[str, Any]:
+    """
+    Resume a tendência de gastos do usuário nos últimos meses.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        category: Analisa apenas esta categoria (opcional)
+        months: Quantos meses anteriores ao atual entram na análise
+
+    Returns:
+        Dicionário com monthly (total por mês), month_over_month (mês atual até
+        hoje contra o mesmo período do mês anterior), weekly (média e percentis
+        semanais), daily (médias móveis e percentis) e, sem categoria,
+        top_categories do mês com a variação de cada uma.
+    """
+    months = max(1, int(months))
+    today = _today(user_id)
+    start = (np.datetime64(today, "M") - months).astype("datetime64[D]").item()
+    categories, days, matrix = load_daily_matrix(
+        user_id, start, today, category=category
+    )
+    daily = matrix.sum(axis=0)
+
+    month_of_day = days.astype("datetime64[M]")
+    labels = np.unique(month_of_day)
+    month_index = (month_of_day - labels[0]).astype(np.int64)
+    monthly = np.bincount(month_index, weights=daily, minlength=len(labels))
+
+    # Mesmo período: do dia 1 até o dia de hoje, no mês atual e no anterior.
+    day_of_month = (days - month_of_day.astype("datetime64[D]")).astype(np.int64) + 1
+    current = month_of_day == labels[-1]
+    previous_same = (month_of_day == labels[-2]) & (day_of_month <= today.day)
+    current_cents = daily[current].sum()
+    previous_cents = daily[previous_same].sum()
+
+    weeks_count = len(daily) // 7
+    weeks = daily[len(daily) - weeks_count * 7 :].reshape(weeks_count, 7).sum(axis=1)
+    spending_days = daily[daily > 0]
+    moving_7d = np.convolve(daily, np.ones(7) / 7, mode="valid")
+
+    result: Dict[str, Any] = {
+        "status": "ok",
+        "category": category,
+        "today": today.isoformat(),
+        "monthly": [
+            {"month": str(label), "total": _reais(total)}
+            for label, total in zip(labels, monthly)
+        ],
+        "month_over_month": {
+            "current_to_date": _reais(current_cents),
+            "previous_same_period": _reais(previous_cents),
+            "previous_month_total": _reais(monthly[-2]),
+            "delta": _reais(current_cents - previous_cents),
+            "delta_pct": _pct_change(current_cents, previous_cents),
+        },
+        "weekly": {
+            "average": _reais(weeks.mean()),
+            "p50": _reais(np.percentile(weeks, 50)),
+            "p90": _reais(np.percentile(weeks, 90)),
+            "last_4": [_reais(total) for total in weeks[-4:]],
+        },
+        "daily": {
+            "moving_average_7d": _reais(moving_7d[-1]),
+            "average_30d": _reais(daily[-30:].mean()),
+            "p50_spending_days": _reais(np.percentile(spending_days, 50))
+            if spending_days.size
+            else 0.0,
+            "p90_spending_days": _reais(np.percentile(spending_days, 90))
+            if spending_days.size
+            else 0.0,
+        },
+    }
+
+    if category is None and categories:
+        by_current = matrix[:, current].sum(axis=1)
+        by_previous = matrix[:, previous_same].sum(axis=1)
+        top = np.argsort(-by_current, kind="stable")[:5]
+        result["top_categories"] = [
+            {
+                "category": categories[i],
+                "current_to_date": _reais(by_current[i]),
+                "previous_same_period": _reais(by_previous[i]),
+                "delta_pct": _pct_change(by_current[i], by_previous[i]),
+            }
+            for i in top
+            if by_current[i] or by_previous[i]
+        ]
+    return result
+
+
+def project_month_end_spending(
+    user_id: str, category: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Projeta o gasto de fim de mês por categoria e compara com as metas.
+
+    A projeção soma o gasto do mês até hoje ao ritmo médio diário dos
+    últimos 28 dias multiplicado pelos dias que faltam.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        category: Projeta apenas esta categoria (opcional)
+
+    Returns:
+        Dicionário com spent e projected do mês e, por categoria, a meta
+        (monthly_limit), projected_percentage e over_budget.
+    """
+    today = _today(user_id)
+    month_start = today.replace(day=1)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining_days = days_in_month - today.day
+    start = min(month_start, today - timedelta(days=PROJECTION_WINDOW_DAYS - 1))
+
+    categories, days, matrix = load_daily_matrix(
+        user_id, start, today, category=category
+    )
+    current = days >= np.datetime64(month_start, "D")
+    spent = matrix[:, current].sum(axis=1)
+    rate = matrix[:, -PROJECTION_WINDOW_DAYS:].mean(axis=1)
+    projected = spent + rate * remaining_days
+
+    limits = {
+        goal["category"]: goal["monthly_limit"]
+        for goal in get_budget_goals(user_id)
+        if category is None or goal["category"] == category
+    }
+    lookup = {name: index for index, name in enumerate(categories)}
+
+    rows = []
+    for name in sorted(set(categories) | set(limits)):
+        index = lookup.get(name)
+        row_spent = spent[index] if index is not None else 0
+        row_projected = projected[index] if index is not None else 0.0
+        row: Dict[str, Any] = {
+            "category": name,
+            "spent": _reais(row_spent),
+            "projected": _reais(row_projected),
+        }
+        limit = limits.get(name)
+        if limit:
+            row["monthly_limit"] = limit
+            row["projected_percentage"] = round(float(row_projected) / limit, 1)
+            row["over_budget"] = bool(row_projected > limit * 100)
+        rows.append(row)
+    rows.sort(key=lambda row: row["projected"], reverse=True)
+
+    return {
+        "status": "ok",
+        "month": month_start.strftime("%Y-%m"),
+        "days_elapsed": today.day,
+        "days_in_month": days_in_month,
+        "spent": _reais(spent.sum()),
+        "projected": _reais(projected.sum()),
+        "categories": rows,
+    }
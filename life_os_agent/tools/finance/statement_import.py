@@ -0,0 +1,453 @@
+"""
+Importação de extratos bancários (CSV/OFX) em lote.
+
+O arquivo é lido linha a linha e processado em blocos de tamanho fixo:
+cada bloco é classificado com uma única chamada ao modelo TF-IDF/NB,
+deduplicado contra as transações já existentes e gravado com
+`add_transactions_batch`. A memória usada não depende do tamanho do arquivo.
+
+Uso:
+    python -m life_os_agent.tools.finance.statement_import extrato.csv --user 5511999999999
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import pickle
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from life_os_agent.database.crud import (
+    add_transactions_batch,
+    get_max_transaction_id,
+    get_transaction_fingerprints,
+)
+from life_os_agent.tools.finance.finance_extract import (
+    clean_description,
+    detect_direction,
+    extract_amount_brl,
+)
+from life_os_agent.tools.finance.finance_ml import predict_categories_ptbr
+
+DEFAULT_CHUNK_SIZE = 500
+# Único diretório de onde o agente pode importar extratos.
+UPLOAD_DIR = os.getenv("LIFEOS_UPLOAD_DIR", "uploads")
+
+SIGN_CONVENTIONS = ("auto", "signed", "card")
+
+_DATE_COLUMNS = ("data", "date", "data lançamento", "data lancamento", "dtposted")
+_DESCRIPTION_COLUMNS = (
+    "descrição",
+    "descricao",
+    "description",
+    "histórico",
+    "historico",
+    "lançamento",
+    "lancamento",
+    "title",
+    "memo",
+)
+_AMOUNT_COLUMNS = ("valor", "amount", "valor (r$)", "trnamt")
+
+_PLAIN_NUMBER_RE = re.compile(r"^[+-]?\d+(?:\.\d+)?$")
+# Falhas ao carregar o modelo joblib (ausente, corrompido ou de outra versão).
+_MODEL_ERRORS = (OSError, EOFError, ImportError, AttributeError, pickle.UnpicklingError)
+_LEADING_MINUS_RE = re.compile(r"^[^\d]*-")
+_BR_THOUSANDS_RE = re.compile(r"^[+-]?\d{1,3}(?:\.\d{3})+$")
+_OFX_TAG_RE = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<]*)")
+_CSV_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%Y")
+
+
+def _parse_amount(cell: str) -> Optional[Decimal]:
+    text = (cell or "").strip()
+    if not text:
+        return None
+    # O sinal pode vir depois da moeda ("R$ -50,00") ou no fim ("50,00-").
+    negative = (
+        bool(_LEADING_MINUS_RE.match(text))
+        or text.endswith("-")
+        or (text.startswith("(") and text.endswith(")"))
+    )
+
+    # Valores já em formato de máquina ("-32.9", "1234.50") vêm de OFX e de
+    # exportações de cartão; o resto segue o formato brasileiro.
+    if _PLAIN_NUMBER_RE.match(text) and not _BR_THOUSANDS_RE.match(text):
+        try:
+            value = abs(Decimal(text))
+        except InvalidOperation:
+            return None
+    else:
+        extracted = extract_amount_brl(text).get("amount")
+        if extracted is None:
+            return None
+        value = Decimal(str(extracted))
+
+    return -value if negative else value
+
+
+def _parse_date(cell: str) -> Optional[str]:
+    text = (cell or "").strip()
+    if re.match(r"^\d{8}", text):
+        # OFX: YYYYMMDD[HHMMSS[.XXX]][TZ]
+        text = f"{text[:4]}-{text[4:6]}-{text[6:8]}"
+    text = text[:10]
+    for fmt in _CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _description_key(description: str) -> str:
+    # casefold no Python dos dois lados: o lower() do SQLite só trata ASCII.
+    return (description or "").strip().casefold()
+
+
+def _direction(amount: Decimal, description: str, sign_convention: str) -> str:
+    if sign_convention == "card":
+        return "income" if amount < 0 else "expense"
+    if amount < 0:
+        return "expense"
+    if sign_convention == "signed":
+        return "income"
+    return detect_direction(description).get("direction", "expense")
+
+
+def _pick_column(header: List[str], candidates: tuple) -> Optional[int]:
+    normalized = [h.strip().lower() for h in header]
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized.index(candidate)
+    return None
+
+
+def iter_csv_statement(
+    path: str, encoding: str = "utf-8-sig"
+) -> Iterator[Dict[str, Any]]:
+    """Lê um extrato CSV linha a linha, gerando dicionários brutos."""
+    with open(path, newline="", encoding=encoding, errors="replace") as fh:
+        sample = fh.read(4096)
+        fh.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(fh, dialect)
+        header = next(reader, None)
+        if not header:
+            return
+
+        date_col = _pick_column(header, _DATE_COLUMNS)
+        desc_col = _pick_column(header, _DESCRIPTION_COLUMNS)
+        amount_col = _pick_column(header, _AMOUNT_COLUMNS)
+        if date_col is None or desc_col is None or amount_col is None:
+            raise ValueError(
+                f"Cabeçalho CSV não reconhecido: {header}. "
+                "São necessárias colunas de data, descrição e valor."
+            )
+
+        for line_number, row in enumerate(reader, start=2):
+            if not row or len(row) <= max(date_col, desc_col, amount_col):
+                continue
+            yield {
+                "line": line_number,
+                "date": row[date_col],
+                "description": row[desc_col],
+                "amount": row[amount_col],
+            }
+
+
+def iter_ofx_statement(
+    path: str, encoding: str = "utf-8"
+) -> Iterator[Dict[str, Any]]:
+    """Lê um extrato OFX (SGML ou XML) gerando um dicionário por <STMTTRN>."""
+    current: Optional[Dict[str, Any]] = None
+    with open(path, encoding=encoding, errors="replace") as fh:
+        for line_number, line in enumerate(fh, start=1):
+            for tag, value in _OFX_TAG_RE.findall(line):
+                tag = tag.upper()
+                value = value.strip()
+                if tag == "STMTTRN":
+                    current = {"line": line_number}
+                elif tag == "/STMTTRN" and current is not None:
+                    yield {
+                        "line": current["line"],
+                        "date": current.get("DTPOSTED", ""),
+                        "description": current.get("MEMO")
+                        or current.get("NAME", ""),
+                        "amount": current.get("TRNAMT", ""),
+                    }
+                    current = None
+                elif current is not None and not tag.startswith("/") and value:
+                    current[tag] = value
+
+
+def _detect_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix in (".ofx", ".qfx"):
+        return "ofx"
+    return "csv"
+
+
+def _flush_chunk(
+    user_id: str,
+    chunk: List[Dict[str, Any]],
+    snapshot_id: int,
+    matched_ids: Set[int],
+    dry_run: bool,
+) -> Dict[str, int]:
+    days = [row["date"] for row in chunk]
+    existing: Dict[tuple, List[int]] = {}
+    for tx_id, day, cents, description in get_transaction_fingerprints(
+        user_id, min(days), max(days), max_id=snapshot_id
+    ):
+        if tx_id not in matched_ids:
+            key = (day, cents, _description_key(description))
+            existing.setdefault(key, []).append(tx_id)
+
+    fresh: List[Dict[str, Any]] = []
+    duplicates = 0
+    for row in chunk:
+        ids = existing.get(row["key"])
+        if ids:
+            matched_ids.add(ids.pop())
+            duplicates += 1
+        else:
+            fresh.append(row)
+
+    try:
+        predictions = predict_categories_ptbr(
+            [
+                clean_description(row["description"]).get("description")
+                or row["description"]
+                for row in fresh
+            ]
+        )
+    except _MODEL_ERRORS as e:
+        # Modelo ausente ou corrompido: vira erro da importação, com o que os
+        # blocos anteriores já gravaram (reimportar depois ignora duplicadas).
+        raise ValueError(f"Modelo de categorias indisponível: {e}") from e
+
+    batch = [
+        {
+            "user_id": user_id,
+            "description": row["description"],
+            "amount": row["amount"],
+            "category": pred["category"],
+            "type": row["direction"],
+            "date": row["date"],
+        }
+        for row, pred in zip(fresh, predictions)
+    ]
+    if dry_run or not batch:
+        return {
+            "inserted": 0,
+            "pending": len(batch),
+            "duplicates": duplicates,
+            "errors": 0,
+        }
+
+    result = add_transactions_batch(batch)
+    return {
+        "inserted": result["inserted"],
+        "pending": 0,
+        "duplicates": duplicates,
+        "errors": result["errors"],
+    }
+
+
+def import_bank_statement(
+    user_id: str,
+    file_path: str,
+    file_format: Optional[str] = None,
+    sign_convention: str = "auto",
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Importa um extrato bancário (CSV ou OFX) para as transações do usuário.
+
+    Cada linha é classificada pelo modelo de categorias e linhas que já
+    existem no banco (mesmo dia, valor e descrição) são ignoradas. Só são
+    aceitos arquivos dentro de LIFEOS_UPLOAD_DIR.
+
+    Args:
+        user_id: WhatsApp number do usuário
+        file_path: Arquivo do extrato, relativo a LIFEOS_UPLOAD_DIR
+        file_format: 'csv' ou 'ofx' (opcional, detectado pela extensão)
+        sign_convention: Como interpretar o sinal dos valores:
+            'auto' (negativo = despesa, positivo decidido pela descrição),
+            'signed' (negativo = despesa, positivo = receita) ou
+            'card' (fatura de cartão: positivo = despesa)
+        dry_run: Se True, apenas conta o que seria importado
+
+    Returns:
+        Dicionário com rows_read, inserted, duplicates, skipped, errors,
+        elapsed_seconds e rows_per_sec.
+    """
+    uploads = Path(UPLOAD_DIR).resolve()
+    path = (uploads / file_path).resolve()
+    if uploads not in path.parents:
+        return {
+            "status": "error",
+            "error": f"O extrato precisa estar em {UPLOAD_DIR}: {file_path}",
+        }
+    return import_statement_file(
+        user_id,
+        str(path),
+        file_format=file_format,
+        sign_convention=sign_convention,
+        dry_run=dry_run,
+        chunk_size=chunk_size,
+    )
+
+
+def import_statement_file(
+    user_id: str,
+    file_path: str,
+    file_format: Optional[str] = None,
+    sign_convention: str = "auto",
+    dry_run: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Importa um extrato de qualquer caminho (linha de comando; não é tool).
+
+    Args:
+        user_id: WhatsApp number do usuário
+        file_path: Caminho do arquivo do extrato
+        file_format: 'csv' ou 'ofx' (opcional, detectado pela extensão)
+        sign_convention: Como interpretar o sinal dos valores:
+            'auto' (negativo = despesa, positivo decidido pela descrição),
+            'signed' (negativo = despesa, positivo = receita) ou
+            'card' (fatura de cartão: positivo = despesa)
+        dry_run: Se True, apenas conta o que seria importado
+
+    Returns:
+        Dicionário com rows_read, inserted, duplicates, skipped, errors,
+        elapsed_seconds e rows_per_sec.
+    """
+    if sign_convention not in SIGN_CONVENTIONS:
+        return {
+            "status": "error",
+            "error": f"sign_convention deve ser um de {SIGN_CONVENTIONS}",
+        }
+    if not Path(file_path).is_file():
+        return {"status": "error", "error": f"Arquivo não encontrado: {file_path}"}
+
+    file_format = (file_format or _detect_format(file_path)).lower()
+    if file_format == "csv":
+        rows = iter_csv_statement(file_path)
+    elif file_format == "ofx":
+        rows = iter_ofx_statement(file_path)
+    else:
+        return {"status": "error", "error": f"Formato não suportado: {file_format}"}
+
+    started = time.perf_counter()
+    snapshot_id = get_max_transaction_id(user_id)
+    matched_ids: Set[int] = set()
+    totals: Counter = Counter()
+    skipped: List[int] = []
+    chunk: List[Dict[str, Any]] = []
+
+    try:
+        for raw in rows:
+            totals["rows_read"] += 1
+            amount = _parse_amount(raw["amount"])
+            day = _parse_date(raw["date"])
+            description = (raw["description"] or "").strip()
+            if amount is None or amount == 0 or day is None or not description:
+                totals["skipped"] += 1
+                if len(skipped) < 20:
+                    skipped.append(raw["line"])
+                continue
+
+            cents = int((abs(amount) * 100).to_integral_value())
+            chunk.append(
+                {
+                    "date": day,
+                    "description": description,
+                    "amount": abs(amount),
+                    "direction": _direction(amount, description, sign_convention),
+                    "key": (day, cents, _description_key(description)),
+                }
+            )
+            if len(chunk) >= chunk_size:
+                totals.update(
+                    _flush_chunk(user_id, chunk, snapshot_id, matched_ids, dry_run)
+                )
+                chunk = []
+
+        if chunk:
+            totals.update(
+                _flush_chunk(user_id, chunk, snapshot_id, matched_ids, dry_run)
+            )
+    except ValueError as e:
+        return {"status": "error", "error": str(e), **totals}
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = totals["rows_read"] / elapsed if elapsed > 0 else None
+    return {
+        "status": "ok",
+        "format": file_format,
+        "dry_run": dry_run,
+        "rows_read": totals["rows_read"],
+        "inserted": totals["inserted"],
+        "would_insert": totals["pending"] if dry_run else totals["inserted"],
+        "duplicates": totals["duplicates"],
+        "skipped": totals["skipped"],
+        "skipped_lines_sample": skipped,
+        "errors": totals["errors"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_per_sec, 1) if rows_per_sec else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importa um extrato CSV/OFX no LifeOS."
+    )
+    parser.add_argument("file", help="Arquivo do extrato (.csv ou .ofx)")
+    parser.add_argument("--user", required=True, help="WhatsApp number do usuário")
+    parser.add_argument("--format", choices=("csv", "ofx"), help="Força o formato")
+    parser.add_argument(
+        "--sign", choices=SIGN_CONVENTIONS, default="auto", help="Convenção de sinal"
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    result = import_statement_file(
+        args.user,
+        args.file,
+        file_format=args.format,
+        sign_convention=args.sign,
+        dry_run=args.dry_run,
+        chunk_size=args.chunk_size,
+    )
+    if result["status"] != "ok":
+        print(f"❌ {result['error']}")
+        raise SystemExit(1)
+
+    print(f"📥 {result['rows_read']} linhas lidas ({result['format'].upper()})")
+    suffix = " (dry-run)" if args.dry_run else ""
+    print(f"   ✅ Importadas: {result['would_insert']}{suffix}")
+    print(f"   ♻️  Duplicadas: {result['duplicates']}")
+    print(f"   ⏭️  Ignoradas: {result['skipped']}")
+    print(f"   ⚠️  Erros: {result['errors']}")
+    print(
+        f"   ⏱️  {result['elapsed_seconds']}s — {result['rows_per_sec']} linhas/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
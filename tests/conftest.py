@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+import pytest
+
+# DB_PATH é lido na importação de `setup`: precisa vir antes de qualquer import.
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(), "lifeos.db")
+
+from life_os_agent.database import crud, setup  # noqa: E402
+
+
+@pytest.fixture(autouse=True, scope="session")
+def database():
+    result = setup.init_database()
+    assert result["status"] == "ok"
+    yield setup.DB_PATH
+
+
+@pytest.fixture
+def user():
+    number = f"55119{os.urandom(4).hex()}"
+    crud.create_user(number, "Teste")
+    return number
@@ -0,0 +1,67 @@
+import pytest
+
+from life_os_agent.database import archive, crud, export
+from life_os_agent.tools.finance import statement_import
+
+STATEMENT = """data;descrição;valor
+05/03/2020;PADARIA SÃO JOÃO;-12,50
+"""
+
+
+@pytest.fixture
+def archived_user(user):
+    crud.add_transaction(
+        user, "Padaria São João", 12.5, "Mercado", "expense", date="2020-03-05"
+    )
+    crud.add_transaction(user, "Padaria da esquina", 8, "Mercado", "expense")
+    crud.add_calendar_log(user, "evento-antigo", "created", "Reunião com João")
+    result = archive.archive_old_rows(days=1, vacuum=False)
+    assert result["status"] == "ok"
+    return user
+
+
+def test_search_includes_archived_transactions(archived_user):
+    result = crud.search_transactions(archived_user, "padaria")
+    assert result["matches"] == 2
+    descriptions = {tx["description"] for tx in result["transactions"]}
+    assert descriptions == {"Padaria São João", "Padaria da esquina"}
+
+    result = crud.search_transactions(archived_user, "sao joao")
+    assert [tx["description"] for tx in result["transactions"]] == [
+        "Padaria São João"
+    ]
+
+
+def test_reimport_after_archiving_is_deduplicated(
+    archived_user, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(statement_import, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        statement_import,
+        "predict_categories_ptbr",
+        lambda texts: [{"category": "Outros"} for _ in texts],
+    )
+    (tmp_path / "extrato.csv").write_text(STATEMENT, encoding="utf-8")
+
+    result = statement_import.import_bank_statement(archived_user, "extrato.csv")
+    assert result["inserted"] == 0
+    assert result["duplicates"] == 1
+
+
+def test_listing_and_export_include_archived_transactions(archived_user, tmp_path):
+    pages, cursor = [], None
+    while True:
+        page = crud.get_transactions_page(archived_user, page_size=1, cursor=cursor)
+        pages.extend(tx["description"] for tx in page["transactions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == ["Padaria da esquina", "Padaria São João"]
+
+    archived = crud.get_transactions_page(archived_user, category="Mercado")
+    assert len(archived["transactions"]) == 2
+
+    result = export.export_to_path(archived_user, tmp_path / "historico.csv")
+    assert result["status"] == "ok"
+    assert result["rows"] == 2
+    assert "Padaria São João" in (tmp_path / "historico.csv").read_text("utf-8")
@@ -0,0 +1,62 @@
+import itertools
+
+import pytest
+
+from life_os_agent.database import crud, setup
+
+
+@pytest.fixture
+def two_shards(tmp_path, monkeypatch):
+    monkeypatch.setattr(setup, "DB_PATH", str(tmp_path / "lifeos.db"))
+    monkeypatch.setattr(setup, "SHARD_COUNT", 2)
+    assert setup.init_database()["status"] == "ok"
+    yield
+    setup.close_read_connections()
+
+
+def _users_on_each_shard():
+    first = {}
+    for n in itertools.count():
+        number = f"5511977{n:06d}"
+        first.setdefault(setup.shard_index(number), number)
+        if len(first) == 2:
+            return first[0], first[1]
+
+
+def test_batch_ids_match_the_stored_rows_across_shards(two_shards):
+    left, right = _users_on_each_shard()
+    # Desalinha as sequências de id dos dois arquivos.
+    for n in range(3):
+        crud.add_transaction(right, f"Antiga {n}", 1, "Outros", "expense")
+
+    items = [
+        {
+            "user_id": (left, right)[n % 2],
+            "description": f"Item {n}",
+            "amount": n + 1,
+            "category": "Mercado",
+            "type": "expense",
+        }
+        for n in range(6)
+    ]
+    items.insert(3, {"user_id": left, "description": "Sem valor", "type": "expense"})
+
+    result = crud.add_transactions_batch(items)
+    assert result["inserted"] == 6
+    assert result["errors"] == 1
+
+    for item, entry in zip(items, result["results"]):
+        if entry["status"] != "ok":
+            assert item["description"] == "Sem valor"
+            continue
+        with setup.get_connection(item["user_id"]) as conn:
+            row = conn.execute(
+                "SELECT user_id, description, amount_cents FROM transactions "
+                "WHERE id = ?",
+                (entry["id"],),
+            ).fetchone()
+        assert tuple(row) == (
+            item["user_id"],
+            item["description"],
+            item["amount"] * 100,
+        )
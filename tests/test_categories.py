@@ -0,0 +1,38 @@
+import threading
+
+from life_os_agent.database import crud, setup
+
+
+def test_concurrent_writers_share_a_new_category(user):
+    results = []
+
+    def write(number):
+        results.append(
+            crud.add_transaction(user, f"x{number}", 1, "Categoria nova", "expense")
+        )
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [result["status"] for result in results] == ["ok"] * 8
+    totals = crud.get_expenses_by_category(user)
+    assert [row["category"] for row in totals] == ["Categoria nova"]
+
+
+def test_update_of_missing_transaction_does_not_create_a_category(user):
+    result = crud.update_transaction(user, 10**9, category="Categoria órfã")
+    assert result["status"] == "error"
+    with setup.get_read_connection(user) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM categories WHERE name = ?", ("Categoria órfã",)
+        ).fetchone()
+    assert row is None
+
+    added = crud.add_transaction(user, "x", 1, "Outros", "expense")
+    result = crud.update_transaction(user, added["id"], category="Categoria órfã")
+    assert result["status"] == "ok"
+    updated = crud.get_transactions(user, category="Categoria órfã")
+    assert [tx["id"] for tx in updated] == [added["id"]]
@@ -0,0 +1,26 @@
+import inspect
+from pathlib import Path
+
+from life_os_agent.database import crud, export
+
+
+def test_export_tool_cannot_choose_the_output_path(user, tmp_path, monkeypatch):
+    parameters = inspect.signature(export.export_transactions).parameters
+    assert "output_path" not in parameters
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    crud.add_transaction(user, "Mercado", 10, "Mercado", "expense")
+
+    result = export.export_transactions(user)
+    assert result["status"] == "ok"
+    assert Path(tmp_path).resolve() in Path(result["path"]).resolve().parents
+
+    escaped = export.export_transactions("../../etc/passwd")
+    assert Path(tmp_path).resolve() in Path(escaped["path"]).resolve().parents
+
+
+def test_invalid_filters_return_an_error_without_leaving_a_file(user, tmp_path):
+    path = tmp_path / "a.csv"
+    for filters in ({"start_date": "not-a-date"}, {"end_date": "2024-13-40"}):
+        result = export.export_to_path(user, path, **filters)
+        assert result["status"] == "error"
+        assert not path.exists()
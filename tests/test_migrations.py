@@ -0,0 +1,151 @@
+import sqlite3
+from datetime import datetime
+
+from zoneinfo import ZoneInfo
+
+from life_os_agent.database import migrations
+from life_os_agent.database.timestamps import DEFAULT_TIMEZONE
+
+# Schema anterior às migrações versionadas (o que init_database criava).
+BASELINE_SCHEMA = """
+    CREATE TABLE users (
+        whatsapp_number TEXT PRIMARY KEY,
+        name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        description TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT CHECK(type IN ('income', 'expense')) NOT NULL,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+    );
+    CREATE INDEX idx_transactions_user ON transactions(user_id);
+    CREATE INDEX idx_transactions_date ON transactions(date);
+    CREATE INDEX idx_transactions_category ON transactions(category);
+    CREATE TABLE budget_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        monthly_limit REAL NOT NULL,
+        UNIQUE(user_id, category),
+        FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+    );
+    CREATE TABLE calendar_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        google_event_id TEXT NOT NULL,
+        action TEXT CHECK(action IN ('created', 'updated', 'deleted')) NOT NULL,
+        event_summary TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(whatsapp_number)
+    );
+"""
+
+USER = "5511900000001"
+ROWS = [
+    ("Salário", 3500.1, "Salário", "income", "2024-03-05 09:00:00"),
+    ("Mercado", 19.99, "Alimentação", "expense", "2024-03-10 12:30:00"),
+    ("Padaria", 0.3, "Alimentação", "expense", "2024-03-10T23:30:00Z"),
+    ("Uber", 27.45, "Transporte", "expense", "2024-04-01T08:15:00-03:00"),
+]
+
+
+def _baseline_database(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute(
+        "INSERT INTO users (whatsapp_number, name) VALUES (?, 'Legado')", (USER,)
+    )
+    conn.executemany(
+        "INSERT INTO transactions (user_id, description, amount, category, type, date) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(USER, *row) for row in ROWS],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _snapshot(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            table: sorted(conn.execute(f"SELECT * FROM {table}"))
+            for table in (
+                "transactions",
+                "categories",
+                "monthly_category_totals",
+                "daily_category_totals",
+                "user_balances",
+            )
+        }
+    finally:
+        conn.close()
+
+
+def _local(value):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    tz = ZoneInfo(DEFAULT_TIMEZONE)
+    local = parsed.astimezone(tz) if parsed.tzinfo else parsed.replace(tzinfo=tz)
+    return local.replace(tzinfo=None).isoformat(), int(local.timestamp())
+
+
+def test_baseline_database_migrates_once(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    _baseline_database(path)
+
+    result = migrations.migrate(paths=[path], pause=0)
+    assert result["status"] == "ok"
+    assert (result["from_version"], result["to_version"]) == (
+        0,
+        migrations.LATEST_VERSION,
+    )
+
+    conn = sqlite3.connect(path)
+    categories = dict(conn.execute("SELECT name, id FROM categories"))
+    stored = conn.execute(
+        "SELECT amount_cents, date, ts, category_id FROM transactions ORDER BY id"
+    ).fetchall()
+    expected = [
+        (round(amount * 100), *_local(date), categories[category])
+        for _, amount, category, _, date in ROWS
+    ]
+    assert stored == expected
+    assert [row[0] for row in stored] == [350010, 1999, 30, 2745]
+
+    monthly = conn.execute(
+        "SELECT month, c.name, type, total_cents, count "
+        "FROM monthly_category_totals JOIN categories c ON c.id = category_id "
+        "WHERE user_id = ? ORDER BY month, c.name",
+        (USER,),
+    ).fetchall()
+    assert monthly == [
+        ("2024-03", "Alimentação", "expense", 2029, 2),
+        ("2024-03", "Salário", "income", 350010, 1),
+        ("2024-04", "Transporte", "expense", 2745, 1),
+    ]
+    daily = conn.execute(
+        "SELECT day, total_cents, count FROM daily_category_totals "
+        "WHERE user_id = ? AND type = 'expense' ORDER BY day",
+        (USER,),
+    ).fetchall()
+    # 23:30 UTC ainda é dia 10 no horário local.
+    assert daily == [("2024-03-10", 2029, 2), ("2024-04-01", 2745, 1)]
+    balance = conn.execute(
+        "SELECT income_cents, expense_cents, count FROM user_balances "
+        "WHERE user_id = ?",
+        (USER,),
+    ).fetchone()
+    assert balance == (350010, 2029 + 2745, 4)
+    conn.close()
+
+    before = _snapshot(path)
+    again = migrations.migrate(paths=[path], pause=0)
+    assert again["status"] == "ok"
+    assert again["applied"] == []
+    assert again["from_version"] == again["to_version"] == migrations.LATEST_VERSION
+    assert _snapshot(path) == before
@@ -0,0 +1,15 @@
+from life_os_agent.database import crud
+
+
+def test_page_size_must_be_positive_and_is_capped(user):
+    for number in range(3):
+        crud.add_transaction(user, f"x{number}", 1, "Outros", "expense")
+
+    for page_size in (0, -1):
+        result = crud.get_transactions_page(user, page_size=page_size)
+        assert result["status"] == "error"
+
+    result = crud.get_transactions_page(user, page_size=10**9)
+    assert result["status"] == "ok"
+    assert len(result["transactions"]) == 3
+    assert result["next_cursor"] is None
@@ -0,0 +1,72 @@
+from life_os_agent.database import crud, rollups, setup
+
+
+def _assert_consistent(user):
+    result = rollups.check_balances(user)
+    assert result["consistent"], result
+
+
+def test_triggers_keep_every_rollup_in_sync(user):
+    ids = [
+        crud.add_transaction(user, *row)["id"]
+        for row in (
+            ("Salário", 3500.10, "Salário", "income", "2024-03-05T09:00:00"),
+            ("Mercado", 19.99, "Alimentação", "expense", "2024-03-10T12:30:00"),
+            ("Padaria", 0.30, "Alimentação", "expense", "2024-03-10T18:00:00"),
+            ("Uber", 27.45, "Transporte", "expense", "2024-04-01T08:15:00"),
+        )
+    ]
+    _assert_consistent(user)
+
+    assert crud.update_transaction(user, ids[1], category="Mercado")["status"] == "ok"
+    _assert_consistent(user)
+    assert crud.update_transaction(user, ids[2], amount=12.5)["status"] == "ok"
+    _assert_consistent(user)
+    assert crud.update_transaction(
+        user, ids[3], transaction_type="income"
+    )["status"] == "ok"
+    _assert_consistent(user)
+    # Mudar a data move a linha para outro dia e outro mês.
+    with setup.get_connection(user) as conn:
+        conn.execute(
+            "UPDATE transactions SET date = '2024-05-02T10:00:00' WHERE id = ?",
+            (ids[2],),
+        )
+    _assert_consistent(user)
+
+    for transaction_id in ids[:2]:
+        assert crud.delete_transaction(transaction_id, user)["deleted"] == 1
+    _assert_consistent(user)
+
+    with setup.get_connection(user) as conn:
+        balance = conn.execute(
+            "SELECT income_cents, expense_cents, count FROM user_balances "
+            "WHERE user_id = ?",
+            (user,),
+        ).fetchone()
+    assert tuple(balance) == (2745, 1250, 2)
+
+
+def test_check_balances_reports_a_drifted_category_total(user):
+    crud.add_transaction(
+        user, "Mercado", 19.99, "Alimentação", "expense", "2024-03-10T12:30:00"
+    )
+    with setup.get_connection(user) as conn:
+        conn.execute(
+            "UPDATE daily_category_totals SET total_cents = total_cents + 1 "
+            "WHERE user_id = ?",
+            (user,),
+        )
+
+    result = rollups.check_balances(user)
+    assert not result["consistent"]
+    assert result["mismatches"] == []
+    assert result["category_mismatches"]["monthly_category_totals"] == []
+    drifted = result["category_mismatches"]["daily_category_totals"]
+    assert sorted((row["side"], row["total_cents"]) for row in drifted) == [
+        ("actual", 1999),
+        ("stored", 2000),
+    ]
+
+    rollups.rebuild_daily_totals(user)
+    _assert_consistent(user)
@@ -0,0 +1,87 @@
+import pytest
+
+from life_os_agent.database import crud
+from life_os_agent.tools.finance import statement_import
+
+STATEMENT = """data;descrição;valor
+05/03/2024;PADARIA SÃO JOÃO;-12,50
+05/03/2024;AÇOUGUE ÉDEN;-80,00
+06/03/2024;Mercado;-30,00
+"""
+
+
+@pytest.fixture(autouse=True)
+def classifier(monkeypatch):
+    # O modelo treinado não é versionado; a categoria não importa aqui.
+    monkeypatch.setattr(
+        statement_import,
+        "predict_categories_ptbr",
+        lambda texts: [{"category": "Outros"} for _ in texts],
+    )
+
+
+def test_reimport_with_accented_uppercase_rows_is_deduplicated(
+    user, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(statement_import, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "extrato.csv").write_text(STATEMENT, encoding="utf-8")
+
+    first = statement_import.import_bank_statement(user, "extrato.csv")
+    assert first["status"] == "ok"
+    assert first["inserted"] == 3
+
+    second = statement_import.import_bank_statement(user, "extrato.csv")
+    assert second["inserted"] == 0
+    assert second["duplicates"] == 3
+    assert len(crud.get_transactions(user, limit=10)) == 3
+
+
+def test_statement_outside_the_upload_dir_is_rejected(user, tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(statement_import, "UPLOAD_DIR", str(uploads))
+    (tmp_path / "extrato.csv").write_text(STATEMENT, encoding="utf-8")
+
+    for path in ("../extrato.csv", str(tmp_path / "extrato.csv")):
+        result = statement_import.import_bank_statement(user, path)
+        assert result["status"] == "error"
+
+
+def test_minus_sign_after_the_currency_is_a_debit(user, tmp_path, monkeypatch):
+    monkeypatch.setattr(statement_import, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "extrato.csv").write_text(
+        "data;descrição;valor\n"
+        "05/03/2024;Farmácia;R$ -50,00\n"
+        "06/03/2024;Reembolso;R$ 50,00\n",
+        encoding="utf-8",
+    )
+
+    result = statement_import.import_bank_statement(
+        user, "extrato.csv", sign_convention="signed"
+    )
+    assert result["inserted"] == 2
+    types = {tx["description"]: tx["type"] for tx in crud.get_transactions(user)}
+    assert types == {"Farmácia": "expense", "Reembolso": "income"}
+
+
+def test_missing_model_returns_an_error_with_the_partial_totals(
+    user, tmp_path, monkeypatch
+):
+    calls = []
+
+    def predict(texts):
+        calls.append(texts)
+        if len(calls) > 1:
+            raise FileNotFoundError("models/expense_clf_tfidf_nb_ptbr.joblib")
+        return [{"category": "Outros"} for _ in texts]
+
+    monkeypatch.setattr(statement_import, "predict_categories_ptbr", predict)
+    monkeypatch.setattr(statement_import, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "extrato.csv").write_text(STATEMENT, encoding="utf-8")
+
+    result = statement_import.import_bank_statement(
+        user, "extrato.csv", chunk_size=1
+    )
+    assert result["status"] == "error"
+    assert "Modelo de categorias" in result["error"]
+    assert result["inserted"] == 1
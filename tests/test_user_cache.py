@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+from life_os_agent.database import crud, setup
+
+
+def test_update_user_is_visible_through_the_cache(user):
+    assert crud.get_user(user)["name"] == "Teste"
+    crud.update_user(user, "Novo")
+    assert crud.get_user(user)["name"] == "Novo"
+
+
+def test_failed_interaction_flush_keeps_entries_and_reschedules(user, monkeypatch):
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    crud.flush_interactions()
+    crud.update_user_last_interaction(user)
+    pending = crud._pending_interactions[user]
+
+    with monkeypatch.context() as patch:
+        patch.setattr(crud, "run_write", locked)
+        result = crud.flush_interactions()
+    assert result == {"status": "error", "flushed": 0, "failed": 1}
+    assert crud._pending_interactions[user] == pending
+    assert crud._flush_timer is not None
+
+    crud._flush_timer.cancel()
+    assert crud.flush_interactions()["flushed"] == 1
+    assert crud.get_user(user)["last_interaction"] == pending
+
+
+def test_user_from_a_rolled_back_write_is_not_cached():
+    number = "5511000000999"
+
+    with pytest.raises(RuntimeError):
+        with setup.get_connection(number) as conn:
+            crud._ensure_user(conn.cursor(), number)
+            # Segunda operação do mesmo lote: a linha já "existe".
+            crud._ensure_user(conn.cursor(), number)
+            raise RuntimeError("rollback")
+
+    assert number not in crud._user_cache
+    assert crud.get_user(number) is None
@@ -0,0 +1,47 @@
+import sqlite3
+import threading
+
+import pytest
+
+from life_os_agent.database import crud, setup, writer
+
+
+@pytest.fixture
+def single_writer(monkeypatch):
+    monkeypatch.setattr(writer, "SINGLE_WRITER", True)
+    yield
+    writer.stop_writer()
+
+
+def test_locked_database_fails_the_whole_batch_instead_of_hanging(
+    single_writer, user
+):
+    blocker = sqlite3.connect(setup.DB_PATH, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    results = []
+
+    def write(number):
+        try:
+            results.append(
+                crud.add_transaction(user, f"x{number}", 1, "Outros", "expense")
+            )
+        except sqlite3.OperationalError as e:
+            results.append(e)
+
+    # Várias escritas na fila: o BEGIN do lote falha com "database is locked".
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=15)
+    hung = [thread for thread in threads if thread.is_alive()]
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    assert not hung
+    assert len(results) == 5
+    assert any(isinstance(result, sqlite3.OperationalError) for result in results)
+
+    # Com o lock liberado, o escritor volta a funcionar.
+    result = crud.add_transaction(user, "depois", 1, "Outros", "expense")
+    assert result["status"] == "ok"